@@ -1,17 +1,56 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from fastapi.responses import FileResponse
-from pathlib import Path
 from routes.out1 import router as out1_router
 from routes.status import router as status_router
 from routes.misc import router as misc_router
 from routes.ui import router as ui_router
+from routes.events import router as events_router
+from routes.desired import router as desired_router
+from routes.scenes import router as scenes_router
+from routes.pacing import router as pacing_router
+from routes.ops import router as ops_router
+from routes.devices import router as devices_router, DeviceScope
+from routes.static import router as static_router
+from services.device_context import use
+from services.devices import REGISTRY
+from services.scenes import SCENES
+from services.assets import ASSETS
+import services.persist  # noqa: F401  (gives every device its snapshot)
+import services.events  # noqa: F401  (... and its /events producer)
+import services.verify  # noqa: F401  (... and its background write verifier)
 
 
-app = FastAPI(title="HDMI Matrix Controller")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks = []
+    SCENES.load()
+    ASSETS.build()  # frontend read + compressed once; served from memory
+    for dev in REGISTRY:
+        with use(dev):  # tasks created here keep talking to this device
+            # Device connect runs in the background; the server answers right away
+            tasks.append(dev.aser.start())
+            # Warm restart: restore the last known cache, then confirm it off the request path
+            dev.snapshot.load()
+            tasks.append(asyncio.create_task(dev.snapshot.verify_restored()))
+    yield
+    for t in tasks:
+        t.cancel()
+    for dev in REGISTRY:
+        dev.snapshot.close()
+        dev.aser.close()
+
+
+app = FastAPI(title="HDMI Matrix Controller", lifespan=lifespan)
 app.include_router(out1_router)
 app.include_router(status_router)
 app.include_router(misc_router)
 app.include_router(ui_router)
-
-@app.get("/")
-def root(): return FileResponse(Path("static/index.html"))
+app.include_router(events_router)
+app.include_router(desired_router)
+app.include_router(scenes_router)
+app.include_router(pacing_router)
+app.include_router(ops_router)
+app.include_router(devices_router)
+app.include_router(static_router)
+app.add_middleware(DeviceScope)  # /api/devices/{id}/... -> /api/... on that device
@@ -0,0 +1,18 @@
+# bench/_env.py
+import os
+import tempfile
+
+
+def isolate(port: str) -> str:
+    """
+    Point the app at `port` (real serial, no mock) with every file it saves in
+    a fresh temp dir, never over the real ones in the cwd. Call before the app
+    is imported: the driver reads these at import time. Returns the dir.
+    """
+    state_dir = tempfile.mkdtemp(prefix="bench-")
+    os.environ.update(SERIAL_PORT=port, MOCK_SERIAL="false",
+                      STATE_FILE=os.path.join(state_dir, "state.jsonl"),
+                      LINK_FILE=os.path.join(state_dir, "link_profile.json"),
+                      PACING_FILE=os.path.join(state_dir, "pacing.json"),
+                      SCENES_FILE=os.path.join(state_dir, "scenes.json"))
+    return state_dir
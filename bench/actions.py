@@ -0,0 +1,178 @@
+# bench/actions.py
+"""
+End-to-end latency benchmark for the user-facing actions, run against the
+UHD-402MV simulator (sim/uhd402mv.py) with realistic serial timing.
+
+For every action it reports p50/p95/p99 latency plus, per call: commands
+sent (queries/sets), bytes on the wire, time queued for the serial lock and
+time spent in pacing sleeps. Results are written as JSON so runs can be
+compared across commits:
+
+    python -m bench.actions                            # -> bench/results/<commit>.json
+    python -m bench.actions -n 50 --echo
+    python -m bench.actions --compare bench/results/abc1234.json   # exit 1 on regression
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from bench._env import isolate
+from sim.uhd402mv import SimConfig, SimulatedMatrix
+
+# name -> (setup request or None, measured request). Setup puts the device in a
+# state where the measured action has real work to do; it is not timed.
+ACTIONS = {
+    "select": (None, ("post", "/api/out1/select/{i}")),
+    "quad14": (("post", "/api/out1/select/{i}"), ("post", "/api/out1/quad14")),
+    "one-single-two-quad14": (("post", "/api/out1/quad14"), ("post", "/api/one-single-two-quad14")),
+    "refresh-state": (None, ("post", "/api/refresh-state")),
+    "init": (None, ("post", "/api/init")),
+}
+
+COUNTERS = ("queries", "sets", "bytes_out", "bytes_in", "lock_wait", "sleep")
+
+
+def percentile(values: list[float], p: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    vals = sorted(values)
+    k = max(0, min(len(vals) - 1, int(round(p / 100.0 * len(vals) + 0.5)) - 1))
+    return vals[k]
+
+
+def _commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def _call(client, req, i: int):
+    method, url = req
+    src = (i % 4) + 1
+    r = getattr(client, method)(url.format(i=src))
+    if r.status_code >= 400:
+        raise RuntimeError(f"{method.upper()} {url} -> {r.status_code} {r.text[:200]}")
+
+
+def run(iterations: int, cfg: SimConfig, settle: float) -> dict:
+    sim = SimulatedMatrix(cfg)
+    sim.start()
+    isolate(sim.port)  # before the app is imported
+
+    from fastapi.testclient import TestClient
+    from app import app
+    from services.serial_io import ASER
+
+    results = {}
+    try:
+        with TestClient(app) as client:
+            deadline = time.time() + 10
+            while client.get("/api/health").status_code != 200:
+                if time.time() > deadline:
+                    raise RuntimeError(f"link never became ready: {ASER.health()}")
+                time.sleep(0.05)
+
+            for name, (setup, req) in ACTIONS.items():
+                lat, per = [], {k: [] for k in COUNTERS}
+                for i in range(iterations):
+                    if setup:
+                        _call(client, setup, i)
+                    time.sleep(settle)  # let the device work through earlier commands
+                    before = dict(ASER.io_stats)
+                    t0 = time.perf_counter()
+                    _call(client, req, i)
+                    lat.append((time.perf_counter() - t0) * 1000.0)
+                    for k in COUNTERS:
+                        per[k].append(ASER.io_stats[k] - before[k])
+
+                results[name] = {
+                    "n": iterations,
+                    "p50_ms": round(percentile(lat, 50), 2),
+                    "p95_ms": round(percentile(lat, 95), 2),
+                    "p99_ms": round(percentile(lat, 99), 2),
+                    "mean_ms": round(sum(lat) / len(lat), 2),
+                    "max_ms": round(max(lat), 2),
+                    "commands": round(sum(per["queries"][i] + per["sets"][i] for i in range(iterations)) / iterations, 2),
+                    "queries": round(sum(per["queries"]) / iterations, 2),
+                    "sets": round(sum(per["sets"]) / iterations, 2),
+                    "bytes_out": round(sum(per["bytes_out"]) / iterations, 1),
+                    "bytes_in": round(sum(per["bytes_in"]) / iterations, 1),
+                    "lock_wait_ms": round(sum(per["lock_wait"]) / iterations * 1000.0, 3),
+                    "sleep_ms": round(sum(per["sleep"]) / iterations * 1000.0, 2),
+                }
+                r = results[name]
+                print(f"[BENCH] {name:<22} p50 {r['p50_ms']:7.1f}  p95 {r['p95_ms']:7.1f}  p99 {r['p99_ms']:7.1f} ms  "
+                      f"cmds {r['commands']:5.1f}  bytes {r['bytes_out'] + r['bytes_in']:7.0f}  "
+                      f"lock {r['lock_wait_ms']:6.2f} ms  sleep {r['sleep_ms']:6.1f} ms")
+    finally:
+        sim.stop()
+
+    return {
+        "meta": {
+            "commit": _commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "iterations": iterations,
+            "sim": {k: v for k, v in vars(cfg).items() if k != "eol"},
+            "device": dict(sim.stats),
+        },
+        "actions": results,
+    }
+
+
+def compare(base: dict, new: dict, threshold: float) -> list[str]:
+    """Actions whose p50 or command count grew by more than threshold x."""
+    regressions = []
+    for name, cur in new["actions"].items():
+        old = base.get("actions", {}).get(name)
+        if not old:
+            continue
+        for key in ("p50_ms", "p95_ms", "commands", "bytes_out"):
+            a, b = old.get(key) or 0, cur.get(key) or 0
+            ratio = (b / a) if a else (1.0 if not b else float("inf"))
+            flag = "  <-- regression" if ratio > threshold else ""
+            print(f"[BENCH] {name:<22} {key:<9} {a:9.2f} -> {b:9.2f}  x{ratio:.2f}{flag}")
+            if flag:
+                regressions.append(f"{name}.{key}")
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark user actions against the simulator")
+    ap.add_argument("-n", "--iterations", type=int, default=30)
+    ap.add_argument("-o", "--out", help="JSON results path (default bench/results/<commit>.json)")
+    ap.add_argument("--compare", metavar="BASE_JSON", help="compare against an earlier run")
+    ap.add_argument("--threshold", type=float, default=1.5, help="regression ratio for --compare")
+    ap.add_argument("--settle", type=float, default=0.05, help="idle time before each measured call")
+    ap.add_argument("--baud", type=int, default=115200)
+    ap.add_argument("--set-latency", type=float, default=0.002)
+    ap.add_argument("--query-latency", type=float, default=0.008)
+    ap.add_argument("--echo", action="store_true")
+    a = ap.parse_args()
+
+    cfg = SimConfig(baud=a.baud, set_latency=a.set_latency, query_latency=a.query_latency,
+                    echo=a.echo, seed=1)
+    res = run(a.iterations, cfg, a.settle)
+
+    out = a.out or os.path.join(os.path.dirname(__file__), "results", f"{res['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as fh:
+        json.dump(res, fh, indent=2)
+    print(f"[BENCH] wrote {out}")
+
+    if a.compare:
+        with open(a.compare, "r", encoding="utf-8") as fh:
+            base = json.load(fh)
+        if compare(base, res, a.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
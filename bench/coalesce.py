@@ -0,0 +1,123 @@
+# bench/coalesce.py
+"""
+Load test for single-flight coalescing of /api/status and /api/refresh-state,
+run against the UHD-402MV simulator (sim/uhd402mv.py).
+
+Every tick, N panels (threads) hit the endpoint at the same instant, the way
+a wall of open browsers does when their poll timers line up. Ticks are spaced
+past the status cache window, so each one is a real miss. Reported per tick:
+serial queries on the bus and how many callers joined an in-flight probe
+instead of sending their own. With coalescing the bus numbers stay flat as N
+grows; --baseline turns it off for comparison.
+
+    python -m bench.coalesce
+    python -m bench.coalesce --panels 1 8 32 --ticks 5
+    python -m bench.coalesce --baseline
+"""
+import argparse
+import threading
+import time
+
+from bench._env import isolate
+from sim.uhd402mv import SimConfig, SimulatedMatrix
+
+ENDPOINTS = {
+    "status": ("get", "/api/status"),
+    "refresh-state": ("post", "/api/refresh-state"),
+}
+
+
+def _tick(client, req, n: int) -> list[int]:
+    """n simultaneous calls; returns their status codes."""
+    method, url = req
+    gate = threading.Barrier(n)
+    codes = [0] * n
+
+    def panel(i):
+        gate.wait()
+        codes[i] = getattr(client, method)(url).status_code
+
+    threads = [threading.Thread(target=panel, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return codes
+
+
+def run(panels: list[int], ticks: int, interval: float, cfg: SimConfig, baseline: bool) -> dict:
+    sim = SimulatedMatrix(cfg)
+    sim.start()
+    isolate(sim.port)  # before the app is imported
+
+    from fastapi.testclient import TestClient
+    from app import app
+    from serial_sched import SingleFlight
+    from services.serial_io import ASER
+
+    if baseline:
+        async def solo(self, key, fn):
+            return await fn()
+        SingleFlight.run = solo
+
+    results = {}
+    try:
+        with TestClient(app) as client:
+            deadline = time.time() + 10
+            while client.get("/api/health").status_code != 200:
+                if time.time() > deadline:
+                    raise RuntimeError(f"link never became ready: {ASER.health()}")
+                time.sleep(0.05)
+
+            for name, req in ENDPOINTS.items():
+                results[name] = {}
+                for n in panels:
+                    time.sleep(interval)  # let the status cache lapse
+                    m = ASER.metrics.counters
+                    before = (m["queries"], m["status_coalesced"] + m["refresh_coalesced"])
+                    t0 = time.perf_counter()
+                    failed = 0
+                    for k in range(ticks):
+                        if k:
+                            time.sleep(interval)
+                        failed += sum(1 for c in _tick(client, req, n) if c >= 400)
+                    wall = time.perf_counter() - t0 - interval * (ticks - 1)
+                    queries = m["queries"] - before[0]
+                    joined = m["status_coalesced"] + m["refresh_coalesced"] - before[1]
+                    r = results[name][n] = {
+                        "queries_per_tick": round(queries / ticks, 2),
+                        "coalesced_per_tick": round(joined / ticks, 2),
+                        "ms_per_tick": round(wall / ticks * 1000.0, 1),
+                        "failed": failed,
+                    }
+                    print(f"[BENCH] {name:<14} panels {n:4d}  bus queries/tick {r['queries_per_tick']:7.1f}  "
+                          f"coalesced/tick {r['coalesced_per_tick']:6.1f}  {r['ms_per_tick']:7.1f} ms/tick"
+                          f"{'  FAILED ' + str(failed) if failed else ''}")
+    finally:
+        sim.stop()
+    return {"baseline": baseline, "device": dict(sim.stats), "results": results}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Concurrent status/refresh load against the simulator")
+    ap.add_argument("--panels", type=int, nargs="+", default=[1, 4, 16, 64])
+    ap.add_argument("--ticks", type=int, default=3)
+    ap.add_argument("--interval", type=float, default=0.9, help="seconds between ticks (> status cache window)")
+    ap.add_argument("--baseline", action="store_true", help="disable coalescing (every caller queries)")
+    ap.add_argument("--baud", type=int, default=115200)
+    ap.add_argument("--query-latency", type=float, default=0.008)
+    a = ap.parse_args()
+
+    cfg = SimConfig(baud=a.baud, query_latency=a.query_latency, seed=1)
+    res = run(a.panels, a.ticks, a.interval, cfg, a.baseline)
+
+    # flat = the largest panel count needs no more bus traffic per tick than one panel
+    for name, per in res["results"].items():
+        lo, hi = per[min(per)], per[max(per)]
+        verdict = "flat" if hi["queries_per_tick"] <= lo["queries_per_tick"] else "grows"
+        print(f"[BENCH] {name:<14} {min(per)} -> {max(per)} panels: "
+              f"{lo['queries_per_tick']} -> {hi['queries_per_tick']} queries/tick ({verdict})")
+
+
+if __name__ == "__main__":
+    main()
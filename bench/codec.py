@@ -0,0 +1,195 @@
+# bench/codec.py
+"""
+Micro-benchmark for the protocol codec (vendor/codec.py) against the
+f-string / multi-regex implementations it replaced, which are kept below as
+the baseline. Before timing, both sides are checked to agree on every
+command in the tables and on a corpus of real and odd replies.
+
+    python -m bench.codec
+    python -m bench.codec -n 200000
+"""
+import argparse
+import re
+import sys
+import timeit
+
+import vendor.commands as C
+from vendor import codec as K
+
+
+# ---------------- baseline (pre-codec vendor/commands.py) ----------------
+
+def _term(s: str) -> bytes:
+    return f"{s.strip()}!".encode("ascii")
+
+def old_border(out_num, window, on):
+    return _term(f"s output {out_num} window {window} border {1 if on else 0}")
+
+def old_border_color(out_num, window, color):
+    return _term(f"s output {out_num} window {window} border color {color}")
+
+def old_window_in(out_num, window, src):
+    return _term(f"s output {out_num} window {window} in {src}")
+
+def old_route(out_num, src):
+    return _term(f"s output {out_num} in source {src}")
+
+def old_q_window(out_num, window):
+    return _term(f"r output {out_num} window {window} in")
+
+_RE_HDMI_NUM = re.compile(rb"HDMI\s*(\d)")
+_RE_MODE_TXT = re.compile(rb"(single screen|quad screen|PIP|PBP|triple)", re.I)
+_RE_MODE_NUM = re.compile(rb"multiview[:\s]*([1-5])", re.I)
+_RE_BARE_NUM = re.compile(rb"^\s*([1-5])\s*$")
+_RE_QUAD_MODE = re.compile(rb"quad mode\s*(\d)", re.I)
+
+def old_hdmi(reply):
+    m = _RE_HDMI_NUM.search(reply or b"")
+    return int(m.group(1)) if m else None
+
+def old_multiview(reply):
+    if not reply:
+        return None
+    t = reply.lower()
+    m = _RE_MODE_TXT.search(t)
+    if m:
+        word = m.group(1)
+        for w, n in ((b"single", 1), (b"pip", 2), (b"pbp", 3), (b"triple", 4), (b"quad", 5)):
+            if w in word:
+                return n
+    m = _RE_MODE_NUM.search(t)
+    if m:
+        return int(m.group(1))
+    m = _RE_BARE_NUM.search(t)
+    return int(m.group(1)) if m else None
+
+def old_quad_number(reply):
+    m = _RE_QUAD_MODE.search(reply or b"")
+    return int(m.group(1)) if m else None
+
+def old_is_quad(reply):
+    t = (reply or b"").lower()
+    return (b"quad screen" in t) or (b"quad mode" in t)
+
+def old_power(reply):
+    t = (reply or b"").strip().lower()
+    return "on" if b"on" in t else ("off" if b"off" in t else "unknown")
+
+
+# ---------------- corpus ----------------
+
+REPLIES = [
+    b"output 1 multiview: single screen\r\n",
+    b"output 2 multiview: quad screen\r\n",
+    b"quad screen\r\nquad mode 1\r\n",
+    b"output 2 quad mode 2\r\n",
+    b"output 1 multiview: PIP\r\n",
+    b"multiview: 5\r\n",
+    b"4\r\n",
+    b"output 1 in source: HDMI 3\r\n",
+    b"output 2 window 4 in source: HDMI 1\r\n",
+    b"power on\r\n",
+    b"power off\r\n",
+    b"",
+]
+
+# the old power check matched "on" anywhere ("connection"); the codec needs a word
+POWER_REPLIES = [b"power on\r\n", b"power off\r\n", b"POWER: ON", b""]
+
+
+def check() -> list[str]:
+    errors = []
+    for o in K.OUTPUTS:
+        for w in K.WINDOWS:
+            for on in (False, True):
+                if C.cmd_border(o, w, on) != old_border(o, w, on):
+                    errors.append(f"border {o} {w} {on}")
+            for c in K.COLORS:
+                if C.cmd_border_color(o, w, c) != old_border_color(o, w, c):
+                    errors.append(f"border color {o} {w} {c}")
+            for s in K.SOURCES:
+                if C.cmd_set_window_input(o, w, s) != old_window_in(o, w, s):
+                    errors.append(f"window in {o} {w} {s}")
+            if C.q_window_in_source(o, w) != old_q_window(o, w):
+                errors.append(f"window query {o} {w}")
+        for s in K.SOURCES:
+            if C.cmd_route_output_input(o, s) != old_route(o, s):
+                errors.append(f"route {o} {s}")
+    for rep in REPLIES:
+        r = C.parse_reply(rep)
+        for name, new, old in (("source", r.source, old_hdmi(rep)), ("mode", r.mode, old_multiview(rep)),
+                               ("layout", r.layout, old_quad_number(rep)), ("quad", r.quad, old_is_quad(rep))):
+            if new != old:
+                errors.append(f"{name} {rep!r}: {new!r} != {old!r}")
+    for rep in POWER_REPLIES:
+        if C.parse_power(rep) != old_power(rep):
+            errors.append(f"power {rep!r}")
+    return errors
+
+
+# ---------------- timing ----------------
+
+BATCH = [(o, w, s) for o in K.OUTPUTS for w in K.WINDOWS for s in K.SOURCES]
+
+
+def _encode_old():
+    for o, w, s in BATCH:
+        old_window_in(o, w, s)
+        old_border(o, w, True)
+        old_border_color(o, w, 2)
+
+def _encode_new():
+    for o, w, s in BATCH:
+        C.cmd_set_window_input(o, w, s)
+        C.cmd_border(o, w, True)
+        C.cmd_border_color(o, w, 2)
+
+def _parse_old():
+    # what refresh-state / verify used to do: one function (one scan) per fact
+    for rep in REPLIES:
+        old_multiview(rep)
+        old_is_quad(rep)
+        old_quad_number(rep)
+        old_hdmi(rep)
+
+def _parse_new():
+    for rep in REPLIES:
+        C.parse_reply(rep)
+
+def _scan_new():
+    for rep in REPLIES:
+        K.scan_reply(rep)
+
+
+def run(n: int) -> dict:
+    """encode: table lookup; parse: cached parse_reply; scan: the uncached single pass."""
+    out = {}
+    for name, old, new, per in (("encode", _encode_old, _encode_new, 3 * len(BATCH)),
+                                ("parse", _parse_old, _parse_new, len(REPLIES)),
+                                ("scan", _parse_old, _scan_new, len(REPLIES))):
+        t_old = min(timeit.repeat(old, number=n // per or 1, repeat=3))
+        t_new = min(timeit.repeat(new, number=n // per or 1, repeat=3))
+        calls = (n // per or 1) * per
+        out[name] = {"old_ns": t_old / calls * 1e9, "new_ns": t_new / calls * 1e9, "speedup": t_old / t_new}
+        print(f"[BENCH] {name:<7} old {out[name]['old_ns']:7.0f} ns  new {out[name]['new_ns']:7.0f} ns  "
+              f"x{out[name]['speedup']:.1f}   (per command / reply)")
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Codec micro-benchmark: precomputed tables vs formatting/regex")
+    ap.add_argument("-n", "--iterations", type=int, default=100000, help="commands / replies per timing")
+    args = ap.parse_args()
+
+    errors = check()
+    if errors:
+        for e in errors:
+            print(f"[BENCH] mismatch: {e}")
+        sys.exit(1)
+    print(f"[BENCH] codec agrees with the baseline on {len(REPLIES) + len(POWER_REPLIES)} replies "
+          f"and every table command")
+    run(args.iterations)
+
+
+if __name__ == "__main__":
+    main()
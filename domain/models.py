@@ -1,3 +1,28 @@
-from typing import Literal
+from typing import Annotated, Literal
+from pydantic import BaseModel, Field
 
 Mode = Literal["single", "quad", "other"]
+Window = Annotated[int, Field(ge=1, le=4)]
+Source = Annotated[int, Field(ge=1, le=4)]
+
+class OutputTarget(BaseModel):
+    """Desired state for one output; None = leave as-is."""
+    mode: Literal["single", "quad"] | None = None
+    src: int | None = Field(None, ge=1, le=4)              # single-mode video route
+    quad_layout: int | None = Field(None, ge=1, le=2)
+    map: dict[Window, Source] | None = None                # window -> HDMI source
+    audio: int | None = Field(None, ge=0, le=4)            # 0 = follow
+    border_window: int | None = Field(None, ge=0, le=4)    # 0 = no border
+    border_color: int | None = Field(None, ge=1, le=7)
+
+class DesiredState(BaseModel):
+    outputs: dict[int, OutputTarget]
+
+class Scene(DesiredState):
+    """A named preset layout (services/scenes.py); outputs as in DesiredState."""
+    description: str = ""
+
+class FanoutDesiredState(DesiredState):
+    """One target applied to several matrices at once; devices=None = every device."""
+    devices: list[str] | None = None
+    dry_run: bool = False
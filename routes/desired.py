@@ -0,0 +1,29 @@
+# routes/desired.py
+from fastapi import APIRouter, HTTPException
+from routes.errors import http_error
+from domain.models import DesiredState
+from services.reconcile import apply, describe
+
+router = APIRouter(prefix="/api/desired-state")
+
+def to_target(body: DesiredState) -> dict[int, dict]:
+    bad = [n for n in body.outputs if n not in (1, 2)]
+    if bad:
+        raise HTTPException(status_code=422, detail=f"unknown output(s): {bad}")
+    return {n: t.model_dump(exclude_none=True) for n, t in body.outputs.items()}
+
+@router.post("/plan")
+async def plan_desired_state(body: DesiredState):
+    """Dry run: the ordered command plan needed to reach the target from the cached state."""
+    steps = await apply(to_target(body), dry_run=True)
+    return {"status": "ok", "dry_run": True, "count": len(steps), "plan": describe(steps)}
+
+@router.post("")
+async def apply_desired_state(body: DesiredState):
+    """Send the minimal plan (audio first, then video, then borders) and update the cache."""
+    target = to_target(body)
+    try:
+        steps = await apply(target)
+    except Exception as e:
+        raise http_error(e)
+    return {"status": "ok", "count": len(steps), "plan": describe(steps)}
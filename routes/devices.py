@@ -0,0 +1,81 @@
+# routes/devices.py
+import re
+import time
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse
+from routes.desired import to_target
+from routes.errors import http_error
+from domain.models import FanoutDesiredState
+from services.device_context import use
+from services.devices import REGISTRY
+from services.reconcile import apply, describe
+
+router = APIRouter(prefix="/api/devices")
+
+RE_DEVICE_PATH = re.compile(r"^/api/devices/([^/]+)(/.+)$")
+
+
+class DeviceScope:
+    """
+    ASGI middleware: /api/devices/{id}/<rest> is served by the existing
+    /api/<rest> route with device {id} bound as the current device, so every
+    route (including /events) works per matrix without being duplicated.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        m = RE_DEVICE_PATH.match(scope.get("path", "")) if scope["type"] == "http" else None
+        if m is None:
+            await self.app(scope, receive, send)
+            return
+        dev = REGISTRY.get(m.group(1))
+        if dev is None:
+            resp = JSONResponse({"detail": f"unknown device {m.group(1)!r}"}, status_code=404)
+            await resp(scope, receive, send)
+            return
+        path = "/api" + m.group(2)
+        scope = dict(scope, path=path, raw_path=path.encode("utf-8"))
+        with use(dev):
+            await self.app(scope, receive, send)
+
+
+@router.get("")
+async def list_devices():
+    """Every configured matrix with its port and link state."""
+    return {"default": REGISTRY.default.id, "devices": [d.info() for d in REGISTRY]}
+
+@router.get("/{device_id}")
+async def device_info(device_id: str):
+    dev = REGISTRY.get(device_id)
+    if dev is None:
+        raise HTTPException(status_code=404, detail=f"unknown device {device_id!r}")
+    return dev.info()
+
+@router.post("/desired-state")
+async def fan_out_desired_state(body: FanoutDesiredState):
+    """
+    Apply one desired state to several matrices in parallel. Each device plans
+    against its own cache and sends on its own port; a slow or offline unit only
+    fails its own entry (status "partial").
+    """
+    target = to_target(body)
+    try:
+        devices = REGISTRY.select(body.devices)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"unknown device(s): {e.args[0]}")
+
+    t0 = time.perf_counter()
+    results = await REGISTRY.fan_out(devices, apply, target, dry_run=body.dry_run)
+    out, failed = {}, 0
+    for dev_id, res in results.items():
+        if isinstance(res, Exception):
+            failed += 1
+            err = http_error(res)
+            out[dev_id] = {"status": "error", "code": err.status_code, "detail": err.detail}
+        else:
+            out[dev_id] = {"status": "ok", "count": len(res), "plan": describe(res)}
+    status = "ok" if not failed else ("error" if failed == len(results) else "partial")
+    return {"status": status, "dry_run": body.dry_run, "elapsed_ms": round((time.perf_counter() - t0) * 1000, 1),
+            "devices": out}
@@ -0,0 +1,11 @@
+# routes/errors.py
+from fastapi import HTTPException
+from serial_async import DeviceNotReady
+
+def http_error(e: Exception) -> HTTPException:
+    """Map service errors to HTTP: link not ready -> 503 (retry later), anything else -> 500."""
+    if isinstance(e, HTTPException):
+        return e
+    if isinstance(e, DeviceNotReady):
+        return HTTPException(status_code=503, detail=str(e))
+    return HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,45 @@
+# routes/events.py
+import asyncio
+import json
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+from services.events import STREAM
+
+router = APIRouter(prefix="/api")
+
+KEEPALIVE = 15.0  # comment line so proxies / Wi-Fi APs don't drop idle streams
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+@router.get("/events")
+async def events(request: Request):
+    """
+    Server-Sent Events stream of UI state + power/responsive status.
+    First message is the full 'state', then only 'delta' messages with changed keys,
+    plus an 'op' message when an action accepted with 202 finishes (routes/ops.py).
+    """
+    q = STREAM.subscribe()
+
+    async def gen():
+        try:
+            yield _sse("state", STREAM.snapshot())
+            while True:
+                try:
+                    item = await asyncio.wait_for(q.get(), KEEPALIVE)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+                if item is None:
+                    break
+                yield _sse(*item)
+        finally:
+            STREAM.unsubscribe(q)
+
+    return StreamingResponse(
+        gen(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
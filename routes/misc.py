@@ -1,7 +1,9 @@
 # routes/misc.py
-from fastapi import APIRouter, HTTPException, Path as FPath
+from fastapi import APIRouter, Path as FPath, Request
+from routes.ops import run_action
 import vendor.commands as C
-from services.serial_io import SER
+from services.serial_io import ASER
+from services.intents import INTENTS
 from services.state_cache import CACHE
 from services.borders import clear_all, set_highlight, set_border_color, prime_color_all
 from services.video import set_single, set_quad_14, ensure_map_cached
@@ -9,77 +11,74 @@ from services.startup import cold_boot_init  # uses your priming routine
 
 router = APIRouter(prefix="/api")
 
+# State-changing actions may also run as operations (202 + /api/ops/{id}); see routes/ops.py.
+
 @router.post("/one-single-two-quad14")
-def one_single_two_quad14():
+async def one_single_two_quad14(request: Request):
     """
     OUT1: single + audio follow + clear borders
     OUT2: quad mode 1 with inputs 1..4 mapped to windows 1..4
     """
-    try:
+    async def action():
         # OUT1 single + follow + clear borders
-        set_single(1)                   # put OUT1 in single (no specific src)
-        SER.send_set(C.cmd_audio_follow(1), delay=0.003)
-        clear_all(1)
+        await set_single(1)             # put OUT1 in single (no specific src)
+        await INTENTS.submit([C.cmd_audio_follow(1)])
+        await clear_all(1)
         CACHE.set("out1_audio", 0)      # 0 = follow
 
         # OUT2 quad with 1..4
-        set_quad_14(2)
+        await set_quad_14(2)
         return {"status": "ok"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return await run_action(request, "one_single_two_quad14", action)
 
 @router.post("/clear-borders/{out_num}")
-def clear_borders_route(out_num: int = FPath(..., ge=1, le=2)):
-    try:
-        clear_all(out_num)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    return {"status": "ok", "out": out_num, "cleared_windows": [1, 2, 3, 4]}
+async def clear_borders_route(request: Request, out_num: int = FPath(..., ge=1, le=2)):
+    async def action():
+        await clear_all(out_num)
+        return {"status": "ok", "out": out_num, "cleared_windows": [1, 2, 3, 4]}
+    return await run_action(request, "clear_borders", action, commits=False)
 
 @router.post("/clear-borders-both")
-def clear_borders_both():
-    try:
-        clear_all(1)
-        clear_all(2)
+async def clear_borders_both(request: Request):
+    async def action():
+        await clear_all(1)
+        await clear_all(2)
         return {"status": "ok", "cleared": {"out1": [1,2,3,4], "out2": [1,2,3,4]}}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return await run_action(request, "clear_borders_both", action, commits=False)
 
 @router.post("/outline-current-on-quad")
-def outline_current_on_quad():
+async def outline_current_on_quad(request: Request):
     """
     Outline the current 'featured' source on OUT2 (when OUT2 is in quad).
     If no featured is set yet, fall back to OUT1 single source if available.
     """
-    try:
+    async def action():
         if CACHE.get("out2_mode") != "quad":
             return {"status": "noop", "reason": "out2_not_quad"}
 
         src = CACHE.featured_source or CACHE.get("out1_src") or 1
-        mp = ensure_map_cached(2)
+        mp = await ensure_map_cached(2)
         win = next((w for w, s in mp.items() if s == src), None)
         if win:
             # Use new faster API: only toggle what changed
-            set_highlight(2, win, color=2)
-            CACHE.set("out2_border_window", win)
+            await set_highlight(2, win, color=2)
             return {"status": "ok", "out2_window": win, "src": src}
         return {"status": "noop", "reason": "src_not_in_out2_map", "src": src}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return await run_action(request, "outline_current_on_quad", action, commits=False)
 
 @router.get("/ping")
-def ping():
-    return {"reply": SER.send(b"r output 1 multiview!").decode(errors="ignore")}
+async def ping():
+    return {"reply": (await ASER.send(C.q_out_multiview(1))).decode(errors="ignore")}
 
 @router.get("/test-modes")
-def test_modes():
-    raw_mv = SER.send(C.q_out_multiview(2))
-    raw_qm = SER.send(C.term("r output 2 quad mode"))
+async def test_modes():
+    raw_mv = await ASER.send(C.q_out_multiview(2))
+    raw_qm = await ASER.send(C.q_out_quad_mode(2))
     return {"multiview_raw": repr(raw_mv), "quadmode_raw": repr(raw_qm)}
 
 # --------- Manual priming endpoint ---------
 @router.post("/init")
-def manual_init():
+async def manual_init(request: Request):
     """
     Manually prime the matrix:
       - OUT1 single + audio follow
@@ -88,22 +87,21 @@ def manual_init():
       - Prime border color to all windows (and hide borders)
     Safe to re-run (e.g., after power-cycling the matrix).
     """
-    try:
-        cold_boot_init()
+    async def action():
+        await cold_boot_init()
         return {"status": "ok", "primed": True}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return await run_action(request, "init", action)
 
 # --------- Optional: set border color via API (future UI) ---------
 @router.post("/border-color/{out_num}/{color}")
-def set_border_color_route(out_num: int = FPath(..., ge=1, le=2), color: int = FPath(..., ge=1, le=7)):
+async def set_border_color_route(request: Request, out_num: int = FPath(..., ge=1, le=2),
+                                 color: int = FPath(..., ge=1, le=7)):
     """
     Set the 'armed' border color for an output and prime it on all windows.
     If a window is currently highlighted, recolor just that window.
     """
-    try:
-        set_border_color(out_num, color)
-        prime_color_all(out_num, color)
+    async def action():
+        await set_border_color(out_num, color)
+        await prime_color_all(out_num, color)
         return {"status": "ok", "out": out_num, "color": color}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return await run_action(request, "border_color", action, commits=False)
@@ -0,0 +1,50 @@
+# routes/ops.py
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse
+from routes.errors import http_error
+from services.ops import OPS
+
+router = APIRouter(prefix="/api/ops")
+
+WAIT_MAX = 30.0  # longest ?wait= a client may hold a request open
+
+def wants_async(request: Request) -> bool:
+    """Client opted in: 'Prefer: respond-async' (RFC 7240) or ?async=true."""
+    if "respond-async" in request.headers.get("prefer", "").lower():
+        return True
+    return request.query_params.get("async", "").lower() in ("1", "true", "yes")
+
+async def run_action(request: Request, name: str, action, commits: bool = True):
+    """
+    Run an action route's body (a no-argument coroutine function returning the
+    response dict). Default: await it, errors mapped by http_error. Async
+    mode: start it as an operation and answer 202 as soon as its target is
+    committed to the cache (services/ops.py); the commands go out behind it,
+    and /api/ops/{id} (or an 'op' event on /api/events) tells how it ended.
+    commits=False for actions that only update the cache after sending
+    (borders): those answer 202 right away.
+    """
+    if not wants_async(request):
+        try:
+            return await action()
+        except Exception as e:
+            raise http_error(e)
+    op = await OPS.start(name, action, commits=commits)
+    href = f"/api/ops/{op.id}"
+    return JSONResponse(status_code=202, headers={"Location": href, "Preference-Applied": "respond-async"},
+                        content={"status": "accepted", "op": op.id, "href": href})
+
+@router.get("")
+async def list_ops():
+    """Recent operations, newest first."""
+    return {"ops": [op.info() for op in reversed(OPS.ops.values())]}
+
+@router.get("/{op_id}")
+async def get_op(op_id: str, wait: float = 0.0):
+    """State of one operation; ?wait=<s> holds the request until it finishes (at most WAIT_MAX)."""
+    op = OPS.get(op_id)
+    if op is None:
+        raise HTTPException(status_code=404, detail=f"unknown operation {op_id!r}")
+    if wait > 0 and op.finished is None:
+        await OPS.wait(op, min(wait, WAIT_MAX))
+    return op.info()
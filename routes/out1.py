@@ -1,87 +1,85 @@
-from fastapi import APIRouter, HTTPException, Path as FPath
+from fastapi import APIRouter, Path as FPath, Request
+from routes.ops import run_action
 import vendor.commands as C
 from services.state_cache import CACHE
 from services.featured import ensure_featured_applied
 from services.video import set_quad_14
 from services.video import set_single
 from services.audio import set_follow
-from services.serial_io import SER
 
 router = APIRouter(prefix="/api/out1")
 
+# Each action may also run as an operation (202 + /api/ops/{id}); see routes/ops.py.
+
+async def _quad14():
+    remembered_hdmi = CACHE.get("out1_src")
+
+    # Switch hardware to quad and map 1..4
+    await set_quad_14(1)
+
+    # If we have a remembered single source, carry that over as featured
+    if remembered_hdmi in (1, 2, 3, 4):
+        CACHE.featured_source = remembered_hdmi
+
+    # Apply audio-first, then borders
+    await ensure_featured_applied()
+    return {"status": "ok", "remembered_hdmi": remembered_hdmi, "featured": CACHE.featured_source}
+
 @router.post("/quad14")
-def out1_quad14():
+async def out1_quad14(request: Request):
     """
     OUT1 -> Quad mode 1 (1→1..4). If coming from SINGLE, keep listening to the same HDMI,
     and mark that window with a RED border (audio first, borders next).
     """
-    try:
-        remembered_hdmi = CACHE.get("out1_src")
-
-        # Switch hardware to quad and map 1..4
-        set_quad_14(1)
-
-        # If we have a remembered single source, carry that over as featured
-        if remembered_hdmi in (1, 2, 3, 4):
-            CACHE.featured_source = remembered_hdmi
-
-        # Apply audio-first, then borders
-        ensure_featured_applied()
-        return {"status": "ok", "remembered_hdmi": remembered_hdmi, "featured": CACHE.featured_source}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return await run_action(request, "out1.quad14", _quad14)
 
 @router.post("/select/{src}")
-def out1_select(src: int = FPath(..., ge=1, le=4)):
+async def out1_select(request: Request, src: int = FPath(..., ge=1, le=4)):
     """
     Set Featured Source to {src} and apply it.
     SINGLE: route OUT1 to src + audio follow + clear borders.
     QUAD:   set audio to src; outline the window with src on OUT1 (+ mirror to OUT2 if quad).
     """
-    try:
+    async def action():
         CACHE.featured_source = src
-        ensure_featured_applied()
+        await ensure_featured_applied()
         mode = CACHE.get("out1_mode")
         return {"status": "ok", "featured": src, "mode": mode}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return await run_action(request, "out1.select", action)
 
 @router.post("/single-from-current-audio")
-def out1_single_from_current_audio():
+async def out1_single_from_current_audio(request: Request):
     """
     Switch OUT1 to single using the last audio source we selected while in quad.
     Clears OUT1 borders. If cache missing, fall back to HDMI 1.
     """
-    try:
+    async def action():
         audio_hdmi = CACHE.get("out1_audio") or 1
         # Set intent and re-use your orchestrator (audio-first)
         CACHE.featured_source = audio_hdmi
-        CACHE.set("out1_mode", "single")
-        ensure_featured_applied()
+        await ensure_featured_applied(mode="single")  # the planner sends "multiview 1" if needed
         return {"status": "ok", "out": 1, "src": audio_hdmi}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return await run_action(request, "out1.single_from_current_audio", action)
 
 # Optional: explicit mode endpoints if you want to call them (not used by index.html)
 @router.post("/mode/single/{src}")
-def set_mode_single_with_src(src: int):
-    # 1. Route OUT1 video to this HDMI in single mode
-    set_single(1, src)
+async def set_mode_single_with_src(request: Request, src: int):
+    async def action():
+        # 1. Route OUT1 video to this HDMI in single mode
+        await set_single(1, src)
 
-    # 2. Set audio follow (single-mode spec)
-    set_follow(1)
+        # 2. Set audio follow (single-mode spec)
+        await set_follow(1)
 
-    # 3. Mark featured source
-    CACHE.featured_source = src
+        # 3. Mark featured source
+        CACHE.featured_source = src
 
-    # 4. Apply logic (updates borders, mirrors to OUT2, etc.)
-    ensure_featured_applied()
+        # 4. Apply logic (updates borders, mirrors to OUT2, etc.)
+        await ensure_featured_applied()
 
-    return {"status": "ok", "out1_mode": "single", "featured": src}
+        return {"status": "ok", "out1_mode": "single", "featured": src}
+    return await run_action(request, "out1.mode_single", action)
 
 @router.post("/mode/quad")
-def set_mode_quad():
-    try:
-        return out1_quad14()  # hardware switch + apply featured
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+async def set_mode_quad(request: Request):
+    return await run_action(request, "out1.mode_quad", _quad14)  # hardware switch + apply featured
@@ -0,0 +1,33 @@
+# routes/pacing.py
+from fastapi import APIRouter
+from routes.errors import http_error
+from services.pacing import calibrate
+from services.serial_io import ASER
+from serial_driver import MOCK
+
+router = APIRouter(prefix="/api/pacing")
+
+@router.get("")
+async def get_pacing():
+    """Per-class chunk gaps in use, the calibrated floor under them and dropped-command counts."""
+    return ASER.pacing.as_dict()
+
+@router.post("/calibrate")
+async def run_calibration():
+    """
+    Measure the smallest safe gap per command class with test bursts + readback
+    (takes tens of seconds; outputs flicker meanwhile) and save it for this device.
+    """
+    if MOCK:
+        return {"status": "skipped", "reason": "mock serial", **ASER.pacing.as_dict()}
+    try:
+        r = await calibrate()
+    except Exception as e:
+        raise http_error(e)
+    return {"status": "ok", **r, "profile": ASER.pacing.as_dict()}
+
+@router.post("/reset")
+async def reset_pacing():
+    """Back to the built-in default gaps."""
+    ASER.pacing.reset()
+    return {"status": "ok", **ASER.pacing.as_dict()}
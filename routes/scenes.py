@@ -0,0 +1,56 @@
+# routes/scenes.py
+from fastapi import APIRouter, HTTPException
+from routes.desired import to_target
+from routes.errors import http_error
+from domain.models import Scene
+from services.reconcile import describe
+from services.scenes import SCENES
+
+router = APIRouter(prefix="/api/scenes")
+
+def _known(name: str):
+    if name not in SCENES.scenes:
+        raise HTTPException(status_code=404, detail=f"unknown scene {name!r}")
+
+@router.get("")
+async def list_scenes():
+    """Every stored scene with its compiled size and recall stats."""
+    return {"scenes": [SCENES.info(n) for n in sorted(SCENES.scenes)]}
+
+@router.get("/{name}")
+async def get_scene(name: str):
+    _known(name)
+    info = SCENES.info(name)
+    info["plan"] = describe(SCENES.compiled(name).steps)
+    return info
+
+@router.put("/{name}")
+async def put_scene(name: str, body: Scene):
+    """Create or replace a scene; it is recompiled now and saved to SCENES_FILE."""
+    try:
+        return SCENES.put(name, to_target(body), body.description)
+    except OSError as e:
+        raise http_error(e)
+
+@router.delete("/{name}")
+async def delete_scene(name: str):
+    _known(name)
+    try:
+        SCENES.delete(name)
+    except OSError as e:
+        raise http_error(e)
+    return {"status": "ok", "deleted": name}
+
+@router.post("/{name}/recall")
+async def recall_scene(name: str, force: bool = False, dry_run: bool = False):
+    """
+    Switch to a scene in one burst. Only what differs from the cache is sent
+    unless the cache doesn't know the outputs yet or force=true (full plan).
+    """
+    _known(name)
+    try:
+        r = await SCENES.recall(name, force=force, dry_run=dry_run)
+    except Exception as e:
+        raise http_error(e)
+    return {"status": "ok", "scene": name, "dry_run": dry_run, "kind": r["kind"],
+            "count": len(r["steps"]), "elapsed_ms": r["elapsed_ms"], "plan": describe(r["steps"])}
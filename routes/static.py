@@ -0,0 +1,30 @@
+# routes/static.py
+from fastapi import APIRouter, HTTPException, Request, Response
+from routes.ui import etag_matches
+from services.assets import ASSETS
+
+router = APIRouter()
+
+# Frontend straight from memory (services/assets.py): hashed names are
+# immutable, the shell at / revalidates with a strong ETag per encoding.
+
+def _serve(request: Request, url: str) -> Response:
+    hit = ASSETS.get(url)
+    if hit is None:
+        raise HTTPException(status_code=404, detail="not found")
+    asset, cache_control = hit
+    enc = asset.negotiate(request.headers.get("accept-encoding", ""))
+    headers = {"ETag": asset.etag(enc), "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    if enc != "identity":
+        headers["Content-Encoding"] = enc
+    return Response(asset.bodies[enc], media_type=asset.media_type, headers=headers)
+
+@router.get("/", include_in_schema=False)
+async def index(request: Request):
+    return _serve(request, "/")
+
+@router.get("/static/{name}", include_in_schema=False)
+async def static_file(request: Request, name: str):
+    return _serve(request, f"/static/{name}")
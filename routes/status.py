@@ -1,52 +1,117 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse, PlainTextResponse
+from routes.errors import http_error
 import vendor.commands as C
-from services.serial_io import SER
+from services.serial_io import ASER
 from services.state_cache import CACHE
-from services.video import ensure_map_cached
+from services.video import ensure_maps_cached
+from services.pacing import check_readback
+from services.persist import SNAPSHOT
+from services.verify import VERIFIER
+from services.devices import REGISTRY
+from serial_metrics import render_all
+from serial_sched import priority
 
 router = APIRouter(prefix="/api")
 
+@router.get("/health")
+async def health():
+    """Link lifecycle (connecting / syncing / ready / degraded); 503 until ready."""
+    h = ASER.health()
+    return JSONResponse(h, status_code=200 if h["ready"] else 503)
+
 @router.get("/status")
-def status():
-    if SER is None:
-        return {"connected": False, "responsive": False, "power": "unknown"}
-    return SER.status_snapshot()
+async def status():
+    """Cached power probe; while the link isn't up it reports the link state instead (no query)."""
+    return await ASER.status_snapshot()
 
-@router.post("/refresh-state")
-def refresh_state():
-    """
-    Refresh a few bits of state we care about: OUT1 mode, OUT1 single source,
-    and OUT2 mode. Populate window maps on demand (quad only).
-    """
-    try:
-        # OUT1 mode
-        mv1 = SER.send(C.q_out_multiview(1))
-        m1 = C.parse_multiview_mode(mv1)
-        CACHE.set("out1_mode", "single" if m1 == 1 else ("quad" if m1 == 5 else "other"))
+@router.get("/serial-stats")
+async def serial_stats():
+    """Burst-mode counters: commands packed, writes/flushes saved overall and for the last burst."""
+    return ASER.sync.burst_stats
+
+@router.get("/metrics")
+async def metrics():
+    """Serial-layer counters and latency histograms in Prometheus text format, every device."""
+    entries = [({"device": d.id}, d.aser.metrics, d.aser.state) for d in REGISTRY]
+    return PlainTextResponse(render_all(entries), media_type="text/plain; version=0.0.4")
+
+@router.get("/cache-info")
+async def cache_info():
+    """Per-key age and confidence: live, restored (from disk, unchecked) or verified."""
+    return SNAPSHOT.info()
+
+@router.get("/verify-stats")
+async def verify_stats():
+    """Background write verification: readbacks matched / repaired / diverged, and the latest mismatches."""
+    return VERIFIER.info()
 
-        # If quad, cache quad layout + map
+def _mode_name(mv: int | None) -> str | None:
+    """Multiview number -> cached mode name; None if the reply didn't say."""
+    if mv is None:
+        return None
+    return "single" if mv == 1 else ("quad" if mv == 5 else "other")
+
+async def _refresh():
+    """Read OUT1/OUT2 mode and OUT1 source back into the cache (plus window maps if in quad)."""
+    # background class: a source change clicked meanwhile goes first
+    with priority("background"):
+        # One pipelined batch: OUT1 mode + quad layout + source, OUT2 quad mode.
+        # (Out of quad, the quad-mode query just answers with the multiview mode.)
+        mv1, qm1, rep, qm2 = await ASER.send_pipelined([
+            C.q_out_multiview(1), C.q_out_quad_mode(1), C.q_out_in_source(1), C.q_out_quad_mode(2),
+        ])
+
+        # OUT1 mode
+        # (each readback is first checked against a recent write: a mismatch = dropped command)
+        mode1 = _mode_name(C.parse_multiview_mode(mv1))
+        check_readback(1, "mode", mode1)
+        CACHE.set("out1_mode", mode1 or "other")
         if CACHE.get("out1_mode") == "quad":
-            qm1 = SER.send(C.q_out_quad_mode(1))
-            qnum1 = C.parse_quad_mode_number(qm1) or 1
-            CACHE.set("out1_quad_layout", qnum1)
-            ensure_map_cached(1)
+            CACHE.set("out1_quad_layout", C.parse_quad_mode_number(qm1) or 1)
 
         # OUT1 current source (for single mode)
-        rep = SER.send(C.q_out_in_source(1))
         hdmi = C.parse_hdmi_number(rep)
         if hdmi:
+            check_readback(1, "src", hdmi)
             CACHE.set("out1_src", hdmi)
 
-        # OUT2 mode
-        qm2 = SER.send(C.q_out_quad_mode(2))
-        if C.is_quad_from_quadmode(qm2):
+        # OUT2 mode (one scan of the reply for both facts). Out of quad the reply
+        # names the multiview mode; if it doesn't, all we know is "not quad".
+        q2 = C.parse_reply(qm2)
+        mode2 = "quad" if q2.quad else _mode_name(q2.mode)
+        check_readback(2, "mode", mode2)
+        if mode2 == "quad":
+            check_readback(2, "quad_layout", q2.layout or 1)
             CACHE.set("out2_mode", "quad")
-            qnum2 = C.parse_quad_mode_number(qm2) or 1
-            CACHE.set("out2_quad_layout", qnum2)
-            ensure_map_cached(2)
-        else:
+            CACHE.set("out2_quad_layout", q2.layout or 1)
+        elif mode2 is not None:
+            CACHE.set("out2_mode", mode2)
+        elif CACHE.get("out2_mode") in (None, "quad"):
             CACHE.set("out2_mode", "other")
 
-        return {"status": "ok", "cache": CACHE.data}
+        # Window maps for whichever outputs are in quad, in a second batch
+        quad = [n for n in (1, 2) if CACHE.get(f"out{n}_mode") == "quad"]
+        if quad:
+            await ensure_maps_cached(*quad)
+
+@router.post("/refresh-state")
+async def refresh_state(since: int | None = None):
+    """
+    Refresh a few bits of state we care about: OUT1 mode, OUT1 single source,
+    and OUT2 mode. Populate window maps on demand (quad only).
+    With ?since=<version> only the cache keys changed after it are returned.
+    Concurrent calls share one in-flight refresh (ASER.flights) instead of
+    each running the whole query sequence.
+    """
+    try:
+        await ASER.flights.run("refresh", _refresh)
+
+        changed = CACHE.changed_since(since) if since is not None else None
+        if changed:
+            changed.discard("featured_source")  # a property, not part of CACHE.data
+        if changed is None or any(c not in CACHE.data for c in changed):  # unknown or cleared keys
+            return {"status": "ok", "version": CACHE.version, "cache": CACHE.data}
+        return {"status": "ok", "version": CACHE.version, "changes": {k: CACHE.data[k] for k in changed}}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise http_error(e)
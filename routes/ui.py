@@ -1,6 +1,11 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request, Response
+from fastapi.responses import JSONResponse
 from services.state_cache import CACHE
+from services.ui_state import ui_snapshot, ui_keys_for
 from services.featured import ensure_featured_applied
+from services.video import set_single, set_quad_14
+from services.audio import set_follow
+import services.borders as borders
 
 
 router = APIRouter()
@@ -17,66 +22,66 @@ def _derive_featured(d: dict) -> int:
     else:  # quad
         return d.get("out1_audio") or (CACHE.featured_source or 1)
 
-@router.get("/api/ui")
-def read_ui_state():
-    d = CACHE.data or {}
-
-    out1_mode = d.get("out1_mode", "single")
-    out1_map  = d.get("out1_map") or {}
-    out1_src  = d.get("out1_src")
-
-    out2_mode = d.get("out2_mode")
-    out2_map  = d.get("out2_map") or {}
-    out2_layout = d.get("out2_quad_layout")
+def _etag() -> str:
+    return f'"{CACHE.version}"'
 
-    # Single global color id (default RED=2)
-    color_id = d.get("border_color_id", 2)
+def etag_matches(request: Request, etag: str) -> bool:
+    inm = request.headers.get("if-none-match")
+    if not inm:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in inm.split(",")]
+    return "*" in tags or etag in tags
 
-    # Keep featured consistent with current mode/routing
-    mode = out1_mode
-    if mode == "single":
-        featured = d.get("out1_src") or d.get("out1_audio") or (CACHE.featured_source or 1)
-    else:
-        featured = d.get("out1_audio") or (CACHE.featured_source or 1)
-    if featured != (CACHE.featured_source or None):
-        CACHE.featured_source = featured
-
-    return {
-        "out1_mode": out1_mode,
-        "out1_map": out1_map,
-        "out1_src": out1_src,
-        "featured_source": featured,
-        "border_color_id": color_id,
-        "out2_mode": out2_mode,
-        "out2_map": out2_map,
-        "out2_quad_layout": out2_layout,
-    }
+@router.get("/api/ui")
+async def read_ui_state(request: Request = None):
+    """
+    UI state with ETag = cache version; a poller sending If-None-Match gets an
+    empty 304 until something changes (no-cache makes browsers revalidate).
+    """
+    headers = {"Cache-Control": "no-cache"}
+    if request is not None and etag_matches(request, _etag()):
+        return Response(status_code=304, headers=dict(headers, ETag=_etag()))
+    body = ui_snapshot()  # may settle featured_source, so tag after building
+    return JSONResponse(body, headers=dict(headers, ETag=_etag()))
+
+@router.get("/api/ui/changes")
+async def read_ui_changes(since: int = 0):
+    """
+    UI keys that changed after version `since` (the last "version" or ETag the
+    client saw). "full": true means the journal didn't reach back that far and
+    "changes" holds the whole state.
+    """
+    snap = ui_snapshot()
+    changed = CACHE.changed_since(since)
+    keys = None if changed is None else ui_keys_for(changed)
+    if keys is None:
+        return {"version": CACHE.version, "full": True, "changes": snap}
+    return {"version": CACHE.version, "full": False, "changes": {k: snap[k] for k in keys}}
 
 @router.post("/api/reconcile-ui")
-def reconcile_ui():
+async def reconcile_ui():
     d = CACHE.data or {}
     featured = _derive_featured(d)
     CACHE.featured_source = featured
-    ensure_featured_applied()   # keeps your preferred ordering inside your service
+    await ensure_featured_applied()  # keeps your preferred ordering inside your service
     # return current UI state after reconciliation
-    return read_ui_state()
+    return await read_ui_state()
 
 @router.post("/api/init/full")
-def init_full():
+async def init_full():
     COLOR_ID_RED = 2  # single global palette id
 
     # 1) Store one global color id
-    d = CACHE.data or {}
-    d["border_color_id"] = COLOR_ID_RED
-    CACHE.data = d
+    CACHE.set("border_color_id", COLOR_ID_RED)
+    d = CACHE.data
 
     # 2) Prime that color on both outputs (pre-write color, borders hidden)
     try:
-        borders.prime_color_all(1, COLOR_ID_RED)
-        borders.prime_color_all(2, COLOR_ID_RED)
+        await borders.prime_color_all(1, COLOR_ID_RED)
+        await borders.prime_color_all(2, COLOR_ID_RED)
     except TypeError:
-        borders.prime_color_all(1)
-        borders.prime_color_all(2)
+        await borders.prime_color_all(1)
+        await borders.prime_color_all(2)
 
     # 3) Choose featured and set outputs (video/audio first, per your preference)
     mode = d.get("out1_mode", "single")
@@ -86,13 +91,13 @@ def init_full():
         featured = d.get("out1_audio") or (CACHE.featured_source or 1)
     CACHE.featured_source = featured
 
-    set_single(1, featured)   # video
-    set_follow(1)             # audio
-    set_quad_14(2)            # OUT2 quad 1..4
+    await set_single(1, featured, force=True)  # video
+    await set_follow(1)                        # audio
+    await set_quad_14(2, force=True)           # OUT2 quad 1..4
 
     # 4) Apply featured (borders/highlights)
-    ensure_featured_applied()
+    await ensure_featured_applied()
 
     # 5) Return updated snapshot
-    return read_ui_state()
+    return await read_ui_state()
 
@@ -0,0 +1,642 @@
+import asyncio
+import contextlib
+import os
+import time
+
+from vendor import codec as K
+from vendor import framing as F
+from serial_pacing import PacingProfile
+from serial_sched import CommandScheduler, SingleFlight, current_priority, priority
+from serial_driver import MatrixSerial, MOCK, AUTO_BAUD, BURST, BURST_MAX, PIPELINE, pack_burst
+
+RX_LIMIT = 4096
+# How long a request may queue while the link is still connecting/syncing
+READY_WAIT = float(os.getenv("READY_WAIT", "3.0"))
+
+# Link lifecycle: idle -> connecting -> syncing -> ready | degraded;
+# a lost port goes ready | degraded -> reconnecting -> connecting -> ...
+SETTLED = ("ready", "degraded")
+
+# Watchdog: how often the port is checked, how many empty replies in a row make
+# it suspect, and the reconnect backoff (doubling from MIN up to MAX seconds).
+WATCH_INTERVAL = 2.0
+EMPTY_LIMIT = 5
+RECONNECT_MIN = 0.5
+RECONNECT_MAX = float(os.getenv("RECONNECT_MAX", "30"))
+
+
+class DeviceNotReady(RuntimeError):
+    """The serial link is down or still coming up; callers should answer 503."""
+
+
+class AsyncMatrixSerial:
+    """
+    asyncio front-end for MatrixSerial.
+
+    The sync driver still owns open / warm-up / autosync. Once the port is open,
+    this class talks to the port fd directly: reads arrive through
+    loop.add_reader() into an rx buffer, writes go out with non-blocking
+    os.write(). Route handlers await I/O instead of parking a threadpool worker
+    on MatrixSerial._lock.
+
+    Platforms without a selectable fd (Windows COM ports) fall back to running
+    the sync calls in a worker thread, still serialized on the event loop so a
+    burst of clicks queues there rather than in the threadpool.
+
+    Access to the port goes through a CommandScheduler (serial_sched.py): one
+    command at a time, interactive sets before interactive queries before
+    background refreshes and health probes.
+
+    A watchdog task notices a lost port (I/O error, device node gone, port
+    closed, or EMPTY_LIMIT empty replies and no answer to a power probe) and
+    reconnects in the background with exponential backoff. Meanwhile callers
+    get DeviceNotReady after at most READY_WAIT, never a hung request.
+    """
+
+    def __init__(self, sync: MatrixSerial):
+        self.sync = sync
+        self._loop = None
+        self._sched = None
+        self._fd = None
+        self._rx = bytearray()
+        self._rx_event = None
+        self._status_cache = None
+        self._status_ts = 0.0
+        self.flights = SingleFlight(sync.metrics)  # coalesces concurrent status probes / refreshes
+        self.state = "idle"
+        self.state_since = time.time()
+        self.phases = {}       # startup phase -> seconds
+        self._settled = None   # set once state is ready/degraded
+        self._task = None
+        self._pipeline_ok = PIPELINE  # cleared if the firmware loses pipelined replies
+        self.metrics = sync.metrics  # one set of counters per device, whichever path ran
+        self.pacing = PacingProfile()  # replaced by the device's saved profile (services/devices.py)
+        self.metrics.pacing = self.pacing
+        self.on_written = []   # fn(payloads) after set commands leave (services/verify.py)
+        self._watch_task = None
+        self._watch_wake = None
+        self._recovery = None
+        self._empty_run = 0    # empty replies in a row
+        self.outage = {"losses": 0, "attempts": 0, "reason": None, "lost_at": None,
+                       "last_outage_s": None, "last_reconnect_s": None}
+
+    # ---------------- lifecycle ----------------
+
+    def _set_state(self, state: str):
+        self.state = state
+        self.state_since = time.time()
+        print(f"[SERIAL] {self.sync.port} link {state}")
+        if self._settled is not None:
+            if state in SETTLED:
+                self._settled.set()
+            else:
+                self._settled.clear()
+
+    def start(self):
+        """Open + warm up + autosync in the background; the HTTP server doesn't wait."""
+        self._bind_loop()
+        if self._task is None or self._task.done():
+            if not MOCK:
+                self._set_state("connecting")  # before the task runs, so early callers queue
+            self._task = self._loop.create_task(self._connect())
+        if not MOCK and (self._watch_task is None or self._watch_task.done()):
+            self._watch_task = self._loop.create_task(self._watchdog())
+        return self._task
+
+    async def _connect(self):
+        if MOCK:
+            self._set_state("ready")
+            return
+        if self.phases:
+            self.metrics.inc("reconnects")  # not the first connect of this process
+        self.phases = {}
+        self._pipeline_ok = PIPELINE  # give pipelining another chance after a reconnect
+        self._detach()  # warm-up/autosync may reopen the port -> new fd
+        t0 = time.monotonic()
+        replied = False
+        if self.sync.link.known or self.sync.link.load():
+            # the way this port came up last time, confirmed with one probe
+            replied = await asyncio.to_thread(self.sync.open_known)
+            self.phases["profile"] = round(time.monotonic() - t0, 3)
+
+        if not replied:
+            t1 = time.monotonic()
+            replied = await asyncio.to_thread(self.sync._open_warm)
+            self.phases["open_warm"] = round(time.monotonic() - t1, 3)
+
+            if AUTO_BAUD and self._connected():
+                self._set_state("syncing")
+                t1 = time.monotonic()
+                replied = await asyncio.to_thread(self.sync.sync_link)
+                self.phases["autosync"] = round(time.monotonic() - t1, 3)
+                if replied:
+                    await asyncio.to_thread(self.sync.remember_link)
+
+        self.phases["total"] = round(time.monotonic() - t0, 3)
+        self._detach()
+        print(f"[SERIAL] {self.sync.port} connect: " + ", ".join(f"{k} {v * 1000:.0f} ms" for k, v in self.phases.items()))
+        self._set_state("ready" if (self._connected() and replied) else "degraded")
+
+    async def wait_ready(self, timeout: float = READY_WAIT):
+        """
+        Queue until the link settles (bounded by timeout), then fail fast if
+        the port still isn't open. A degraded-but-open port is let through.
+        """
+        self._bind_loop()
+        if self.state not in SETTLED and self.state != "idle":
+            try:
+                await asyncio.wait_for(self._settled.wait(), timeout)
+            except asyncio.TimeoutError:
+                raise DeviceNotReady(f"serial link {self.state}; not ready after {timeout:.1f}s")
+        if not self._connected():
+            raise DeviceNotReady(f"serial not open (link {self.state})")
+
+    # ---------------- watchdog ----------------
+
+    def _node_gone(self) -> bool:
+        """The device node vanished (USB adapter unplugged). Only knowable for /dev paths."""
+        port = self.sync.port or ""
+        return port.startswith("/dev/") and not os.path.exists(port)
+
+    def _link_lost(self, reason: str):
+        """Hand the port to the recovery task (once per outage)."""
+        if self._recovery is not None and not self._recovery.done():
+            return
+        print(f"[SERIAL] {self.sync.port} link lost: {reason}")
+        self.outage.update(losses=self.outage["losses"] + 1, reason=reason, lost_at=time.time())
+        self.metrics.inc("link_losses")
+        self._empty_run = 0
+        self._detach()
+        self._set_state("reconnecting")
+        self._recovery = self._loop.create_task(self._recover())
+
+    async def _watchdog(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._watch_wake.wait(), WATCH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._watch_wake.clear()
+            if self.state not in SETTLED:
+                continue  # still (re)connecting
+            if self._node_gone():
+                self._link_lost("device node disappeared")
+            elif not self._connected():
+                self._link_lost("port closed")
+            elif self.state == "ready" and self._empty_run >= EMPTY_LIMIT:
+                try:
+                    with priority("health"):
+                        rep = await self.send(K.POWER_Q)
+                except DeviceNotReady:
+                    continue  # the probe itself hit an I/O error: already reconnecting
+                if rep:
+                    self._empty_run = 0
+                else:
+                    self._link_lost(f"{EMPTY_LIMIT} empty replies in a row, no answer to a power probe")
+
+    async def _recover(self):
+        """Reopen until the port is back, backing off RECONNECT_MIN .. RECONNECT_MAX."""
+        t_lost = time.monotonic()
+        delay = RECONNECT_MIN
+        while True:
+            await asyncio.sleep(delay)
+            delay = min(RECONNECT_MAX, delay * 2)
+            if self._node_gone():
+                continue  # nothing to open yet; keep waiting for the adapter to come back
+            self.outage["attempts"] += 1
+            self.metrics.inc("reconnect_attempts")
+            await asyncio.to_thread(self.sync.close)
+            try:
+                await self._connect()
+            except Exception as e:
+                print(f"[SERIAL] reconnect failed: {e}")
+            if self._connected():
+                break
+            self._set_state("reconnecting")
+        outage = time.monotonic() - t_lost
+        self.outage.update(last_outage_s=round(outage, 3), last_reconnect_s=self.phases.get("total"))
+        self.metrics.outage_seconds += outage
+        print(f"[SERIAL] {self.sync.port} back after {outage:.1f}s (link {self.state})")
+
+    def _note_reply(self, rep: bytes):
+        if rep:
+            self._empty_run = 0
+            if self.state == "degraded" and self._connected():
+                self._set_state("ready")  # the matrix answers again (e.g. it was switched off at connect)
+            return
+        self._empty_run += 1
+        if self._empty_run == EMPTY_LIMIT and self._watch_wake is not None:
+            self._watch_wake.set()
+
+    def health(self) -> dict:
+        down = self.outage["lost_at"] if self.state == "reconnecting" else None
+        return {
+            "state": self.state,
+            "ready": self.state == "ready" or (self.state == "idle" and self._connected()),
+            "connected": self._connected(),
+            "since": round(time.time() - self.state_since, 1),
+            "startup_phases": self.phases,
+            "link_profile": self.sync.link.as_dict() if self.sync.link.known else None,
+            "queues": dict(self._sched.depth) if self._sched else {},
+            "outage": dict(self.outage, down_for=round(time.time() - down, 1) if down else None),
+        }
+
+    @property
+    def io_stats(self) -> dict:
+        """Running totals (bench/actions.py diffs these around each action)."""
+        m = self.metrics
+        c = m.counters
+        return {"queries": c["queries"], "sets": c["sets"], "bytes_out": c["bytes_out"],
+                "bytes_in": c["bytes_in"], "lock_wait": m.lock_seconds(m.lock_wait),
+                "lock_hold": m.lock_seconds(m.lock_hold), "sleep": m.sleep_seconds}
+
+    # ---------------- attach / detach ----------------
+
+    def _connected(self) -> bool:
+        ser = self.sync.ser
+        return bool(ser and getattr(ser, "is_open", False))
+
+    def _bind_loop(self):
+        """(Re)create loop-bound primitives when called from a new event loop."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._detach()
+            self._loop = loop
+            self._sched = CommandScheduler()
+            self.metrics.scheduler = self._sched
+            self._rx_event = asyncio.Event()
+            self._watch_wake = asyncio.Event()
+            self._settled = asyncio.Event()
+            if self.state in SETTLED:
+                self._settled.set()
+        return loop
+
+    def _attach(self) -> bool:
+        """
+        Register the port fd with the running loop.
+        Returns False when no selectable fd is available (thread fallback).
+        """
+        loop = self._bind_loop()
+        if self._fd is not None:
+            return True
+        if os.name == "nt" or not self._connected():
+            return False
+        try:
+            fd = self.sync.ser.fileno()
+        except Exception:
+            return False
+        os.set_blocking(fd, False)
+        loop.add_reader(fd, self._on_readable)
+        self._fd = fd
+        return True
+
+    def _detach(self):
+        if self._fd is not None and self._loop is not None:
+            try:
+                self._loop.remove_reader(self._fd)
+            except Exception:
+                pass
+        self._fd = None
+        self._rx.clear()
+
+    def _on_readable(self):
+        try:
+            data = os.read(self._fd, 4096)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self._link_lost(f"read error: {e}")
+            return
+        if not data:
+            # EOF: device node went away; stop spinning on a dead fd
+            self._link_lost("port closed by peer")
+            return
+        self._rx += data
+        self.metrics.counters["bytes_in"] += len(data)
+        if len(self._rx) > RX_LIMIT:
+            # nobody is reading (set-only traffic); keep just the recent tail
+            del self._rx[:-RX_LIMIT]
+        self._rx_event.set()
+
+    # ---------------- low-level I/O ----------------
+
+    @contextlib.asynccontextmanager
+    async def _held(self, cls: str):
+        """
+        The port, granted by the scheduler in priority class cls; wait/hold
+        accounted per class. A port error while holding it starts a reconnect
+        and reaches the caller as DeviceNotReady (503), not a 500.
+        """
+        t0 = time.perf_counter()
+        await self._sched.acquire(cls)
+        t1 = time.perf_counter()
+        try:
+            yield
+        except OSError as e:
+            if isinstance(e, (TimeoutError, BlockingIOError)):
+                raise
+            self._link_lost(f"I/O error: {e}")
+            raise DeviceNotReady(f"serial link lost ({e}); reconnecting") from e
+        finally:
+            self._sched.release()
+            self.metrics.lock(cls, t1 - t0, time.perf_counter() - t1)
+
+    async def pause(self, seconds: float):
+        """asyncio.sleep for pacing gaps, counted in metrics.sleep_seconds."""
+        if seconds <= 0:
+            return
+        t0 = time.perf_counter()
+        await asyncio.sleep(seconds)
+        self.metrics.sleep_seconds += time.perf_counter() - t0
+
+    async def _writable(self):
+        fut = self._loop.create_future()
+        self._loop.add_writer(self._fd, fut.set_result, None)
+        try:
+            await fut
+        finally:
+            self._loop.remove_writer(self._fd)
+
+    async def _write(self, payload: bytes):
+        view = memoryview(payload)
+        while view:
+            try:
+                n = os.write(self._fd, view)
+            except BlockingIOError:
+                await self._writable()
+                continue
+            view = view[n:]
+        self.metrics.counters["bytes_out"] += len(payload)
+
+    def _wire_time(self, nbytes: int) -> float:
+        """Seconds the UART needs to shift out nbytes (8N1 = 10 bits/byte)."""
+        baud = getattr(self.sync.ser, "baudrate", 0) or 0
+        return (nbytes * 10.0 / baud) if baud else 0.0
+
+    async def _read_reply(self, spec, overall: float = 1.2, idle: float = 0.25) -> bytes:
+        """
+        Return as soon as the expected reply frame is buffered; the idle window
+        only ends the wait for replies framing doesn't know about.
+        """
+        loop = self._loop
+        overall_deadline = loop.time() + overall
+        idle_deadline = loop.time() + idle
+        while True:
+            if spec is not None:
+                frame = F.take_frame(self._rx, spec)
+                if frame is not None:
+                    return frame
+            wait = min(idle_deadline, overall_deadline) - loop.time()
+            if wait <= 0:
+                break
+            self._rx_event.clear()
+            try:
+                await asyncio.wait_for(self._rx_event.wait(), wait)
+            except asyncio.TimeoutError:
+                break
+            idle_deadline = loop.time() + idle
+        if loop.time() >= overall_deadline:
+            self.metrics.inc("timeouts")
+        if spec is not None:
+            self.metrics.inc("fallback_replies")
+        return F.drain(self._rx, spec)
+
+    # ---------------- send APIs ----------------
+
+    async def send(self, payload: bytes) -> bytes:
+        """Query with reply (async counterpart of MatrixSerial.send)."""
+        if MOCK:
+            print("[MOCK SEND]", payload)
+            await asyncio.sleep(0.05)
+            return b"OK"
+
+        await self.wait_ready()
+        cls = current_priority("interactive_query")
+
+        if not self._attach():
+            async with self._held(cls):
+                rep = await asyncio.to_thread(self.sync.send, payload)
+            self._note_reply(rep)
+            return rep
+
+        spec = F.reply_spec(payload)
+        m = self.metrics
+        async with self._held(cls):
+            t0 = time.perf_counter()
+            F.drop_complete_lines(self._rx)  # stale acks from earlier set commands
+            await self._write(payload)
+            rep = await self._read_reply(spec)
+            m.command("query", payload, time.perf_counter() - t0)
+        m.inc("queries")
+        if not rep:
+            m.inc("empty_replies")
+        self._note_reply(rep)
+        return rep
+
+    async def send_pipelined(self, payloads, overall: float = 1.2) -> list[bytes]:
+        """
+        Several queries in about one round trip: write up to BURST_MAX of them
+        back to back, then split the reply stream back into per-query replies
+        (vendor/framing.take_frames). Replies come back in payload order.
+
+        Goes one query at a time instead when a reply can't be framed, on the
+        thread fallback, or once the firmware has lost pipelined replies
+        (the missing ones are re-asked individually).
+        """
+        payloads = list(payloads)
+        if MOCK:
+            print("[MOCK SEND-PIPELINED]", payloads)
+            await asyncio.sleep(0.05)
+            return [b"OK"] * len(payloads)
+        if not payloads:
+            return []
+
+        await self.wait_ready()
+        specs = [F.reply_spec(p) for p in payloads]
+        if len(payloads) == 1 or not self._pipeline_ok or None in specs or not self._attach():
+            return [await self.send(p) for p in payloads]
+
+        out = [None] * len(payloads)
+        m = self.metrics
+        loop = self._loop
+        cls = current_priority("interactive_query")
+        step = max(1, BURST_MAX)
+        for start in range(0, len(payloads), step):
+            end = min(len(payloads), start + step)
+            chunk_specs, chunk_out = specs[start:end], [None] * (end - start)
+            # one chunk per grant: more urgent traffic can get in between chunks
+            async with self._held(cls):
+                F.drop_complete_lines(self._rx)  # stale acks from earlier set commands
+                t0 = time.perf_counter()
+                await self._write(b"".join(payloads[start:end]))
+                deadline = loop.time() + overall
+                while F.take_frames(self._rx, chunk_specs, chunk_out):
+                    wait = deadline - loop.time()
+                    if wait <= 0:
+                        break
+                    self._rx_event.clear()
+                    try:
+                        await asyncio.wait_for(self._rx_event.wait(), wait)
+                    except asyncio.TimeoutError:
+                        break
+                m.command("pipeline", b"pipeline", time.perf_counter() - t0)
+            out[start:end] = chunk_out
+            if None in chunk_out:
+                m.inc("timeouts")
+                break  # finish the rest one at a time
+        m.inc("queries", sum(1 for r in out if r is not None))
+        if any(out):
+            self._empty_run = 0
+
+        missing = [i for i, r in enumerate(out) if r is None]
+        if missing:
+            m.inc("pipeline_fallbacks")
+            if self._pipeline_ok:
+                print(f"[SERIAL] pipelined queries lost {len(missing)} replies; going one at a time")
+                self._pipeline_ok = False
+            for i in missing:
+                out[i] = await self.send(payloads[i])
+        return out
+
+    async def send_set(self, payload: bytes, delay: float | None = None) -> bytes:
+        """Fast path for 'set' commands (no readback). delay=None: the pacing profile's gap."""
+        if delay is None:
+            delay = self.pacing.gap_for([payload])
+        if MOCK:
+            print("[MOCK SEND-SET]", payload)
+            await asyncio.sleep(delay)
+            return b"OK"
+
+        await self.wait_ready()
+        cls = current_priority("interactive_set")
+
+        if not self._attach():
+            async with self._held(cls):
+                rep = await asyncio.to_thread(self.sync.send_set, payload, delay)
+            self._wrote([payload])
+            return rep
+
+        async with self._held(cls):
+            t0 = time.perf_counter()
+            await self._write(payload)
+            # stand-in for flush(): let the UART drain before the next writer
+            await self.pause(self._wire_time(len(payload)))
+            self.metrics.command("set", payload, time.perf_counter() - t0)
+        self.metrics.inc("sets")
+        self._wrote([payload])
+        await self.pause(delay)
+        return b""
+
+    def _wrote(self, payloads):
+        for fn in self.on_written:
+            fn(payloads)
+
+    async def send_many(self, payloads):
+        return [await self.send(p) for p in payloads]
+
+    async def send_many_set(self, payloads, delay_each: float | None = None, burst: bool = BURST):
+        if burst:
+            return await self.send_burst(payloads, gap=delay_each)
+        for p in payloads:
+            await self.send_set(p, delay_each)
+        return b""
+
+    async def send_burst(self, payloads, gap: float | None = None):
+        """Async counterpart of MatrixSerial.send_burst (one write per packed buffer)."""
+        payloads = list(payloads)
+        if not payloads:
+            return b""
+        await self.send_latest(lambda: payloads, gap)
+        return b"OK" if MOCK else b""
+
+    def _gaps(self, payloads, gap: float | None) -> list[float]:
+        """Pause after each BURST_MAX chunk: `gap` if given, else the slowest class in the chunk."""
+        step = max(1, BURST_MAX)
+        if gap is not None:
+            return [gap] * -(-len(payloads) // step)
+        return [self.pacing.gap_for(payloads[i:i + step]) for i in range(0, len(payloads), step)]
+
+    async def send_latest(self, take, gap: float | None = None) -> list[bytes]:
+        """
+        Burst whose commands are only decided once the port is granted: take()
+        is called under the grant and returns the payloads to write, so intents
+        queued meanwhile can still be replaced (services/intents.py).
+        gap=None paces each chunk from the device's pacing profile.
+        Returns the payloads that were sent.
+        """
+        if MOCK:
+            payloads = list(take())
+            if payloads:
+                bufs = pack_burst(payloads)
+                print("[MOCK SEND-BURST]", b"".join(bufs))
+                await asyncio.sleep(max(self._gaps(payloads, gap)))
+                self.sync._record_burst(len(payloads), len(bufs))
+            return payloads
+
+        await self.wait_ready()
+        cls = current_priority("interactive_set")
+
+        if not self._attach():
+            async with self._held(cls):
+                payloads = list(take())
+                if payloads:
+                    await asyncio.to_thread(self.sync.send_burst, payloads, max(self._gaps(payloads, gap)))
+            self._wrote(payloads)
+            return payloads
+
+        async with self._held(cls):
+            payloads = list(take())
+            if not payloads:
+                return payloads
+            bufs = pack_burst(payloads)
+            gaps = self._gaps(payloads, gap)
+            t0 = time.perf_counter()
+            for i, buf in enumerate(bufs):
+                if i:
+                    await self.pause(gaps[i - 1])
+                await self._write(buf)
+                await self.pause(self._wire_time(len(buf)))
+            self.metrics.command("burst", b"burst", time.perf_counter() - t0)
+        self.metrics.inc("sets", len(payloads))
+        self._wrote(payloads)
+        await self.pause(gaps[-1])
+        self.sync._record_burst(len(payloads), len(bufs))
+        return payloads
+
+    # ---------------- status snapshot (cached) ----------------
+
+    async def status_snapshot(self, min_interval: float = 0.8) -> dict:
+        loop = self._bind_loop()
+        now = loop.time()
+        if not self._connected() or self.state in ("connecting", "syncing", "reconnecting"):
+            # never queue a status probe behind startup; report the link state instead
+            snap = {"connected": self._connected(), "responsive": False, "power": "unknown", "link": self.state}
+            self._status_cache = snap
+            self._status_ts = now
+            return snap
+
+        if (now - self._status_ts) < min_interval and self._status_cache:
+            self.metrics.inc("status_cache_hits")
+            return self._status_cache
+
+        # callers arriving while a probe is out share its reply instead of queueing their own
+        return await self.flights.run("status", self._probe_status)
+
+    async def _probe_status(self) -> dict:
+        self.metrics.inc("status_cache_misses")
+        now = self._loop.time()
+        with priority(current_priority("health")):
+            rep = await self.send(K.POWER_Q)
+        power = K.parse_reply(rep).power or "unknown"
+
+        snap = {"connected": True, "responsive": bool(rep), "power": power, "link": self.state}
+        self._status_cache = snap
+        self._status_ts = now
+        return snap
+
+    def close(self):
+        for t in (self._watch_task, self._recovery):
+            if t is not None:
+                t.cancel()
+        self._detach()
+        self.sync.close()
@@ -2,6 +2,10 @@ import os
 import time
 import threading
 from dotenv import load_dotenv
+from vendor import codec as K
+from vendor import framing as F
+from serial_metrics import SerialMetrics
+from serial_link import LinkProfile, DEFAULT_PULSE
 
 load_dotenv()
 
@@ -9,22 +13,70 @@ PORT = os.getenv("SERIAL_PORT", "COM3")
 BAUD = int(os.getenv("BAUD", "115200"))
 MOCK = os.getenv("MOCK_SERIAL", "false").lower() == "true"
 AUTO_BAUD = os.getenv("AUTO_BAUD", "true").lower() == "true"
+# Burst mode: send_many_set packs a batch into one buffer / one write / one flush
+BURST = os.getenv("BURST_WRITES", "true").lower() == "true"
+# Max commands per burst write; larger batches are split with the gap in between
+# so the matrix's small RX buffer never overflows.
+BURST_MAX = int(os.getenv("BURST_MAX", "8"))
+# Pipelined queries: write up to BURST_MAX reads back to back and demux the replies
+PIPELINE = os.getenv("PIPELINE_QUERIES", "true").lower() == "true"
 
 # benign probe used for warm-up & autosync
-TEST_QUERY = b"r power!"
+TEST_QUERY = K.POWER_Q
+
+
+def pack_burst(payloads, max_cmds: int = BURST_MAX) -> list[bytearray]:
+    """
+    Concatenate commands into preallocated buffers of at most max_cmds each.
+    Every command already ends with '!', so the firmware frames them itself.
+    """
+    out = []
+    step = max(1, max_cmds)
+    for i in range(0, len(payloads), step):
+        group = payloads[i:i + step]
+        buf = bytearray(sum(len(p) for p in group))
+        pos = 0
+        for p in group:
+            buf[pos:pos + len(p)] = p
+            pos += len(p)
+        out.append(buf)
+    return out
 
 
 class MatrixSerial:
-    def __init__(self):
+    def __init__(self, autoconnect: bool = True, port: str = PORT, baud: int = BAUD):
+        """
+        autoconnect=False leaves the port closed; call connect() (or let
+        AsyncMatrixSerial.start() run it in the background) when ready.
+        port/baud default to SERIAL_PORT/BAUD (services/devices.py passes its own).
+        """
+        self.port = port
+        self.baud = baud
         self.ser = None
         self._lock = threading.Lock()
         self._status_cache = None
         self._status_ts = 0.0
+        self._status_lock = threading.Lock()  # one power probe at a time; the rest reuse it
+        self._rx = bytearray()  # bytes read past the last reply frame
+        # burst counters: writes/flushes we did NOT issue thanks to packing
+        self.burst_stats = {"bursts": 0, "commands": 0, "writes_saved": 0, "flushes_saved": 0, "last": None}
+        self.metrics = SerialMetrics()  # shared with AsyncMatrixSerial; rendered at /api/metrics
+        self.link = LinkProfile(port)   # how this port came up last time (serial_link.py)
+        self._ladder = {"hop_9600": False, "pulse": DEFAULT_PULSE, "latency": None}
 
         if MOCK:
             print("[MOCK] Serial disabled; logging commands")
             return
 
+        if autoconnect:
+            self.connect()
+
+    def connect(self) -> bool:
+        """Blocking open + warm-up + optional autosync. Returns True if the matrix replied."""
+        # Known port: open it the way that worked last time, one probe to confirm
+        if self.link.load() and self.open_known():
+            return True
+
         # Open with a warm-up sequence that mirrors your manual flip.
         ok = self._open_warm()
         if not ok:
@@ -32,21 +84,66 @@ class MatrixSerial:
 
         # Optional autosync pass (robust, but non-fatal if it fails)
         if AUTO_BAUD:
-            try:
-                if self._autosync():
-                    print("[SERIAL] Autosync OK")
-                else:
-                    print("[SERIAL] ⚠️ Autosync did not get a reply")
-            except Exception as e:
-                print(f"[SERIAL] ⚠️ Autosync error: {e}")
+            ok = self.sync_link()
+        if ok and AUTO_BAUD:
+            self.remember_link()
+        return ok
+
+    def open_known(self) -> bool:
+        """
+        Fast path: open the port as the saved link profile says and send one
+        probe. True = the matrix answered; False = the port is closed again and
+        the caller should run the full warm-up / autosync ladder.
+        """
+        p = self.link
+        try:
+            if p.hop_9600:
+                self._base_open(9600, p.pulse)
+                self._quick_probe(wait=0.1)
+                with self._lock:
+                    self.ser.baudrate = p.baud
+                self._pulse_lines(p.pulse)
+            else:
+                self._base_open(p.baud, p.pulse)
+            t0 = time.perf_counter()
+            rep = self._probe(p.probe_timeout())
+        except Exception as e:
+            print(f"[SERIAL] Saved link profile failed: {e}")
+            rep = b""
+        if rep:
+            p.update(p.baud, p.hop_9600, p.pulse, time.perf_counter() - t0)
+            print(f"[SERIAL] Link up from saved profile (@{p.baud}, reply in {p.latency * 1000:.0f} ms)")
+            return True
+        print("[SERIAL] Saved link profile got no reply; running full warm-up")
+        p.forget()  # stale: don't retry it on every reconnect; the ladder saves a new one
+        self.close()
+        return False
+
+    def remember_link(self):
+        """Save what the ladder needed, for open_known() next time."""
+        baud = getattr(self.ser, "baudrate", None) or self.baud
+        lad = self._ladder
+        self.link.update(baud, lad["hop_9600"], lad["pulse"], lad["latency"])
+
+    def sync_link(self) -> bool:
+        """Autosync pass; never raises."""
+        try:
+            if self._autosync():
+                print("[SERIAL] Autosync OK")
+                return True
+            print("[SERIAL] ⚠️ Autosync did not get a reply")
+        except Exception as e:
+            print(f"[SERIAL] ⚠️ Autosync error: {e}")
+        return False
 
     # ---------------- low-level open/close ----------------
 
-    def _base_open(self, baud: int):
+    def _base_open(self, baud: int, pulse: float = DEFAULT_PULSE):
         import serial
-        print(f"[SERIAL] Opening {PORT} @ {baud} 8N1")
-        self.ser = serial.Serial(
-            PORT,
+        print(f"[SERIAL] Opening {self.port} @ {baud} 8N1")
+        # serial_for_url: plain device names as before, plus socket:// (sim/uhd402mv.py)
+        self.ser = serial.serial_for_url(
+            self.port,
             baud,
             timeout=1.0,
             write_timeout=1.0,
@@ -57,18 +154,20 @@ class MatrixSerial:
             dsrdtr=False,
             xonxoff=False,
         )
-        self._pulse_lines(0.03)
+        self._rx.clear()
+        self._pulse_lines(pulse)
         print("[SERIAL] Opened")
 
     def _open_warm(self) -> bool:
         """
-        1) Try target BAUD.
+        1) Try target baud.
         2) If that fails, open @9600, send a quick probe, then switch the SAME handle
-           to target BAUD and probe again. Never raise; always return True/False.
+           to target baud and probe again. Never raise; always return True/False.
         """
         import serial
+        self._ladder = {"hop_9600": False, "pulse": DEFAULT_PULSE, "latency": None}
         try:
-            self._base_open(BAUD)
+            self._base_open(self.baud)
             # quick non-fatal probe
             _ = self._quick_probe(wait=0.20)
             return True
@@ -87,6 +186,7 @@ class MatrixSerial:
                 return False
 
         # At 9600: nudge, then flip baudrate on the same handle
+        self._ladder["hop_9600"] = True
         got_reply_9600 = False
         try:
             _ = self._quick_probe(wait=0.25)
@@ -96,7 +196,7 @@ class MatrixSerial:
 
         try:
             with self._lock:
-                self.ser.baudrate = BAUD
+                self.ser.baudrate = self.baud
             time.sleep(0.15)
             self._pulse_lines(0.03)
         except Exception as e:
@@ -105,10 +205,10 @@ class MatrixSerial:
         # Confirm at target baud (non-fatal)
         try:
             _ = self._quick_probe(wait=0.25)
-            print(f"[SERIAL] Warm-up flip to {BAUD} complete (9600 reply={got_reply_9600})")
+            print(f"[SERIAL] Warm-up flip to {self.baud} complete (9600 reply={got_reply_9600})")
             return True
         except Exception as e:
-            print(f"[SERIAL] (warn) no reply after flip to {BAUD}: {e}")
+            print(f"[SERIAL] (warn) no reply after flip to {self.baud}: {e}")
             return False
 
     def _reopen(self, baud: int):
@@ -137,9 +237,6 @@ class MatrixSerial:
 
     # ---------------- helpers / probes ----------------
 
-    def _term(self, s: str) -> bytes:
-        return (s.strip() + "!").encode("ascii")
-
     def _quick_probe(self, wait: float = 0.15) -> bytes:
         """Short write/read used only during open/warmup. Raises on port problems."""
         with self._lock:
@@ -153,8 +250,24 @@ class MatrixSerial:
             return self.ser.read_all()
 
     def _query_power(self) -> bytes:
-        """Robust power read using the full send/read loop."""
-        return self.send(self._term("r power"))
+        """Robust power read using the full send/read loop (round trip kept for the link profile)."""
+        t0 = time.perf_counter()
+        rep = self.send(TEST_QUERY)
+        if rep:
+            self._ladder["latency"] = time.perf_counter() - t0
+        return rep
+
+    def _probe(self, timeout: float) -> bytes:
+        """One framed power query, returning as soon as the reply line is in."""
+        with self._lock:
+            self._rx.clear()
+            try:
+                self.ser.reset_input_buffer()
+            except Exception:
+                pass
+            self.ser.write(TEST_QUERY)
+            self.ser.flush()
+            return self._read_frame(F.reply_spec(TEST_QUERY), overall=timeout, idle=timeout)
 
     # ---------------- autosync (non-fatal) ----------------
 
@@ -168,13 +281,15 @@ class MatrixSerial:
         rep = self._query_power()
         if rep:
             print("[SERIAL] 9600 replied; switching back to high baud")
-            self._reopen(BAUD)
+            self._ladder["hop_9600"] = True
+            self._reopen(self.baud)
             rep2 = self._query_power()
             return bool(rep2)
 
         print("[SERIAL] Final attempt with DTR/RTS pulse at configured baud…")
-        self._reopen(BAUD)
+        self._reopen(self.baud)
         self._pulse_lines(0.05)
+        self._ladder["pulse"] = 0.05
         rep3 = self._query_power()
         return bool(rep3)
 
@@ -190,28 +305,39 @@ class MatrixSerial:
             return snap
 
         if (now - self._status_ts) < min_interval and self._status_cache:
+            self.metrics.inc("status_cache_hits")
             return self._status_cache
 
-        rep = self._query_power()
-        txt = (rep or b"").strip().lower()
-        responsive = bool(rep)
-        power = "unknown"
-        if b"on" in txt:
-            power = "on"
-        elif b"off" in txt:
-            power = "off"
-
-        snap = {"connected": True, "responsive": responsive, "power": power}
-        self._status_cache = snap
-        self._status_ts = now
-        return snap
+        # Threads that miss together queue here; whoever gets in after the first
+        # probe finds the cache fresh again and returns it instead of re-querying.
+        waited = not self._status_lock.acquire(blocking=False)
+        if waited:
+            self._status_lock.acquire()
+        try:
+            now = time.time()
+            if (now - self._status_ts) < min_interval and self._status_cache:
+                self.metrics.inc("status_coalesced" if waited else "status_cache_hits")
+                return self._status_cache
+
+            self.metrics.inc("status_cache_misses")
+            rep = self._query_power()
+            responsive = bool(rep)
+            power = K.parse_reply(rep).power or "unknown"
+
+            snap = {"connected": True, "responsive": responsive, "power": power}
+            self._status_cache = snap
+            self._status_ts = now
+            return snap
+        finally:
+            self._status_lock.release()
 
     # ---------------- send APIs ----------------
 
     def send(self, payload: bytes):
         """
         Use for queries where you expect a reply.
-        Robust read loop with inter-byte idle window.
+        Returns as soon as the expected reply line arrives (vendor/framing);
+        the inter-byte idle window is only the fallback for unknown replies.
         """
         if MOCK:
             print("[MOCK SEND]", payload)
@@ -221,35 +347,55 @@ class MatrixSerial:
         if not self.ser or not self.ser.is_open:
             raise RuntimeError("Serial not open")
 
+        spec = F.reply_spec(payload)
+        m = self.metrics
+        t0 = time.perf_counter()
         with self._lock:
-            try:
-                self.ser.reset_input_buffer()
-            except Exception:
-                pass
+            t1 = time.perf_counter()
+            self._pull_input()
+            F.drop_complete_lines(self._rx)  # stale acks from earlier set commands
 
             self.ser.write(payload)
             self.ser.flush()
-
-            chunks = []
-            overall_deadline = time.time() + 1.2
-            idle_deadline = time.time() + 0.25
-            last_total = 0
-
-            while time.time() < overall_deadline:
-                n = self.ser.in_waiting
-                if n:
-                    data = self.ser.read(n)
-                    if data:
-                        chunks.append(data)
-                        idle_deadline = time.time() + 0.25
-
-                total = sum(len(c) for c in chunks)
-                if total == last_total and time.time() > idle_deadline:
-                    break
-                last_total = total
-                time.sleep(0.02)
-
-            return b"".join(chunks)
+            rep = self._read_frame(spec)
+        t2 = time.perf_counter()
+        m.lock("thread", t1 - t0, t2 - t1)
+        m.command("query", payload, t2 - t1)
+        m.inc("queries")
+        m.inc("bytes_out", len(payload))
+        if not rep:
+            m.inc("empty_replies")
+        return rep
+
+    def _pull_input(self) -> int:
+        n = self.ser.in_waiting
+        if n:
+            self._rx += self.ser.read(n)
+            self.metrics.inc("bytes_in", n)
+        return n
+
+    def _read_frame(self, spec, overall: float = 1.2, idle: float = 0.25) -> bytes:
+        now = time.monotonic()
+        overall_deadline = now + overall
+        idle_deadline = now + idle
+
+        while now < overall_deadline:
+            if self._pull_input():
+                idle_deadline = time.monotonic() + idle
+                if spec is not None:
+                    frame = F.take_frame(self._rx, spec)
+                    if frame is not None:
+                        return frame
+            elif now > idle_deadline:
+                break
+            time.sleep(0.005)
+            now = time.monotonic()
+
+        if now >= overall_deadline:
+            self.metrics.inc("timeouts")
+        if spec is not None:
+            self.metrics.inc("fallback_replies")
+        return F.drain(self._rx, spec)
 
     def send_set(self, payload: bytes, delay: float = 0.01):
         """
@@ -263,16 +409,74 @@ class MatrixSerial:
         if not self.ser or not self.ser.is_open:
             raise RuntimeError("Serial not open")
 
+        m = self.metrics
+        t0 = time.perf_counter()
         with self._lock:
+            t1 = time.perf_counter()
             self.ser.write(payload)
             self.ser.flush()
+        t2 = time.perf_counter()
+        m.lock("thread", t1 - t0, t2 - t1)
+        m.command("set", payload, t2 - t1)
+        m.inc("sets")
+        m.inc("bytes_out", len(payload))
         time.sleep(delay)
+        m.sleep_seconds += delay
         return b""
 
     def send_many(self, payloads):
         return [self.send(p) for p in payloads]
 
-    def send_many_set(self, payloads, delay_each: float = 0.01):
+    def send_many_set(self, payloads, delay_each: float = 0.01, burst: bool = BURST):
+        if burst:
+            return self.send_burst(payloads, gap=delay_each)
         for p in payloads:
             self.send_set(p, delay_each)
         return b""
+
+    def send_burst(self, payloads, gap: float = 0.01):
+        """
+        Batch of 'set' commands in one lock hold: one write + one flush per
+        BURST_MAX commands, then a single per-batch gap instead of one per command.
+        """
+        payloads = list(payloads)
+        if not payloads:
+            return b""
+        bufs = pack_burst(payloads)
+
+        if MOCK:
+            print("[MOCK SEND-BURST]", b"".join(bufs))
+            time.sleep(gap)
+            self._record_burst(len(payloads), len(bufs))
+            return b"OK"
+
+        if not self.ser or not self.ser.is_open:
+            raise RuntimeError("Serial not open")
+
+        m = self.metrics
+        t0 = time.perf_counter()
+        with self._lock:
+            t1 = time.perf_counter()
+            for i, buf in enumerate(bufs):
+                if i:
+                    time.sleep(gap)
+                self.ser.write(buf)
+                self.ser.flush()
+        t2 = time.perf_counter()
+        m.lock("thread", t1 - t0, t2 - t1)
+        m.command("burst", b"burst", t2 - t1)
+        m.inc("sets", len(payloads))
+        m.inc("bytes_out", sum(len(b) for b in bufs))
+        time.sleep(gap)
+        m.sleep_seconds += gap * len(bufs)
+        self._record_burst(len(payloads), len(bufs))
+        return b""
+
+    def _record_burst(self, n_cmds: int, n_writes: int):
+        saved = n_cmds - n_writes
+        st = self.burst_stats
+        st["bursts"] += 1
+        st["commands"] += n_cmds
+        st["writes_saved"] += saved
+        st["flushes_saved"] += saved
+        st["last"] = {"commands": n_cmds, "writes": n_writes, "writes_saved": saved, "flushes_saved": saved}
@@ -0,0 +1,84 @@
+import json
+import os
+import threading
+import time
+
+# Last known-good way to bring up the link, per port, so a restart can open the
+# port the way that worked and confirm it with one probe instead of walking the
+# whole warm-up / autosync ladder in serial_driver.py.
+LINK_FILE = os.getenv("LINK_FILE", "link_profile.json")
+DEFAULT_PULSE = 0.03
+_SAVE_LOCK = threading.Lock()  # devices save from their own threads into one file
+
+
+class LinkProfile:
+    """
+    baud: rate the matrix answered at; hop_9600: it needed a 9600 nudge
+    first; pulse: DTR/RTS pulse that woke it; latency: probe round trip
+    (seconds) when it was saved. Saved per port in LINK_FILE.
+    """
+
+    def __init__(self, port: str, path: str = LINK_FILE):
+        self.port = port
+        self.path = path
+        self.baud = None
+        self.hop_9600 = False
+        self.pulse = DEFAULT_PULSE
+        self.latency = None
+        self.saved_at = None
+
+    @property
+    def known(self) -> bool:
+        return self.baud is not None
+
+    def probe_timeout(self) -> float:
+        """How long the fast path waits for its one probe reply."""
+        return max(0.1, 4 * self.latency) if self.latency else 0.25
+
+    def update(self, baud: int, hop_9600: bool, pulse: float, latency: float | None):
+        self.baud, self.hop_9600, self.pulse = baud, hop_9600, pulse
+        self.latency = round(latency, 4) if latency is not None else self.latency
+        self.saved_at = time.time()
+        self.save()
+
+    def forget(self):
+        self.baud = None
+        self.save()
+
+    def as_dict(self) -> dict:
+        return {"baud": self.baud, "hop_9600": self.hop_9600, "pulse": self.pulse,
+                "latency": self.latency, "saved_at": self.saved_at}
+
+    def load(self) -> bool:
+        try:
+            with open(self.path, "r", encoding="utf-8") as fh:
+                rec = json.load(fh).get(self.port)
+        except (OSError, ValueError):
+            return False
+        if not rec or not rec.get("baud"):
+            return False
+        self.baud = int(rec["baud"])
+        self.hop_9600 = bool(rec.get("hop_9600"))
+        self.pulse = float(rec.get("pulse") or DEFAULT_PULSE)
+        self.latency = rec.get("latency")
+        self.saved_at = rec.get("saved_at")
+        return True
+
+    def save(self):
+        with _SAVE_LOCK:  # read-modify-write of the shared file
+            try:
+                with open(self.path, "r", encoding="utf-8") as fh:
+                    allp = json.load(fh)
+            except (OSError, ValueError):
+                allp = {}
+            if self.known:
+                allp[self.port] = self.as_dict()
+            else:
+                allp.pop(self.port, None)
+            tmp = self.path + ".tmp"
+            try:
+                with open(tmp, "w", encoding="utf-8") as fh:
+                    json.dump(allp, fh, indent=2, sort_keys=True)
+                os.replace(tmp, self.path)
+            except OSError as e:
+                print(f"[SERIAL] (warn) could not save {self.path}: {e}")
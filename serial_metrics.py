@@ -0,0 +1,221 @@
+import bisect
+import re
+
+# Prometheus-style instrumentation for the serial layer, kept dependency-free:
+# fixed-bucket histograms and counters in plain dicts, rendered to the text
+# exposition format on demand. Recording is a dict lookup + bisect per event.
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+_RE_WORD = re.compile(rb"[a-z]+")
+_TYPE_CACHE_MAX = 512
+_types = {}
+
+
+def command_type(payload: bytes) -> str:
+    """
+    Verb/noun label for a payload with the numbers dropped:
+    b"s output 1 window 2 in 3!" -> "s_output_window_in".
+    """
+    t = _types.get(payload)
+    if t is None:
+        words = _RE_WORD.findall(bytes(payload).lower())
+        t = "_".join(w.decode("ascii") for w in words) or "unknown"
+        if len(_types) < _TYPE_CACHE_MAX:
+            _types[payload] = t
+    return t
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # last slot = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class SerialMetrics:
+    """Counters and histograms for one MatrixSerial / AsyncMatrixSerial pair."""
+
+    def __init__(self):
+        self.commands = {}      # (kind, command type) -> Histogram of seconds
+        self.lock_wait = {}     # priority class (or "thread" for the sync lock) -> Histogram
+        self.lock_hold = {}
+        self.scenes = {}        # scene name -> Histogram of recall seconds
+        self.counters = {
+            "queries": 0, "sets": 0, "bytes_out": 0, "bytes_in": 0,
+            "timeouts": 0, "empty_replies": 0, "fallback_replies": 0,
+            "reconnects": 0, "status_cache_hits": 0, "status_cache_misses": 0,
+            "status_coalesced": 0, "refresh_coalesced": 0,
+            "pipeline_fallbacks": 0,
+            "intents_submitted": 0, "intents_superseded": 0, "intents_sent": 0,
+            "link_losses": 0, "reconnect_attempts": 0,
+            "verify_matched": 0, "verify_repaired": 0, "verify_diverged": 0, "verify_unanswered": 0,
+        }
+        self.sleep_seconds = 0.0
+        self.outage_seconds = 0.0   # port lost -> back, summed over outages
+        self.scheduler = None   # serial_sched.CommandScheduler, for queue depths
+        self.pacing = None      # serial_pacing.PacingProfile, for current gaps
+
+    # ---------------- recording ----------------
+
+    def command(self, kind: str, payload: bytes, seconds: float):
+        key = (kind, command_type(payload))
+        h = self.commands.get(key)
+        if h is None:
+            h = self.commands[key] = Histogram()
+        h.observe(seconds)
+
+    def lock(self, which: str, wait: float, hold: float):
+        for table, v in ((self.lock_wait, wait), (self.lock_hold, hold)):
+            h = table.get(which)
+            if h is None:
+                h = table[which] = Histogram()
+            h.observe(v)
+
+    def scene(self, name: str, seconds: float):
+        h = self.scenes.get(name)
+        if h is None:
+            h = self.scenes[name] = Histogram()
+        h.observe(seconds)
+
+    def inc(self, name: str, n: int = 1):
+        self.counters[name] += n
+
+    def lock_seconds(self, table: dict) -> float:
+        return sum(h.sum for h in table.values())
+
+    def render(self, labels: dict | None = None, link_state: str | None = None) -> str:
+        """Prometheus text format. labels are added to every series (e.g. device id)."""
+        return render_all([(labels or {}, self, link_state)])
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+
+def _family(lines: list, name: str, kind: str, help_: str):
+    lines.append(f"# HELP {name} {help_}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+def _histogram(lines: list, name: str, labels: dict, h: Histogram):
+    acc = 0
+    for le, c in zip(BUCKETS, h.counts):
+        acc += c
+        lines.append(f"{name}_bucket{_labels(dict(labels, le=le))} {acc}")
+    lines.append(f"{name}_bucket{_labels(dict(labels, le='+Inf'))} {h.count}")
+    lines.append(f"{name}_sum{_labels(labels)} {h.sum:.6f}")
+    lines.append(f"{name}_count{_labels(labels)} {h.count}")
+
+
+# (metric, help, [(extra labels, counter key)])
+_COUNTERS = (
+    ("matrix_serial_commands_total", "Commands sent.",
+     [({"kind": "query"}, "queries"), ({"kind": "set"}, "sets")]),
+    ("matrix_serial_bytes_total", "Bytes on the wire.",
+     [({"direction": "out"}, "bytes_out"), ({"direction": "in"}, "bytes_in")]),
+    ("matrix_serial_timeouts_total", "Queries that hit the overall reply deadline.", [({}, "timeouts")]),
+    ("matrix_serial_empty_replies_total", "Queries that returned no bytes.", [({}, "empty_replies")]),
+    ("matrix_serial_fallback_replies_total",
+     "Replies returned by the idle-window fallback instead of framing.", [({}, "fallback_replies")]),
+    ("matrix_serial_pipeline_fallbacks_total",
+     "Pipelined query batches that lost replies and were finished one at a time.", [({}, "pipeline_fallbacks")]),
+    ("matrix_intents_total", "Set-command intents: submitted, replaced by a newer value before sending, sent.",
+     [({"result": "submitted"}, "intents_submitted"), ({"result": "superseded"}, "intents_superseded"),
+      ({"result": "sent"}, "intents_sent")]),
+    ("matrix_verify_total", "Background readbacks of written state: matched, repaired (re-sent), "
+     "diverged (changed outside this app), unanswered.",
+     [({"result": "matched"}, "verify_matched"), ({"result": "repaired"}, "verify_repaired"),
+      ({"result": "diverged"}, "verify_diverged"), ({"result": "unanswered"}, "verify_unanswered")]),
+    ("matrix_serial_reconnects_total", "Link recoveries after the first connect.", [({}, "reconnects")]),
+    ("matrix_serial_link_losses_total", "Times the watchdog found the port lost.", [({}, "link_losses")]),
+    ("matrix_serial_reconnect_attempts_total", "Reopen attempts while recovering a lost port.",
+     [({}, "reconnect_attempts")]),
+    ("matrix_status_cache_total", "status_snapshot() calls served from / past the cache.",
+     [({"result": "hit"}, "status_cache_hits"), ({"result": "miss"}, "status_cache_misses")]),
+    ("matrix_coalesced_total", "Callers that shared an in-flight status probe / state refresh instead of "
+     "sending their own.",
+     [({"query": "status"}, "status_coalesced"), ({"query": "refresh"}, "refresh_coalesced")]),
+)
+
+LINK_STATES = ("idle", "connecting", "syncing", "ready", "degraded", "reconnecting")
+
+
+def render_all(entries: list) -> str:
+    """
+    Prometheus text format for several (labels, SerialMetrics, link_state)
+    entries, one family header per metric (one entry per device).
+    """
+    lines = []
+
+    for name, help_, table, series in (
+        ("matrix_serial_command_seconds",
+         "Time from write to reply (query) or UART drain (set/burst), per command type.",
+         "commands", lambda k: {"kind": k[0], "command": k[1]}),
+        ("matrix_serial_lock_wait_seconds", "Time queued for the port, per priority class.",
+         "lock_wait", lambda k: {"class": k}),
+        ("matrix_serial_lock_hold_seconds", "Time the port was held, per priority class.",
+         "lock_hold", lambda k: {"class": k}),
+        ("matrix_scene_recall_seconds", "Scene recall, from request to the last command written.",
+         "scenes", lambda k: {"scene": k}),
+    ):
+        _family(lines, name, "histogram", help_)
+        for base, m, _ in entries:
+            for key, h in sorted(getattr(m, table).items()):
+                _histogram(lines, name, dict(base, **series(key)), h)
+
+    for name, help_, series in _COUNTERS:
+        _family(lines, name, "counter", help_)
+        for base, m, _ in entries:
+            for lab, key in series:
+                lines.append(f"{name}{_labels(dict(base, **lab))} {m.counters[key]}")
+
+    _family(lines, "matrix_serial_sleep_seconds_total", "counter", "Time spent in pacing sleeps.")
+    for base, m, _ in entries:
+        lines.append(f"matrix_serial_sleep_seconds_total{_labels(base)} {m.sleep_seconds:.6f}")
+    _family(lines, "matrix_serial_outage_seconds_total", "counter", "Time from losing the port to having it back.")
+    for base, m, _ in entries:
+        lines.append(f"matrix_serial_outage_seconds_total{_labels(base)} {m.outage_seconds:.3f}")
+
+    scheds = [(base, m.scheduler) for base, m, _ in entries if m.scheduler is not None]
+    _family(lines, "matrix_serial_queue_depth", "gauge", "Commands waiting for the port, per priority class.")
+    for base, sched in scheds:
+        for cls, n in sched.depth.items():
+            lines.append(f"matrix_serial_queue_depth{_labels(dict(base, **{'class': cls}))} {n}")
+    _family(lines, "matrix_serial_starvation_promotions_total", "counter",
+            "Waiters moved ahead of more urgent classes after SCHED_STARVE_AFTER.")
+    for base, sched in scheds:
+        for cls, n in sched.promoted.items():
+            lines.append(f"matrix_serial_starvation_promotions_total{_labels(dict(base, **{'class': cls}))} {n}")
+
+    pacings = [(base, m.pacing) for base, m, _ in entries if m.pacing is not None]
+    _family(lines, "matrix_serial_pacing_gap_seconds", "gauge", "Pause after a burst chunk, per command class.")
+    for base, p in pacings:
+        for cls, gap in p.gaps.items():
+            lines.append(f"matrix_serial_pacing_gap_seconds{_labels(dict(base, **{'class': cls}))} {gap:.6f}")
+    _family(lines, "matrix_serial_pacing_drops_total", "counter", "Dropped commands seen, per command class.")
+    for base, p in pacings:
+        for cls, n in p.drops.items():
+            lines.append(f"matrix_serial_pacing_drops_total{_labels(dict(base, **{'class': cls}))} {n}")
+
+    _family(lines, "matrix_status_cache_hit_ratio", "gauge", "Share of status_snapshot() calls answered from cache.")
+    for base, m, _ in entries:
+        hits, misses = m.counters["status_cache_hits"], m.counters["status_cache_misses"]
+        ratio = hits / (hits + misses) if hits + misses else 0.0
+        lines.append(f"matrix_status_cache_hit_ratio{_labels(base)} {ratio:.4f}")
+
+    if any(state is not None for _, _, state in entries):
+        _family(lines, "matrix_link_state", "gauge", "Current link lifecycle state (1 = active).")
+        for base, _, state in entries:
+            for st in LINK_STATES:
+                lines.append(f"matrix_link_state{_labels(dict(base, state=st))} {int(st == state)}")
+    return "\n".join(lines) + "\n"
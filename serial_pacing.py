@@ -0,0 +1,115 @@
+import json
+import os
+import time
+
+# Pacing between burst chunks, per command class. The firmware needs longer
+# to rebuild a multiview layout than to move a window route or a border, so
+# each class keeps its own gap; a chunk waits for the slowest class in it.
+CLASSES = ("route", "mode", "audio", "border")
+DEFAULT_GAPS = {"route": 0.003, "mode": 0.003, "audio": 0.003, "border": 0.001}
+MAX_GAP = 0.25
+RELAX_AFTER = 50   # clean readbacks of a class before its widened gap creeps back toward the floor
+PACING_FILE = os.getenv("PACING_FILE", "pacing.json")
+
+
+def command_class(payload: bytes) -> str:
+    if b"border" in payload:
+        return "border"
+    if b"multiview" in payload or b"quad mode" in payload:
+        return "mode"
+    if b"audio" in payload:
+        return "audio"
+    return "route"
+
+
+class PacingProfile:
+    """
+    Gaps for one matrix. `floor` is what calibration measured (or the
+    defaults); `gaps` is what is used now: doubled for a class whenever a
+    dropped command is seen, eased back toward the floor after RELAX_AFTER
+    clean readbacks. Saved per device id in PACING_FILE.
+    """
+
+    def __init__(self, key: str = "default", path: str = PACING_FILE):
+        self.key = key
+        self.path = path
+        self.floor = dict(DEFAULT_GAPS)
+        self.gaps = dict(DEFAULT_GAPS)
+        self.source = "default"     # default | calibrated
+        self.calibrated_at = None
+        self.drops = {c: 0 for c in CLASSES}
+        self._clean = {c: 0 for c in CLASSES}
+
+    def gap_for(self, payloads) -> float:
+        return max((self.gaps[command_class(p)] for p in payloads), default=0.0)
+
+    # ---------------- runtime adjustment ----------------
+
+    def on_drop(self, cls: str):
+        old = self.gaps[cls]
+        self.gaps[cls] = min(MAX_GAP, max(old * 2, old + 0.001))
+        self.drops[cls] += 1
+        self._clean[cls] = 0
+        print(f"[PACING] {self.key}: dropped {cls} command; gap {old * 1000:.1f} -> {self.gaps[cls] * 1000:.1f} ms")
+        self.save()
+
+    def on_ok(self, cls: str):
+        if self.gaps[cls] <= self.floor[cls]:
+            return
+        self._clean[cls] += 1
+        if self._clean[cls] >= RELAX_AFTER:
+            self._clean[cls] = 0
+            self.gaps[cls] = max(self.floor[cls], self.gaps[cls] * 0.8)
+            self.save()
+
+    def calibrated(self, gaps: dict):
+        self.floor = dict(self.floor, **gaps)
+        self.gaps = dict(self.floor)
+        self.source = "calibrated"
+        self.calibrated_at = time.time()
+        self._clean = {c: 0 for c in CLASSES}
+        self.save()
+
+    def reset(self):
+        self.floor = dict(DEFAULT_GAPS)
+        self.gaps = dict(DEFAULT_GAPS)
+        self.source = "default"
+        self.calibrated_at = None
+        self._clean = {c: 0 for c in CLASSES}
+        self.save()
+
+    # ---------------- persistence ----------------
+
+    def as_dict(self) -> dict:
+        return {"source": self.source, "calibrated_at": self.calibrated_at,
+                "floor": self.floor, "gaps": self.gaps, "drops": self.drops}
+
+    def load(self) -> bool:
+        try:
+            with open(self.path, "r", encoding="utf-8") as fh:
+                rec = json.load(fh).get(self.key)
+        except (OSError, ValueError):
+            return False
+        if not rec:
+            return False
+        self.floor = dict(DEFAULT_GAPS, **rec.get("floor", {}))
+        self.gaps = dict(self.floor, **rec.get("gaps", {}))
+        self.source = rec.get("source", "default")
+        self.calibrated_at = rec.get("calibrated_at")
+        print(f"[PACING] {self.key}: {self.source} profile loaded from {self.path}")
+        return True
+
+    def save(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as fh:
+                allp = json.load(fh)
+        except (OSError, ValueError):
+            allp = {}
+        allp[self.key] = self.as_dict()
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump(allp, fh, indent=2, sort_keys=True)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"[PACING] (warn) could not save {self.path}: {e}")
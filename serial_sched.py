@@ -0,0 +1,145 @@
+import asyncio
+import collections
+import contextvars
+import os
+
+# Priority classes for the serial port, most urgent first.
+CLASSES = ("interactive_set", "interactive_query", "background", "health")
+# A waiter queued this long jumps every class (bounded starvation)
+STARVE_AFTER = float(os.getenv("SCHED_STARVE_AFTER", "1.0"))
+
+_PRIORITY = contextvars.ContextVar("serial_priority", default=None)
+
+
+def current_priority(default: str) -> str:
+    return _PRIORITY.get() or default
+
+
+class priority:
+    """
+    Run the enclosed serial traffic in a priority class:
+
+        with priority("background"):
+            await ASER.send_pipelined(...)
+
+    Unset, sets/bursts are interactive_set and queries interactive_query.
+    """
+
+    def __init__(self, cls: str):
+        if cls not in CLASSES:
+            raise ValueError(f"unknown priority class {cls!r}")
+        self.cls = cls
+        self._token = None
+
+    def __enter__(self):
+        self._token = _PRIORITY.set(self.cls)
+        return self
+
+    def __exit__(self, *exc):
+        _PRIORITY.reset(self._token)
+
+
+class CommandScheduler:
+    """
+    Priority lock in front of one serial port (replaces a plain asyncio.Lock).
+
+    The port is granted one command (or one pipelined chunk) at a time, so
+    background work is preempted between commands. The most urgent non-empty
+    class goes next, except that a waiter queued longer than STARVE_AFTER goes
+    first whatever its class, so housekeeping is delayed but never starved.
+    """
+
+    def __init__(self):
+        self._busy = False
+        self._queues = {c: collections.deque() for c in CLASSES}  # (future, enqueued at)
+        self.depth = {c: 0 for c in CLASSES}
+        self.promoted = {c: 0 for c in CLASSES}
+
+    async def acquire(self, cls: str):
+        if not self._busy and not any(self.depth.values()):
+            self._busy = True
+            return
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._queues[cls].append((fut, loop.time()))
+        self.depth[cls] += 1
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release()  # granted just as we were cancelled: pass it on
+            else:
+                self._forget(cls, fut)
+            raise
+
+    def release(self):
+        nxt = self._pick()
+        if nxt is None:
+            self._busy = False
+        else:
+            nxt.set_result(None)  # ownership moves straight to the next waiter
+
+    def _forget(self, cls: str, fut):
+        q = self._queues[cls]
+        for i, (f, _) in enumerate(q):
+            if f is fut:
+                del q[i]
+                self.depth[cls] -= 1
+                return
+
+    def _pick(self):
+        now = asyncio.get_running_loop().time()
+        waiting = [c for c in CLASSES if self._queues[c]]
+        if not waiting:
+            return None
+        order = list(CLASSES)
+        starved = min((c for c in waiting if now - self._queues[c][0][1] >= STARVE_AFTER),
+                      key=lambda c: self._queues[c][0][1], default=None)
+        if starved is not None and starved != waiting[0]:
+            self.promoted[starved] += 1
+            order.remove(starved)
+            order.insert(0, starved)
+        for cls in order:
+            q = self._queues[cls]
+            while q:
+                fut, _ = q.popleft()
+                self.depth[cls] -= 1
+                if not fut.done():
+                    return fut
+        return None
+
+
+class SingleFlight:
+    """
+    Concurrent callers for the same key share one in-flight call:
+
+        snap = await flights.run("status", probe)
+
+    The first caller starts probe() as a task; anyone arriving before it
+    finishes awaits that same task and gets its result (or exception). Nothing
+    is kept afterwards: the next call starts a new flight. A caller that is
+    cancelled (client went away) leaves the task running for the others.
+    """
+
+    def __init__(self, metrics=None):
+        self.metrics = metrics   # SerialMetrics: "<key>_coalesced" counts joiners
+        self._flights = {}
+
+    async def run(self, key: str, fn):
+        task = self._flights.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(fn())
+            self._flights[key] = task
+            task.add_done_callback(lambda t: self._landed(key, t))
+        elif self.metrics is not None:
+            self.metrics.inc(f"{key}_coalesced")
+        return await asyncio.shield(task)
+
+    def _landed(self, key: str, task):
+        if self._flights.get(key) is task:
+            del self._flights[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved; every waiter may have gone
+
+    def in_flight(self) -> list[str]:
+        return list(self._flights)
@@ -0,0 +1,107 @@
+# services/assets.py
+import gzip
+import hashlib
+import mimetypes
+import re
+from pathlib import Path
+
+try:  # optional: gzip only without it
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_DIR = Path("static")
+SHELL = "index.html"
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+_RE_REF = re.compile(r"/static/([\w.-]+)")
+
+
+class Asset:
+    """One file in memory: identity bytes plus whichever encodings came out smaller."""
+    __slots__ = ("name", "url", "digest", "media_type", "bodies")
+
+    def __init__(self, name: str, url: str, data: bytes):
+        self.name = name
+        self.digest = hashlib.sha256(data).hexdigest()[:12]
+        self.url = url.format(digest=self.digest)
+        self.media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        if self.media_type.startswith("text/") or self.media_type.endswith(("javascript", "json")):
+            self.media_type += "; charset=utf-8"
+        self.bodies = {"identity": data}
+        for enc, fn in (("br", _brotli), ("gzip", _gzip)):
+            packed = fn(data)
+            if packed is not None and len(packed) < len(data):
+                self.bodies[enc] = packed
+
+    def etag(self, enc: str) -> str:
+        # strong validator per representation (each encoding is a different byte string)
+        return f'"{self.digest}"' if enc == "identity" else f'"{self.digest}-{enc}"'
+
+    def negotiate(self, accept_encoding: str) -> str:
+        accepted = set()
+        for part in (accept_encoding or "").lower().split(","):
+            token, _, params = part.strip().partition(";")
+            if params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+                accepted.add(token.strip())
+        for enc in ("br", "gzip"):
+            if enc in self.bodies and (enc in accepted or "*" in accepted):
+                return enc
+        return "identity"
+
+
+def _gzip(data: bytes) -> bytes:
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _brotli(data: bytes) -> bytes | None:
+    return brotli.compress(data, quality=11) if brotli else None
+
+
+class AssetBundle:
+    """
+    The frontend, read and compressed once at startup (build()).
+
+    Every file in static/ except the HTML shell is also published under a
+    content-hashed name (app.js -> app.3f2a9c1d04be.js) that is cached as
+    immutable; the shell's /static/... references are rewritten to those names,
+    so it is the only thing a browser revalidates (one 304 when nothing changed).
+    Requests are answered from memory; nothing is read from disk after build().
+    """
+
+    def __init__(self, root: Path = STATIC_DIR):
+        self.root = root
+        self.by_url = {}   # request path -> (Asset, Cache-Control)
+        self.shell = None
+
+    def build(self) -> int:
+        by_url, hashed = {}, {}
+        for path in sorted(self.root.iterdir()):
+            if not path.is_file() or path.name == SHELL:
+                continue
+            stem, dot, ext = path.name.rpartition(".")
+            a = Asset(path.name, f"/static/{stem}.{{digest}}{dot}{ext}" if stem else f"/static/{path.name}.{{digest}}",
+                      path.read_bytes())
+            hashed[path.name] = a.url
+            by_url[a.url] = (a, IMMUTABLE)
+            by_url[f"/static/{path.name}"] = (a, REVALIDATE)  # plain name still works, just not cached for long
+
+        html = (self.root / SHELL).read_text(encoding="utf-8")
+        html = _RE_REF.sub(lambda m: hashed.get(m.group(1), m.group(0)), html)
+        self.shell = Asset(SHELL, "/", html.encode("utf-8"))
+        by_url["/"] = by_url[f"/static/{SHELL}"] = (self.shell, REVALIDATE)
+        self.by_url = by_url
+
+        files = [a for a, cc in by_url.values() if cc == IMMUTABLE] + [self.shell]
+        sizes = ", ".join(f"{a.name} {len(a.bodies['identity'])}->{min(len(b) for b in a.bodies.values())}"
+                          for a in files)
+        print(f"[ASSETS] {len(files)} file(s) in memory ({'br+gzip' if brotli else 'gzip'}): {sizes}")
+        return len(files)
+
+    def get(self, url: str):
+        """(Asset, Cache-Control) for a request path, or None."""
+        return self.by_url.get(url)
+
+
+ASSETS = AssetBundle()
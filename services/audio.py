@@ -1,9 +1,11 @@
 import vendor.commands as C
-from services.serial_io import send_if_changed
+from services.intents import INTENTS
 from services.state_cache import CACHE
-def set_audio_hdmi(out_n: int, src: int):
-    send_if_changed(f"o{out_n}_audio", C.term(f"s output {out_n} audio {src}"))
-    CACHE.set(f"out{out_n}_audio", src)
-def set_follow(out_n: int):
-    send_if_changed(f"o{out_n}_audio_follow", C.cmd_audio_follow(out_n))
-    CACHE.set(f"out{out_n}_audio", 0)
+# Audio writes are last-write-wins intents: a rapid 1->2->3 sends only the
+# values still pending when the port frees up, and always the last one.
+async def set_audio_hdmi(out_n: int, src: int):
+    await INTENTS.submit([C.cmd_audio(out_n, src)])
+    CACHE.put(out_n, "audio", src)
+async def set_follow(out_n: int):
+    await INTENTS.submit([C.cmd_audio_follow(out_n)])
+    CACHE.put(out_n, "audio", 0)
@@ -0,0 +1,53 @@
+# services/device_context.py
+import contextvars
+
+# Which matrix the current request / task is talking to. Unset = the default
+# device, so single-matrix setups and the plain /api/... routes never set it.
+CURRENT = contextvars.ContextVar("matrix_device", default=None)
+
+
+def current():
+    dev = CURRENT.get()
+    if dev is None:
+        from services.devices import REGISTRY  # registry imports this module
+        dev = REGISTRY.default
+    return dev
+
+
+class use:
+    """Bind a device for the enclosed block: `with use(dev): await apply(...)`."""
+
+    def __init__(self, dev):
+        self.dev = dev
+        self._token = None
+
+    def __enter__(self):
+        self._token = CURRENT.set(self.dev)
+        return self.dev
+
+    def __exit__(self, *exc):
+        CURRENT.reset(self._token)
+
+
+class DeviceAttr:
+    """
+    Stand-in for a per-device singleton (CACHE, ASER, SER, SNAPSHOT, STREAM):
+    attribute access is forwarded to that attribute of the current device, so
+    services keep their module-level names and stay device-agnostic.
+    """
+    __slots__ = ("_attr",)
+
+    def __init__(self, attr: str):
+        object.__setattr__(self, "_attr", attr)
+
+    def _target(self):
+        return getattr(current(), self._attr)
+
+    def __getattr__(self, name):
+        return getattr(self._target(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._target(), name, value)
+
+    def __repr__(self):
+        return f"<{self._attr} of device {current().id!r}>"
@@ -0,0 +1,100 @@
+# services/devices.py
+import asyncio
+import os
+
+from serial_driver import MatrixSerial, PORT, BAUD
+from serial_async import AsyncMatrixSerial
+from serial_pacing import PacingProfile
+from services.state_cache import MatrixCache
+from services.device_context import use
+
+
+def parse_devices(spec: str) -> list[tuple[str, str, int]]:
+    """
+    MATRIX_DEVICES="main=COM3,stage=/dev/ttyUSB1@9600" -> [(id, port, baud), ...].
+    Empty -> [] (caller falls back to the single SERIAL_PORT device).
+    """
+    out = []
+    for item in (spec or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        dev_id, _, port = item.partition("=")
+        port, _, baud = port.strip().partition("@")
+        out.append((dev_id.strip(), port, int(baud) if baud else BAUD))
+    return out
+
+
+class Device:
+    """One matrix: its own port, serial lock, cache and background connect worker."""
+
+    def __init__(self, dev_id: str, port: str, baud: int = BAUD):
+        self.id = dev_id
+        self.ser = MatrixSerial(autoconnect=False, port=port, baud=baud)
+        self.aser = AsyncMatrixSerial(self.ser)
+        self.aser.pacing = self.aser.metrics.pacing = PacingProfile(dev_id)
+        self.aser.pacing.load()
+        self.cache = MatrixCache()
+
+    def info(self) -> dict:
+        return {"id": self.id, "port": self.ser.port, "baud": self.ser.baud, **self.aser.health()}
+
+
+class DeviceRegistry:
+    """
+    Every matrix this process drives, keyed by device id. The first one is the
+    default: the plain /api/... routes talk to it, /api/devices/{id}/... to the others.
+    """
+
+    def __init__(self, specs: list[tuple[str, str, int]]):
+        self.devices = {}
+        self._services = []  # (attribute, factory) given to every device
+        for dev_id, port, baud in specs:
+            self.add(dev_id, port, baud)
+        self.default = next(iter(self.devices.values()))
+
+    def add(self, dev_id: str, port: str, baud: int = BAUD) -> Device:
+        if dev_id in self.devices:
+            raise ValueError(f"duplicate device id {dev_id!r}")
+        dev = Device(dev_id, port, baud)
+        for name, factory in self._services:
+            setattr(dev, name, factory(dev))
+        self.devices[dev_id] = dev
+        return dev
+
+    def attach(self, name: str, factory):
+        """Give every device (existing and future) its own instance of a service, e.g. its snapshot."""
+        self._services.append((name, factory))
+        for dev in self.devices.values():
+            setattr(dev, name, factory(dev))
+
+    def get(self, dev_id: str) -> Device | None:
+        return self.devices.get(dev_id)
+
+    def select(self, ids: list[str] | None) -> list[Device]:
+        """Devices by id (None = all). Raises KeyError naming unknown ids."""
+        if ids is None:
+            return list(self.devices.values())
+        unknown = [i for i in ids if i not in self.devices]
+        if unknown:
+            raise KeyError(unknown)
+        return [self.devices[i] for i in ids]
+
+    def __iter__(self):
+        return iter(list(self.devices.values()))
+
+    async def fan_out(self, devices: list[Device], fn, *args, **kwargs) -> dict:
+        """
+        Run `await fn(*args, **kwargs)` on every device concurrently, each bound as
+        the current device in its own task, so a slow or offline unit only delays
+        its own result. Returns {device id: result or the exception raised}.
+        """
+        async def one(dev):
+            with use(dev):
+                return await fn(*args, **kwargs)
+
+        results = await asyncio.gather(*(one(d) for d in devices), return_exceptions=True)
+        return {d.id: r for d, r in zip(devices, results)}
+
+
+REGISTRY = DeviceRegistry(parse_devices(os.getenv("MATRIX_DEVICES", "")) or [("main", PORT, BAUD)])
@@ -0,0 +1,137 @@
+# services/events.py
+import asyncio
+
+from services.device_context import DeviceAttr, use
+from services.devices import REGISTRY
+from services.ui_state import ui_snapshot
+
+STATUS_INTERVAL = 5.0   # one power/responsive probe per interval, shared by every client
+COALESCE = 0.05         # let one action's cache writes land before diffing
+QUEUE_MAX = 64          # per-client backlog; a client that falls this far behind is dropped
+
+_MISSING = object()
+
+
+class StateStream:
+    """
+    Single server-side producer behind /api/events (one per device).
+
+    Cache writes mark the state dirty; the producer rebuilds the UI snapshot
+    once, diffs it against what it last published and fans out only the changed
+    keys. Power/responsive status is probed here on a fixed interval (only while
+    someone is listening), so bus load doesn't grow with the number of panels.
+    """
+
+    def __init__(self, dev):
+        self.dev = dev
+        self._clients = set()
+        self._state = {}
+        self._loop = None
+        self._dirty = None
+        self._task = None
+        self._status_due = True
+        dev.cache.subscribe(self._on_cache_change)
+
+    def _on_cache_change(self, _key, _changed=True):
+        if self._loop is None:
+            return
+        try:
+            same_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            same_loop = False
+        if same_loop:
+            self._dirty.set()
+        else:
+            self._loop.call_soon_threadsafe(self._dirty.set)
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._dirty = asyncio.Event()
+            self._task = loop.create_task(self._run())
+
+    # ---------------- clients ----------------
+
+    def subscribe(self) -> asyncio.Queue:
+        self._ensure_started()
+        if not self._state:
+            with use(self.dev):
+                self._state.update(ui_snapshot())
+        q = asyncio.Queue(QUEUE_MAX)
+        self._clients.add(q)
+        self._status_due = True
+        self._dirty.set()
+        return q
+
+    def unsubscribe(self, q: asyncio.Queue):
+        self._clients.discard(q)
+
+    def snapshot(self) -> dict:
+        return dict(self._state)
+
+    @property
+    def client_count(self) -> int:
+        return len(self._clients)
+
+    # ---------------- producer ----------------
+
+    async def _status(self) -> dict:
+        try:
+            st = await self.dev.aser.status_snapshot()
+        except Exception as e:
+            print(f"[EVENTS] status probe failed: {e}")
+            st = {"connected": False, "responsive": False, "power": "unknown", "link": self.dev.aser.state}
+        return {k: st.get(k) for k in ("connected", "responsive", "power", "link")}
+
+    def _publish(self, new: dict):
+        delta = {k: v for k, v in new.items() if self._state.get(k, _MISSING) != v}
+        if not delta:
+            return
+        self._state.update(delta)
+        self.notify("delta", delta)
+
+    def notify(self, event: str, data: dict):
+        """Send one event to every client ('delta' = state keys; also 'op' from services/ops.py)."""
+        for q in list(self._clients):
+            try:
+                q.put_nowait((event, data))
+            except asyncio.QueueFull:
+                # Too far behind: end its stream; EventSource reconnects and resyncs.
+                self._clients.discard(q)
+                while not q.empty():
+                    q.get_nowait()
+                q.put_nowait(None)
+
+    async def _run(self):
+        with use(self.dev):  # ui_snapshot() reads this device's cache
+            await self._produce()
+
+    async def _produce(self):
+        loop = self._loop
+        next_status = 0.0
+        while True:
+            timeout = None
+            if self._clients:
+                timeout = 0.0 if self._status_due else max(0.0, next_status - loop.time())
+            try:
+                await asyncio.wait_for(self._dirty.wait(), timeout)
+                await asyncio.sleep(COALESCE)
+            except asyncio.TimeoutError:
+                pass
+            self._dirty.clear()
+
+            try:
+                new = ui_snapshot()
+                if self._clients and (self._status_due or loop.time() >= next_status):
+                    self._status_due = False
+                    new.update(await self._status())
+                    next_status = loop.time() + STATUS_INTERVAL
+                self._publish(new)
+            except Exception as e:
+                print(f"[EVENTS] producer error: {e}")
+                await asyncio.sleep(1.0)
+
+
+REGISTRY.attach("stream", StateStream)
+STREAM = DeviceAttr("stream")  # the current device's producer
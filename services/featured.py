@@ -1,66 +1,50 @@
 # services/featured.py
 from services.state_cache import CACHE
-from services.audio import set_audio_hdmi, set_follow
-from services.borders import clear_all, set_highlight
-from services.video import set_single, ensure_map_cached, set_quad_14
+from services.video import ensure_map_cached
+from services.reconcile import apply
 
-BATCH_DELAY = 0.001  # 1 ms: faster but safe for typical USB-serial
+FEATURE_COLOR = 2  # RED outline for the featured window
 
-def _win_for_src(out_n: int, src: int):
-    mp = ensure_map_cached(out_n)
+async def _win_for_src(out_n: int, src: int):
+    mp = await ensure_map_cached(out_n)
     for w, s in mp.items():
         if s == src:
             return w
     return None
 
-def _mirror_on_out2(src: int):
+async def _mirror_target(src: int) -> dict:
     """
-    Try to outline the same source on OUT2 (quad expected, but we don't hard-require the cached flag).
-    If the source isn't present in OUT2's current map, do nothing.
+    Outline the same source on OUT2 (quad expected, but we don't hard-require the cached flag).
+    If the source isn't present in OUT2's current map, leave OUT2 alone.
     """
-    win2 = _win_for_src(2, src)
+    win2 = await _win_for_src(2, src)
     if win2:
-        set_highlight(2, win2, color=2, delay_each=BATCH_DELAY)
-        CACHE.set("out2_border_window", win2)
+        return {2: {"border_window": win2, "border_color": FEATURE_COLOR}}
+    return {}
 
-def ensure_featured_applied():
+async def ensure_featured_applied(mode: str | None = None):
     """
     Apply Featured Source with audio-first, then borders.
     SINGLE: route OUT1 to featured + audio follow; clear OUT1 border; mirror border on OUT2 if its map has the source.
     QUAD:   audio to featured; outline on OUT1; mirror outline on OUT2.
+    The target is diffed against the cache (services.reconcile), so only what changed is sent.
+    `mode` switches OUT1 to that mode; by default it stays in the mode the cache knows.
     """
     fs = CACHE.featured_source
     if fs is None:
         return
 
-    mode = CACHE.get("out1_mode")
-    if mode is None:
-        # Be defensive: try a best-effort inference from prior actions; default to single
-        mode = "single"
-        CACHE.set("out1_mode", mode)
+    # Be defensive: unknown mode -> single (left unknown in cache so the planner sends it)
+    mode = mode or CACHE.get("out1_mode") or "single"
 
     if mode == "single":
-        # 1) Audio first
-        set_audio_hdmi(1, fs)
-
-        # 2) Video route + follow
-        set_single(1, fs)     # sets mode=single, routes video
-        set_follow(1)         # sets audio follow 0
-        CACHE.set("out1_src", fs)
-
-        # 3) Borders: clear OUT1, mirror highlight on OUT2
-        clear_all(1, delay_each=BATCH_DELAY)
-        _mirror_on_out2(fs)
-
+        out1 = {"mode": "single", "src": fs, "audio": 0, "border_window": 0}
     else:  # "quad" (or anything not "single")
-        # 1) Audio first
-        set_audio_hdmi(1, fs)
-
-        # 2) Highlight on OUT1
-        win1 = _win_for_src(1, fs)
+        out1 = {"audio": fs}
+        win1 = await _win_for_src(1, fs)
         if win1:
-            set_highlight(1, win1, color=2, delay_each=BATCH_DELAY)
-            CACHE.set("out1_border_window", win1)
+            out1.update(border_window=win1, border_color=FEATURE_COLOR)
 
-        # 3) Mirror on OUT2
-        _mirror_on_out2(fs)
+    target = {1: out1}
+    target.update(await _mirror_target(fs))
+    await apply(target)
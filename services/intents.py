@@ -0,0 +1,105 @@
+# services/intents.py
+import asyncio
+import re
+
+from services.device_context import DeviceAttr
+from services.devices import REGISTRY
+
+# The target a set command writes = the command minus its final value:
+# "s output 1 audio 3!" -> b"s output 1 audio", "s output 1 window 2 border 1!" -> b"s output 1 window 2 border"
+RE_TARGET = re.compile(rb"^\s*(.*?)\s+\d+\s*!?\s*$")
+
+
+def target_key(payload: bytes) -> bytes:
+    m = RE_TARGET.match(payload)
+    return m.group(1).lower() if m else payload
+
+
+def _wider(a: float | None, b: float | None) -> float | None:
+    """Larger of two gap overrides; None = pace from the device's profile."""
+    if a is None:
+        return b
+    return a if b is None else max(a, b)
+
+
+class _Intent:
+    __slots__ = ("payload", "gap", "done")
+
+    def __init__(self, payload: bytes, gap: float | None, done: asyncio.Future):
+        self.payload = payload
+        self.gap = gap
+        self.done = done
+
+
+class IntentQueue:
+    """
+    Last-write-wins queue of set commands for one device, keyed by target
+    (per-output audio, route, window input, border, border color...).
+
+    A command whose target already has a pending, not-yet-written intent
+    replaces that intent in place and the older value is never sent. It keeps
+    the original queue position on purpose: plans are queued audio first, and
+    a later click replacing the audio must not push it behind the video. Whatever
+    is pending when the port is granted goes out as one burst, so a click storm
+    costs the fewest writes and the matrix always ends on the last requested
+    value. submit() returns once the final value for its targets is on the wire.
+    """
+
+    def __init__(self, dev):
+        self.dev = dev
+        self._pending = {}   # target -> _Intent, insertion order = send order
+        self._taken = []
+        self._flusher = None
+
+    async def submit(self, payloads, gap: float | None = None):
+        loop = asyncio.get_running_loop()
+        m = self.dev.aser.metrics
+        waits = []
+        for p in payloads:
+            p = bytes(p)
+            key = target_key(p)
+            m.inc("intents_submitted")
+            it = self._pending.get(key)
+            if it is not None:
+                if it.payload != p:
+                    m.inc("intents_superseded")
+                it.payload = p
+                it.gap = _wider(it.gap, gap)
+            else:
+                it = self._pending[key] = _Intent(p, gap, loop.create_future())
+            waits.append(it.done)
+        if not waits:
+            return
+        if self._flusher is None or self._flusher.done():
+            self._flusher = loop.create_task(self._flush())
+        # shield: a cancelled caller must not cancel a write other callers wait on
+        await asyncio.gather(*(asyncio.shield(w) for w in set(waits)))
+
+    def _take(self) -> list[bytes]:
+        self._taken = list(self._pending.values())
+        self._pending.clear()
+        return [it.payload for it in self._taken]
+
+    async def _flush(self):
+        while self._pending:
+            self._taken = []
+            gap = None
+            for it in self._pending.values():
+                gap = _wider(gap, it.gap)
+            try:
+                sent = await self.dev.aser.send_latest(self._take, gap)
+            except Exception as e:
+                for it in self._taken or list(self._pending.values()):
+                    if not it.done.done():
+                        it.done.set_exception(e)
+                if not self._taken:
+                    self._pending.clear()
+                continue
+            self.dev.aser.metrics.inc("intents_sent", len(sent))
+            for it in self._taken:
+                if not it.done.done():
+                    it.done.set_result(None)
+
+
+REGISTRY.attach("intents", IntentQueue)
+INTENTS = DeviceAttr("intents")  # the current device's intent queue
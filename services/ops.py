@@ -0,0 +1,116 @@
+# services/ops.py
+import asyncio
+import collections
+import contextvars
+import secrets
+import time
+
+from serial_async import DeviceNotReady
+from services.device_context import current
+
+OPS_MAX = 256   # finished operations kept for /api/ops/{id}
+
+# The running operation's "target is in the cache" event (set inside its task only)
+_COMMITTED = contextvars.ContextVar("op_committed", default=None)
+
+
+def committed():
+    """
+    services.reconcile.apply calls this right after committing its target to
+    the cache; inside an operation it releases the waiting 202.
+    """
+    ev = _COMMITTED.get()
+    if ev is not None:
+        ev.set()
+
+
+class Operation:
+    """One action running in the background: running -> done | failed."""
+    __slots__ = ("id", "name", "device", "state", "created", "finished", "result", "error", "status_code",
+                 "_done", "_committed")
+
+    def __init__(self, name: str, device: str):
+        self.id = secrets.token_hex(6)
+        self.name = name
+        self.device = device
+        self.state = "running"
+        self.created = time.time()
+        self.finished = None
+        self.result = None
+        self.error = None
+        self.status_code = None
+        self._done = asyncio.Event()
+        self._committed = asyncio.Event()
+
+    def info(self) -> dict:
+        return {
+            "id": self.id, "name": self.name, "device": self.device, "state": self.state,
+            "status_code": self.status_code, "result": self.result, "error": self.error,
+            "created": round(self.created, 3),
+            "elapsed_ms": round(((self.finished or time.time()) - self.created) * 1000, 1),
+        }
+
+
+class OperationLog:
+    """
+    Actions accepted with 202 (routes/ops.py), by operation id.
+
+    start() runs the action as a task in the caller's device context. For
+    actions that go through services.reconcile.apply it returns once the first
+    target is committed to the cache (or the action ended without one), so the
+    client's next read after the 202 shows where the device is heading even if
+    the action first waited on a query. Completion is kept here (bounded) and
+    pushed to /api/events as an 'op' event.
+    """
+
+    def __init__(self, max_ops: int = OPS_MAX):
+        self.max_ops = max_ops
+        self.ops = collections.OrderedDict()
+        self._tasks = set()  # running operations; the loop only keeps weak references
+
+    async def start(self, name: str, action, commits: bool = True) -> Operation:
+        """commits=False: the action has no optimistic commit to wait for (border-only actions)."""
+        dev = current()
+        op = Operation(name, dev.id)
+        self.ops[op.id] = op
+        self._trim()
+        task = asyncio.get_running_loop().create_task(self._run(op, dev, action))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        if commits:
+            await op._committed.wait()
+        return op
+
+    async def _run(self, op: Operation, dev, action):
+        _COMMITTED.set(op._committed)  # this task's context only
+        try:
+            op.result = await action()
+            op.state, op.status_code = "done", 200
+        except Exception as e:
+            # same mapping as routes/errors.http_error: link not ready -> 503
+            op.state, op.error = "failed", str(getattr(e, "detail", None) or e)
+            op.status_code = 503 if isinstance(e, DeviceNotReady) else getattr(e, "status_code", 500)
+            print(f"[OPS] {op.name} ({op.id}) failed: {op.error}")
+        op.finished = time.time()
+        op._committed.set()
+        op._done.set()
+        dev.stream.notify("op", op.info())
+
+    def _trim(self):
+        while len(self.ops) > self.max_ops:
+            old = next((k for k, o in self.ops.items() if o.finished is not None), None)
+            if old is None:
+                break  # everything still running; keep them
+            del self.ops[old]
+
+    def get(self, op_id: str) -> Operation | None:
+        return self.ops.get(op_id)
+
+    async def wait(self, op: Operation, timeout: float):
+        try:
+            await asyncio.wait_for(op._done.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+OPS = OperationLog()
@@ -0,0 +1,141 @@
+# services/pacing.py
+import asyncio
+import time
+
+import vendor.commands as C
+from serial_driver import BURST_MAX
+from serial_pacing import CLASSES, MAX_GAP
+from services.serial_io import ASER
+from services.state_cache import CACHE
+
+# Gaps tried per class, smallest first (seconds)
+CANDIDATES = (0.0, 0.0005, 0.001, 0.002, 0.003, 0.005, 0.008, 0.012, 0.02, 0.03, 0.05, 0.08, 0.12, 0.2)
+CHUNKS = 3          # burst chunks per trial
+ROUNDS = 2          # a gap must pass this many trials in a row
+SETTLE = 0.3        # let the firmware finish (and drop the acks) before reading back
+DROP_WINDOW = 10.0  # a readback that contradicts a write younger than this = dropped command
+
+# cache field -> command class that writes it
+FIELD_CLASS = {"mode": "mode", "quad_layout": "mode", "src": "route", "map": "route", "audio": "audio"}
+
+# A write to the value side also changes this field on the device: "in source"
+# follows window 1, so once the map was written after the route, the readback
+# shows the map's window 1, not the route we sent.
+COUPLED = {"src": "map"}
+
+WINDOWS = [(n, w) for n in (1, 2) for w in range(1, 5)]
+CANARIES = [(n, w) for n in (1, 2) for w in (2, 3, 4)]  # window 1 follows "in source" routes
+
+
+def check_readback(out_n: int, field: str, live):
+    """
+    Compare a fresh readback with what the cache says we just wrote. A recent
+    write the matrix doesn't show was dropped: that class's gap is widened.
+    A match counts toward easing a widened gap back down. `live` must be the
+    exact value of that field (None when the reply only narrows it down), and
+    a field last changed through a COUPLED write is skipped.
+    """
+    have = getattr(CACHE.out(out_n), field)
+    age = CACHE.age(out_n, field)
+    if live is None or have is None or age is None or age > DROP_WINDOW:
+        return
+    coupled = COUPLED.get(field)
+    if coupled is not None:
+        other = CACHE.age(out_n, coupled)
+        if other is not None and other < age:
+            return
+    cls = FIELD_CLASS[field]
+    if have != live:
+        ASER.pacing.on_drop(cls)
+    else:
+        ASER.pacing.on_ok(cls)
+
+
+def _filler(cls: str, i: int) -> bytes:
+    """i-th throwaway command of a class (values rotate so each one is a real change)."""
+    n = 1 + i % 2
+    if cls == "mode":
+        return C.cmd_quad_layout(n, 1 + (i // 2) % 2)
+    if cls == "audio":
+        return C.cmd_audio(n, (i // 2) % 5)
+    if cls == "border":
+        return C.cmd_border_color(n, 1 + (i // 2) % 4, 2 + i % 3)
+    return C.cmd_route_output_input(n, 1 + (i // 2) % 4)
+
+
+async def _trial(cls: str, gap: float, round_no: int) -> bool:
+    """
+    CHUNKS burst chunks of `cls` commands paced at `gap`, each ending in a
+    window-input canary; every canary read back = nothing was lost.
+    """
+    step = max(2, BURST_MAX)
+    payloads, canaries = [], {}
+    for k in range(CHUNKS):
+        payloads += [_filler(cls, k * step + j) for j in range(step - 1)]
+        n, w = CANARIES[k % len(CANARIES)]
+        s = 1 + (round_no + k + w) % 4
+        canaries[(n, w)] = s
+        payloads.append(C.cmd_set_window_input(n, w, s))
+    await ASER.send_burst(payloads, gap=gap)
+    await asyncio.sleep(SETTLE)
+    reps = await ASER.send_pipelined([C.q_window_in_source(n, w) for n, w in canaries])
+    return all(C.parse_hdmi_number(r) == s for r, s in zip(reps, canaries.values()))
+
+
+async def _read_layout() -> dict:
+    reps = await ASER.send_pipelined(
+        [C.q_out_multiview(1), C.q_out_multiview(2), C.q_out_quad_mode(1), C.q_out_quad_mode(2),
+         C.q_out_in_source(1), C.q_out_in_source(2)]
+        + [C.q_window_in_source(n, w) for n, w in WINDOWS])
+    mv = [C.parse_multiview_mode(r) for r in reps[0:2]]
+    layout = [C.parse_reply(r).layout for r in reps[2:4]]
+    src = [C.parse_hdmi_number(r) for r in reps[4:6]]
+    wins = [C.parse_hdmi_number(r) for r in reps[6:]]
+    return {"mv": mv, "layout": layout, "src": src, "wins": dict(zip(WINDOWS, wins))}
+
+
+def _restore_cmds(saved: dict) -> list[bytes]:
+    cmds = []
+    for i, n in enumerate((1, 2)):
+        if saved["mv"][i]:
+            cmds.append(C.cmd_multiview(n, saved["mv"][i]))
+        if saved["layout"][i]:
+            cmds.append(C.cmd_quad_layout(n, saved["layout"][i]))
+        if saved["src"][i]:
+            cmds.append(C.cmd_route_output_input(n, saved["src"][i]))
+    cmds += [C.cmd_set_window_input(n, w, s) for (n, w), s in saved["wins"].items() if s]
+    return cmds
+
+
+async def calibrate(classes=CLASSES) -> dict:
+    """
+    Find the smallest safe chunk gap per command class on the current device:
+    for each class, candidate gaps are tried smallest first until one passes
+    ROUNDS trials in a row; the next candidate up is kept as margin. Routing,
+    layouts and borders flicker while this runs. Afterwards the routes and
+    layouts read at the start are written back, and the cache is dropped
+    (audio and borders were changed and are re-sent by the next action).
+    """
+    t0 = time.perf_counter()
+    saved = await _read_layout()
+    found, trials = {}, 0
+    for cls in classes:
+        found[cls] = MAX_GAP
+        for i, gap in enumerate(CANDIDATES):
+            ok = True
+            for r in range(ROUNDS):
+                trials += 1
+                if not await _trial(cls, gap, r):
+                    ok = False
+                    break
+            if ok:
+                found[cls] = CANDIDATES[min(i + 1, len(CANDIDATES) - 1)]
+                break
+            await asyncio.sleep(SETTLE)  # let a flooded firmware catch up before the next try
+        print(f"[PACING] {cls}: {found[cls] * 1000:.1f} ms")
+
+    await ASER.send_burst(_restore_cmds(saved), gap=max(found.values()))
+    CACHE.restore_border({n: {"window": None, "colors": {}} for n in (1, 2)})
+    CACHE.clear()
+    ASER.pacing.calibrated(found)
+    return {"gaps": found, "trials": trials, "elapsed_s": round(time.perf_counter() - t0, 2)}
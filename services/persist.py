@@ -0,0 +1,226 @@
+# services/persist.py
+import json
+import os
+import time
+
+import vendor.commands as C
+from serial_driver import MOCK
+from serial_async import DeviceNotReady
+from serial_sched import priority
+from services.device_context import DeviceAttr
+from services.devices import REGISTRY
+from services.state_cache import WindowMap
+
+STATE_FILE = os.getenv("STATE_FILE", "state_snapshot.jsonl")
+COMPACT_EVERY = 200  # appended records before the log is rewritten
+
+# Reserved record keys for state that lives outside CACHE.data (featured, border records)
+K_FEATURED = "featured_source"
+K_BORDER = "_border"
+
+
+def state_path(dev_id: str) -> str:
+    """STATE_FILE for the default device, <stem>.<id><ext> for the others."""
+    if dev_id == REGISTRY.default.id:
+        return STATE_FILE
+    stem, ext = os.path.splitext(STATE_FILE)
+    return f"{stem}.{dev_id}{ext}"
+
+
+def _decode(k: str, v):
+    # JSON turns int dict keys into strings; window maps / border state use ints
+    if isinstance(v, dict) and k.endswith("_map"):
+        return {int(w): s for w, s in v.items()}
+    if k == K_BORDER:
+        out = {}
+        for n, st in v.items():
+            st = dict(st)
+            st["colors"] = {int(w): c for w, c in (st.get("colors") or {}).items()}
+            out[int(n)] = st
+        return out
+    return v
+
+
+class StateSnapshot:
+    """
+    On-disk copy of MatrixCache so a restart has a usable UI immediately.
+
+    Every cache change is appended as one JSON line; once COMPACT_EVERY records
+    pile up the log is rewritten to just the current state (tmp file + fsync +
+    os.replace, so a crash leaves either the old or the new file). Restored
+    entries are marked "restored" with their age until a cheap readback
+    confirms them ("verified") or a live write replaces them ("live").
+    """
+
+    def __init__(self, dev, path: str | None = None):
+        self.dev = dev
+        self.cache = dev.cache
+        self.path = path or state_path(dev.id)
+        self._fh = None
+        self._appended = 0
+        self._loading = False
+        self._border_json = None
+        self.confidence = {}  # key -> "restored" | "verified" (absent = live)
+        self.cache.subscribe(self._on_change)
+
+    # ---------------- load ----------------
+
+    def load(self) -> int:
+        """Replay the log into self.cache. Returns number of keys restored."""
+        if not os.path.exists(self.path):
+            return 0
+        now = time.time()
+        self._loading = True
+        try:
+            with open(self.path, "r", encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line after a crash
+                    self._replay(rec)
+        finally:
+            self._loading = False
+
+        for k in self.cache.data:
+            self.confidence[k] = "restored"
+        if self.cache.featured_source is not None:
+            self.confidence[K_FEATURED] = "restored"
+        oldest = min((self.cache.stamp(k) or now for k in self.cache.data), default=now)
+        print(f"[STATE] Restored {len(self.cache.data)} keys from {self.path} (oldest {now - oldest:.0f}s)")
+        self.compact()
+        return len(self.cache.data)
+
+    def _replay(self, rec: dict):
+        k = rec.get("k")
+        try:
+            if rec.get("clear"):
+                self.cache.clear(k)
+            elif k == K_FEATURED:
+                self.cache.featured_source = rec.get("v")
+            elif k == K_BORDER:
+                self.cache.restore_border(_decode(k, rec.get("v") or {}))
+            elif k is not None:
+                self.cache.restore(k, _decode(k, rec.get("v")), rec.get("t", 0.0))
+        except ValueError as e:  # e.g. a window outside 1..4 in a hand-edited file
+            print(f"[STATE] (warn) skipping {k} record: {e}")
+
+    # ---------------- write ----------------
+
+    def _append(self, rec: dict):
+        if self._fh is None:
+            self._fh = open(self.path, "a", encoding="utf-8")
+        self._fh.write(json.dumps(rec, separators=(",", ":")) + "\n")
+        self._fh.flush()
+        self._appended += 1
+        if self._appended >= COMPACT_EVERY:
+            self.compact()
+
+    def _on_change(self, k, changed=True):
+        if self._loading:
+            return
+        if k != K_FEATURED:
+            self.confidence.pop(k, None)  # a live write or readback, even if it only re-confirmed
+        try:
+            if k == K_FEATURED:
+                self.confidence.pop(K_FEATURED, None)
+                self._append({"k": K_FEATURED, "v": self.cache.featured_source})
+            elif changed:  # a re-confirmed value has nothing new to replay
+                v = self.cache.get(k)
+                if v is None:
+                    self._append({"k": k, "clear": True})
+                else:
+                    self._append({"k": k, "v": v, "t": self.cache.stamp(k) or 0.0})
+            # border records are mutated in place by services.borders; record them when they moved
+            bj = json.dumps(self.cache.border_state, sort_keys=True)
+            if bj != self._border_json:
+                self._border_json = bj
+                self._append({"k": K_BORDER, "v": self.cache.border_state})
+        except OSError as e:
+            print(f"[STATE] (warn) snapshot write failed: {e}")
+
+    def compact(self):
+        """Rewrite the log as the current state only (atomic replace)."""
+        recs = [{"k": k, "v": v, "t": self.cache.stamp(k) or 0.0} for k, v in self.cache.data.items()]
+        recs.append({"k": K_FEATURED, "v": self.cache.featured_source})
+        recs.append({"k": K_BORDER, "v": self.cache.border_state})
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as fh:
+                for rec in recs:
+                    fh.write(json.dumps(rec, separators=(",", ":")) + "\n")
+                fh.flush()
+                os.fsync(fh.fileno())
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+            os.replace(tmp, self.path)
+            self._appended = 0
+            self._border_json = json.dumps(self.cache.border_state, sort_keys=True)
+        except OSError as e:
+            print(f"[STATE] (warn) compaction failed: {e}")
+
+    def close(self):
+        self.compact()
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    # ---------------- confidence ----------------
+
+    def info(self) -> dict:
+        now = time.time()
+        out = {}
+        for k in self.cache.data:
+            out[k] = {"source": self.confidence.get(k, "live"), "age": round(now - (self.cache.stamp(k) or now), 1)}
+        if self.cache.featured_source is not None:
+            out[K_FEATURED] = {"source": self.confidence.get(K_FEATURED, "live"), "age": None}
+        return out
+
+    async def verify_restored(self):
+        """
+        Cheap background check of restored state: one mode query per output.
+        Match -> the mode becomes "verified"; the output's other keys (map,
+        borders) were not read back and stay "restored". Mismatch -> they are
+        all dropped so the next action re-queries. No reply -> left as restored.
+        """
+        if MOCK or not self.confidence:
+            return
+        try:
+            await self.dev.aser.wait_ready(timeout=60.0)
+        except DeviceNotReady as e:
+            print(f"[STATE] (warn) {self.dev.id}: skipping verify: {e}")
+            return
+        for out_n in (1, 2):
+            prefix = f"out{out_n}_"
+            restored_mode = self.cache.out(out_n).mode
+            if restored_mode is None or self.confidence.get(f"out{out_n}_mode") != "restored":
+                continue
+            try:
+                with priority("background"):
+                    if out_n == 1:
+                        rep = await self.dev.aser.send(C.q_out_multiview(1))
+                        m = C.parse_multiview_mode(rep)
+                        live = "single" if m == 1 else ("quad" if m == 5 else "other")
+                    else:
+                        rep = await self.dev.aser.send(C.q_out_quad_mode(2))
+                        live = "quad" if C.is_quad_from_quadmode(rep) else "other"
+            except Exception as e:
+                print(f"[STATE] (warn) {self.dev.id} verify OUT{out_n} failed: {e}")
+                continue
+            if not rep:
+                continue
+            # out2 can only be told apart as quad / not quad
+            same = live == restored_mode or (out_n == 2 and live == "other" and restored_mode != "quad")
+            if same:
+                self.confidence[f"out{out_n}_mode"] = "verified"
+                print(f"[STATE] {self.dev.id} OUT{out_n} restored mode verified ({live})")
+            else:
+                print(f"[STATE] {self.dev.id} OUT{out_n} changed while we were down ({restored_mode} -> {live}); dropping restored state")
+                self.cache.out(out_n).border.colors = WindowMap()
+                self.cache.clear(prefix)  # includes the border window
+                self.cache.put(out_n, "mode", live)
+
+
+REGISTRY.attach("snapshot", StateSnapshot)
+SNAPSHOT = DeviceAttr("snapshot")  # the current device's snapshot
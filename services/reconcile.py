@@ -0,0 +1,147 @@
+# services/reconcile.py
+import vendor.commands as C
+from services.intents import INTENTS
+from services.state_cache import CACHE, WindowMap
+from services.borders import _get_out_state
+from services.ops import committed
+
+# Plan order across all outputs: audio first, then video, then borders.
+PHASES = ("audio", "video", "borders")
+
+def known_state(out_n: int) -> dict:
+    """What the cache believes output 'out_n' currently looks like (None = unknown)."""
+    o = CACHE.out(out_n)
+    bs = o.border
+    return {
+        "mode": o.mode,
+        "src": o.src,
+        "quad_layout": o.quad_layout,
+        "map": o.map,
+        "audio": o.audio,
+        "border_window": bs.window or 0,
+        "border_color": bs.color,
+        "colors": bs.colors,
+    }
+
+def _unknown_state() -> dict:
+    return {"mode": None, "src": None, "quad_layout": None, "map": {}, "audio": None,
+            "border_window": 0, "border_color": None, "colors": {}}
+
+def _plan_audio(out_n: int, want: dict, have: dict, add):
+    audio = want.get("audio")
+    if audio is not None and audio != have["audio"]:
+        add(C.cmd_audio(out_n, audio))
+
+def _plan_video(out_n: int, want: dict, have: dict, add):
+    mode = want.get("mode")
+    if mode == "single" and have["mode"] != "single":
+        add(C.cmd_single(out_n))
+    elif mode == "quad" and have["mode"] != "quad":
+        add(C.cmd_multiview(out_n, 5))
+
+    src = want.get("src")
+    if src is not None and src != have["src"]:
+        add(C.cmd_route_output_input(out_n, src))
+
+    layout = want.get("quad_layout")
+    if layout is not None and layout != have["quad_layout"]:
+        add(C.cmd_quad_layout(out_n, layout))
+
+    for w, s in sorted((want.get("map") or {}).items()):
+        if have["map"].get(w) != s:
+            add(C.cmd_set_window_input(out_n, w, s))
+
+def _plan_borders(out_n: int, want: dict, have: dict, add):
+    win, color = want.get("border_window"), want.get("border_color")
+    if win is None and color is None:
+        return
+    cur, cur_color = have["border_window"], have["border_color"]
+    win = cur if win is None else win
+    color = cur_color if color is None else color
+
+    if win == cur:
+        if win and have["colors"].get(win) != color:
+            add(C.cmd_border_color(out_n, win, color))
+        return
+    if cur:
+        add(C.cmd_border(out_n, cur, False))
+    if win:
+        if have["colors"].get(win) != color:
+            add(C.cmd_border_color(out_n, win, color))
+        add(C.cmd_border(out_n, win, True))
+
+def plan(target: dict[int, dict], force: bool = False) -> list[tuple[str, int, bytes]]:
+    """
+    Diff a full/partial target against the cache and return the shortest ordered
+    command plan as (phase, out_n, payload) tuples. Unknown cache state always
+    gets a command; known-equal state never does. force=True ignores the cache
+    (baseline / "Set to Default" paths that must not trust it).
+    """
+    steps = {p: [] for p in PHASES}
+    for out_n in sorted(target):
+        want = target[out_n]
+        have = _unknown_state() if force else known_state(out_n)
+        for phase, fn in (("audio", _plan_audio), ("video", _plan_video), ("borders", _plan_borders)):
+            fn(out_n, want, have, lambda cmd, _p=phase, _o=out_n: steps[_p].append((_p, _o, cmd)))
+    return [s for p in PHASES for s in steps[p]]
+
+def describe(steps) -> list[dict]:
+    return [{"phase": p, "out": o, "cmd": cmd.decode("ascii")} for p, o, cmd in steps]
+
+def _commit(target: dict[int, dict]):
+    """
+    Record the target as the new known state. The route ("in source") and
+    window 1 are one input on the device, so committing either updates both
+    (window writes go out after the route, so a map's window 1 wins).
+    """
+    for out_n, want in target.items():
+        for field in ("mode", "src", "quad_layout", "audio"):
+            if want.get(field) is not None:
+                CACHE.put(out_n, field, want[field])
+        if want.get("src") is not None and CACHE.age(out_n, "map") is not None:
+            CACHE.put_windows(out_n, {1: want["src"]})  # an unread map stays unread (ensure_maps_cached)
+        if want.get("map"):
+            CACHE.put_windows(out_n, want["map"])
+            if want["map"].get(1) is not None:
+                CACHE.put(out_n, "src", want["map"][1])
+
+        win, color = want.get("border_window"), want.get("border_color")
+        if win is None and color is None:
+            continue
+        st = _get_out_state(out_n)
+        if color is not None:
+            st.color = color
+        if win is not None:
+            CACHE.put(out_n, "border_window", win or None)
+        if st.window:
+            st.colors[st.window] = st.color
+
+def _forget(target: dict[int, dict]):
+    """A plan failed to send: stop trusting what the cache says about those outputs."""
+    for out_n in target:
+        CACHE.clear(f"out{out_n}_")
+        _get_out_state(out_n).colors = WindowMap()
+
+async def apply(target: dict[int, dict], dry_run: bool = False, force: bool = False,
+                delay_each: float | None = None, steps=None) -> list[tuple[str, int, bytes]]:
+    """
+    Plan, then (unless dry_run) commit the target to the cache and send the plan
+    as last-write-wins intents. Committing first means a click arriving while
+    this plan is still queued plans from the state we're heading to, and its
+    commands replace ours target by target (services/intents.py).
+    steps: an already compiled plan for this target (services/scenes.py).
+    delay_each=None paces from the device's calibrated profile (serial_pacing.py).
+    """
+    if steps is None:
+        steps = plan(target, force=force)
+    if dry_run:
+        return steps
+    _commit(target)
+    committed()  # an operation accepted with 202 can answer now
+    if steps:
+        try:
+            await INTENTS.submit([cmd for _, _, cmd in steps], gap=delay_each)
+        except Exception:
+            _forget(target)
+            raise
+    return steps
@@ -0,0 +1,154 @@
+# services/scenes.py
+import json
+import os
+import time
+
+from pydantic import ValidationError
+
+import vendor.commands as C
+from domain.models import Scene
+from serial_driver import BURST_MAX
+from services.device_context import current
+from services.reconcile import apply, plan
+from services.state_cache import CACHE
+
+SCENES_FILE = os.getenv("SCENES_FILE", "scenes.json")
+
+
+class CompiledScene:
+    """A scene's full command plan, built once per revision."""
+    __slots__ = ("revision", "target", "steps", "payloads")
+
+    def __init__(self, revision: int, target: dict[int, dict]):
+        self.revision = revision
+        self.target = target
+        steps = plan(target, force=True)  # everything, in audio -> video -> borders order
+        # A forced plan only turns the target window on; a cold recall must also
+        # switch every other window's border off.
+        offs = [("borders", n, C.cmd_border(n, w, False))
+                for n, t in sorted(target.items()) if t.get("border_window") is not None
+                for w in range(1, 5) if w != t["border_window"]]
+        self.steps = [s for s in steps if s[0] != "borders"] + offs + [s for s in steps if s[0] == "borders"]
+        self.payloads = [cmd for _, _, cmd in self.steps]
+
+
+class SceneLibrary:
+    """
+    Named layouts ("OUT1 single HDMI3 + OUT2 quad 1..4, HDMI3 outlined"), kept
+    in SCENES_FILE and shared by every device.
+
+    Each scene is a desired-state target compiled ahead of time into its full
+    command plan; the compile is cached and redone only when the scene is
+    edited. Recall goes through services.reconcile.apply in one go: the whole
+    target is committed to the cache at once and the commands leave as one
+    burst (one port grant). When the cache already knows the outputs involved,
+    only the commands that differ are sent; otherwise (cold cache, or force)
+    the compiled plan goes out as is.
+    """
+
+    def __init__(self, path: str = SCENES_FILE):
+        self.path = path
+        self.scenes = {}      # name -> {"description": str, "outputs": {n: target}}
+        self.revision = {}    # name -> edit counter
+        self.stats = {}       # name -> {"recalls", "last_ms", "total_ms"}
+        self._compiled = {}   # name -> CompiledScene
+
+    # ---------------- storage ----------------
+
+    def load(self) -> int:
+        if not os.path.exists(self.path):
+            return 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as fh:
+                raw = json.load(fh)
+        except (OSError, ValueError) as e:
+            print(f"[SCENES] (warn) could not read {self.path}: {e}")
+            return 0
+        for name, sc in (raw.get("scenes") or {}).items():
+            # hand-edited files get the same checks as PUT /api/scenes/{name}
+            try:
+                body = Scene.model_validate(sc)
+                if any(n not in (1, 2) for n in body.outputs):
+                    raise ValueError(f"unknown output(s): {sorted(body.outputs)}")
+            except (ValidationError, ValueError) as e:
+                print(f"[SCENES] (warn) skipping scene {name!r}: {e}")
+                continue
+            outputs = {n: t.model_dump(exclude_none=True) for n, t in body.outputs.items()}
+            self._store(name, {"description": body.description, "outputs": outputs})
+            self.compiled(name)
+        print(f"[SCENES] Loaded {len(self.scenes)} scene(s) from {self.path}")
+        return len(self.scenes)
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump({"scenes": self.scenes}, fh, indent=2, sort_keys=True)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, self.path)
+
+    def _store(self, name: str, scene: dict):
+        self.scenes[name] = scene
+        self.revision[name] = self.revision.get(name, 0) + 1
+        self._compiled.pop(name, None)
+
+    # ---------------- editing ----------------
+
+    def put(self, name: str, outputs: dict[int, dict], description: str = "") -> dict:
+        self._store(name, {"description": description, "outputs": outputs})
+        self._save()
+        return self.info(name)
+
+    def delete(self, name: str) -> bool:
+        if self.scenes.pop(name, None) is None:
+            return False
+        self._compiled.pop(name, None)
+        self.revision.pop(name, None)
+        self.stats.pop(name, None)
+        self._save()
+        return True
+
+    def compiled(self, name: str) -> CompiledScene:
+        """KeyError for unknown scenes."""
+        c = self._compiled.get(name)
+        if c is None or c.revision != self.revision[name]:
+            c = self._compiled[name] = CompiledScene(self.revision[name], self.scenes[name]["outputs"])
+        return c
+
+    def info(self, name: str) -> dict:
+        sc = self.scenes[name]
+        c = self.compiled(name)
+        return {
+            "name": name,
+            "description": sc["description"],
+            "outputs": sc["outputs"],
+            "revision": c.revision,
+            "commands": len(c.payloads),
+            "bytes": sum(len(p) for p in c.payloads),
+            "bursts": -(-len(c.payloads) // max(1, BURST_MAX)),  # BURST_MAX-command writes
+            "stats": self.stats.get(name, {"recalls": 0}),
+        }
+
+    # ---------------- recall ----------------
+
+    async def recall(self, name: str, force: bool = False, dry_run: bool = False) -> dict:
+        """Apply a scene on the current device. Returns what was sent and how long it took."""
+        t0 = time.perf_counter()
+        c = self.compiled(name)
+        known = all(CACHE.out(n).mode is not None for n in c.target)
+        if force or not known:
+            steps, kind = c.steps, "full"
+        else:
+            steps, kind = plan(c.target), "diff"
+        steps = await apply(c.target, dry_run=dry_run, steps=steps)
+        elapsed = time.perf_counter() - t0
+        if not dry_run:
+            st = self.stats.setdefault(name, {"recalls": 0, "last_ms": 0.0, "total_ms": 0.0})
+            st["recalls"] += 1
+            st["last_ms"] = round(elapsed * 1000, 2)
+            st["total_ms"] = round(st["total_ms"] + elapsed * 1000, 2)
+            current().aser.metrics.scene(name, elapsed)
+        return {"steps": steps, "kind": kind, "elapsed_ms": round(elapsed * 1000, 2)}
+
+
+SCENES = SceneLibrary()
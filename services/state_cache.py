@@ -1,38 +1,283 @@
 # services/state_cache.py
+import collections
 from time import time
+from services.device_context import DeviceAttr
+
+JOURNAL_MAX = 256   # recent (version, key) changes kept for /api/ui/changes
+
+OUTPUTS = (1, 2)
+WINDOWS = 4
+DEFAULT_BORDER_COLOR = 2  # RED
+
+# Fixed layout: record 0 holds device-wide settings, record n output n.
+OUT_FIELDS = ("mode", "src", "audio", "quad_layout", "map", "border_window")
+SETTING_FIELDS = ("border_color_id", "border_color_default")
+
+# Legacy string keys ("out1_map", "border_color_id") <-> (record, field), built once
+KEYS = {f"out{n}_{f}": (n, f) for n in OUTPUTS for f in OUT_FIELDS}
+KEYS.update({f: (0, f) for f in SETTING_FIELDS})
+NAMES = {slot: k for k, slot in KEYS.items()}
+
+
+class WindowMap:
+    """Input shown in each window 1..WINDOWS, array-backed (None = unknown)."""
+    __slots__ = ("_v",)
+
+    def __init__(self, mapping=None):
+        self._v = [None] * WINDOWS
+        if mapping:
+            self.update(mapping)
+
+    def get(self, w, default=None):
+        v = self._v[w - 1] if 1 <= w <= WINDOWS else None
+        return default if v is None else v
+
+    @staticmethod
+    def _slot(w) -> int:
+        w = int(w)
+        if not 1 <= w <= WINDOWS:  # no negative indexing into the array
+            raise ValueError(f"window {w} out of range 1..{WINDOWS}")
+        return w - 1
+
+    def __setitem__(self, w, s):
+        self._v[self._slot(w)] = s
+
+    def update(self, mapping):
+        for w, s in mapping.items():
+            self._v[self._slot(w)] = s
+
+    def items(self):
+        return [(i + 1, s) for i, s in enumerate(self._v) if s is not None]
+
+    def as_dict(self) -> dict:
+        return dict(self.items())
+
+    def copy(self):
+        m = WindowMap()
+        m._v = list(self._v)
+        return m
+
+    def __bool__(self):
+        return any(s is not None for s in self._v)
+
+    def __eq__(self, other):
+        if isinstance(other, WindowMap):
+            return self._v == other._v
+        return isinstance(other, dict) and self.as_dict() == other
+
+    def __repr__(self):
+        return f"WindowMap({self.as_dict()})"
+
+
+class BorderState:
+    """Highlighted window, armed color and last color written per window, for one output."""
+    __slots__ = ("window", "color", "colors")
+
+    def __init__(self, color=DEFAULT_BORDER_COLOR):
+        self.window = None
+        self.color = color
+        self.colors = WindowMap()
+
+    def as_dict(self) -> dict:
+        return {"window": self.window, "color": self.color, "colors": self.colors.as_dict()}
+
+    def load(self, d: dict):
+        self.window = d.get("window")
+        self.color = d.get("color", self.color)
+        self.colors = WindowMap(d.get("colors") or {})
+
+
+class OutputState:
+    """
+    What we believe one output looks like. None / empty map = unknown.
+    border_window is the border record's window under its cache key, so
+    CACHE.put(n, "border_window", w) is the one way to move the highlight.
+    """
+    __slots__ = tuple(f for f in OUT_FIELDS if f != "border_window") + ("border",)
+
+    def __init__(self):
+        self.border = BorderState()
+        self.reset()
+
+    @property
+    def border_window(self):
+        return self.border.window
+
+    @border_window.setter
+    def border_window(self, w):
+        self.border.window = w
+
+    def reset(self):
+        """Forget the routing fields (the border record has its own lifecycle)."""
+        self.mode = self.src = self.audio = self.quad_layout = None
+        self.map = WindowMap()
+
+
+class Settings:
+    __slots__ = SETTING_FIELDS
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.border_color_id = self.border_color_default = None
+
 
 class MatrixCache:
+    """
+    Typed, fixed-layout state for one matrix: a Settings record plus one
+    OutputState per output, field access by attribute (CACHE.out(1).mode).
+
+    Staleness (when each field was last written) lives in its own `ts` table
+    keyed by (record, field). Writes go through put() so the version, journal
+    and listeners see them. Readers that serialize the whole state share
+    `data`: a legacy string-keyed dict built at most once per version and
+    replaced, never mutated, when something changes (copy-on-write).
+    """
+
     def __init__(self):
-        self.data = {}
-        self.ts = {}
-        self.featured_source = None
-        self.out2_border_src = None
-        self.last_sent = {}
-        # NEW: track last highlighted window & color per output to avoid clears
-        self.border_state = {
-            1: {"window": None, "color": 2},  # default RED
-            2: {"window": None, "color": 2},
-        }
+        self._recs = [Settings()] + [OutputState() for _ in OUTPUTS]
+        self.settings = self._recs[0]
+        self.ts = {}                 # (record, field) -> last write (time())
+        self._featured_source = None
+        # change listeners (e.g. the /api/events producer): fn(key, changed), where
+        # changed=False means a write that re-confirmed the value already held
+        self._listeners = []
+        # Bumped on every write that changes a value. Starts at the clock (ms) so a
+        # version handed out before a restart is never mistaken for a current one.
+        self.version = int(time() * 1000)
+        self.journal = collections.deque(maxlen=JOURNAL_MAX)  # (version, key or clear prefix)
+        self._view = None
+        self._view_version = None
+
+    def out(self, out_n: int) -> OutputState:
+        return self._recs[out_n]
+
+    def subscribe(self, fn):
+        self._listeners.append(fn)
+
+    def _changed(self, k, bump=True):
+        if bump:
+            self.version += 1
+            self.journal.append((self.version, k))
+        for fn in self._listeners:
+            fn(k, bump)
+
+    def changed_since(self, version: int) -> set | None:
+        """
+        Keys written after `version` (a None entry = everything was cleared, a
+        str prefix = that group was cleared). None when the journal no longer
+        reaches back that far, or the version isn't ours: resync in full.
+        """
+        if version == self.version:
+            return set()
+        if version > self.version or not self.journal or self.journal[0][0] > version + 1:
+            return None
+        return {k for v, k in self.journal if v > version}
+
+    @property
+    def featured_source(self):
+        return self._featured_source
+
+    @featured_source.setter
+    def featured_source(self, v):
+        if v != self._featured_source:
+            self._featured_source = v
+            self._changed("featured_source")
+
+    # ---------------- typed access ----------------
+
+    def put(self, rec: int, field: str, v):
+        """Write one field (rec 0 = settings, n = output n). Window maps replace the whole map."""
+        r = self._recs[rec]
+        if field == "map":
+            v = v.copy() if isinstance(v, WindowMap) else WindowMap(v)
+        same = getattr(r, field) == v
+        setattr(r, field, v)
+        self.ts[(rec, field)] = time()
+        self._changed(NAMES[(rec, field)], bump=not same)  # re-confirming a value keeps the version (and ETags) valid
+
+    def put_windows(self, out_n: int, mapping: dict):
+        """Merge window -> input entries into output out_n's map."""
+        m = self._recs[out_n].map.copy()
+        m.update(mapping)
+        self.put(out_n, "map", m)
+
+    def age(self, rec: int, field: str) -> float | None:
+        t = self.ts.get((rec, field))
+        return None if t is None else time() - t
+
+    # ---------------- legacy string keys ----------------
+
+    @property
+    def data(self) -> dict:
+        """Known fields under their string keys. Shared between readers: don't mutate."""
+        if self._view_version != self.version:
+            view = {}
+            for k, (rec, field) in KEYS.items():
+                v = getattr(self._recs[rec], field)
+                if field == "map":
+                    if v:
+                        view[k] = v.as_dict()
+                elif v is not None:
+                    view[k] = v
+            self._view, self._view_version = view, self.version
+        return self._view
 
     def set(self, k, v):
-        self.data[k] = v
-        self.ts[k] = time()
+        self.put(*KEYS[k], v)
 
     def get(self, k, max_age=None):
-        if k not in self.data:
+        slot = KEYS.get(k)
+        if slot is None:
+            return None
+        v = getattr(self._recs[slot[0]], slot[1])
+        if slot[1] == "map":
+            v = v.as_dict() if v else None
+        if v is None:
             return None
-        if max_age is not None and (time() - self.ts.get(k, 0)) > max_age:
+        if max_age is not None and (time() - self.ts.get(slot, 0)) > max_age:
             return None
-        return self.data[k]
+        return v
+
+    def stamp(self, k) -> float | None:
+        slot = KEYS.get(k)
+        return None if slot is None else self.ts.get(slot)
+
+    def restore(self, k, v, t: float = 0.0) -> bool:
+        """Load one key from disk without notifying listeners. False = not part of the layout."""
+        slot = KEYS.get(k)
+        if slot is None:
+            return False
+        setattr(self._recs[slot[0]], slot[1], WindowMap(v) if slot[1] == "map" else v)
+        self.ts[slot] = t
+        self.version += 1  # invalidates the shared view; the journal gap forces full resyncs
+        return True
 
     def clear(self, prefix=None):
         if prefix is None:
-            self.data.clear()
+            for r in self._recs:
+                r.reset()
             self.ts.clear()
         else:
-            for k in list(self.data.keys()):
-                if str(k).startswith(prefix):
-                    self.data.pop(k, None)
-                    self.ts.pop(k, None)
+            for k, slot in KEYS.items():
+                if k.startswith(prefix):
+                    r = self._recs[slot[0]]
+                    setattr(r, slot[1], WindowMap() if slot[1] == "map" else None)
+                    self.ts.pop(slot, None)
+        self._changed(prefix)
+
+    # ---------------- border records ----------------
+
+    @property
+    def border_state(self) -> dict:
+        """Per-output border records as plain dicts (for persistence)."""
+        return {n: self._recs[n].border.as_dict() for n in OUTPUTS}
+
+    def restore_border(self, state: dict):
+        for n, d in state.items():
+            if int(n) in OUTPUTS:
+                self._recs[int(n)].border.load(d)
 
-CACHE = MatrixCache()
+# the current device's cache (services/devices.py owns one MatrixCache per matrix)
+CACHE = DeviceAttr("cache")
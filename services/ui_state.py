@@ -0,0 +1,61 @@
+# services/ui_state.py
+from services.state_cache import CACHE
+
+def ui_snapshot() -> dict:
+    """
+    UI-facing view of the cache (what /api/ui returns and /api/events streams).
+    Also keeps CACHE.featured_source consistent with the current mode/routing.
+    """
+    o1, o2 = CACHE.out(1), CACHE.out(2)
+
+    out1_mode = o1.mode or "single"
+    out1_map  = o1.map.as_dict()
+    out1_src  = o1.src
+
+    out2_mode = o2.mode
+    out2_map  = o2.map.as_dict()
+    out2_layout = o2.quad_layout
+
+    # Single global color id (default RED=2)
+    color_id = CACHE.settings.border_color_id or 2
+
+    # Keep featured consistent with current mode/routing
+    mode = out1_mode
+    if mode == "single":
+        featured = o1.src or o1.audio or (CACHE.featured_source or 1)
+    else:
+        featured = o1.audio or (CACHE.featured_source or 1)
+    if featured != (CACHE.featured_source or None):
+        CACHE.featured_source = featured
+
+    return {
+        "out1_mode": out1_mode,
+        "out1_map": out1_map,
+        "out1_src": out1_src,
+        "featured_source": featured,
+        "border_color_id": color_id,
+        "out2_mode": out2_mode,
+        "out2_map": out2_map,
+        "out2_quad_layout": out2_layout,
+    }
+
+# cache keys each UI key is built from (besides featured, every UI key is its own cache key)
+UI_SOURCES = {
+    "out1_mode": ("out1_mode",),
+    "out1_map": ("out1_map",),
+    "out1_src": ("out1_src",),
+    "featured_source": ("featured_source", "out1_mode", "out1_src", "out1_audio"),
+    "border_color_id": ("border_color_id",),
+    "out2_mode": ("out2_mode",),
+    "out2_map": ("out2_map",),
+    "out2_quad_layout": ("out2_quad_layout",),
+}
+
+def ui_keys_for(changed: set) -> set | None:
+    """UI keys affected by a set of changed cache keys (see MatrixCache.changed_since); None = all."""
+    if None in changed:
+        return None
+    return {
+        ui for ui, sources in UI_SOURCES.items()
+        if any(src.startswith(k) for k in changed for src in sources)
+    }
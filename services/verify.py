@@ -0,0 +1,160 @@
+# services/verify.py
+import asyncio
+import collections
+import os
+import random
+import time
+
+from serial_driver import BURST_MAX, MOCK
+from serial_pacing import command_class
+from serial_sched import priority
+from vendor import codec as K
+from services.device_context import DeviceAttr, use
+from services.devices import REGISTRY
+
+VERIFY_WRITES = os.getenv("VERIFY_WRITES", "false").lower() == "true"
+VERIFY_SAMPLE = float(os.getenv("VERIFY_SAMPLE", "1.0"))   # fraction of verifiable writes checked
+VERIFY_DELAY = float(os.getenv("VERIFY_DELAY", "0.5"))     # quiet time after the last write before reading back
+MAX_AGE = 30.0       # writes not checked by then are forgotten
+REPAIR_TRIES = 2     # re-sends of one write before giving up on it
+RECENT_MAX = 20      # divergences kept for /api/verify-stats
+
+
+class WriteVerifier:
+    """
+    Background check that set commands actually took (one per device).
+
+    The serial layer reports every set it writes (AsyncMatrixSerial.on_written);
+    writes with a readback (routes and window inputs, see codec.READBACK) are
+    remembered last-write-wins per query. Once writes have been quiet for
+    VERIFY_DELAY, up to one pipelined chunk of them is read back at background
+    priority, after the click's response has gone out.
+
+    Reply matches -> counts toward relaxing the pacing gap. Reply differs while
+    the cache still wants the written value -> the command was dropped: it is
+    re-sent and its class's gap widened. Reply differs and the cache has moved
+    on (or forgot) -> counted as diverged and left to refresh-state.
+    """
+
+    def __init__(self, dev):
+        self.dev = dev
+        self._pending = {}     # query -> [payload, expected input, written at, repairs]
+        self._loop = None
+        self._wake = None
+        self._task = None
+        self._last_write = 0.0
+        self.recent = collections.deque(maxlen=RECENT_MAX)
+        if VERIFY_WRITES and not MOCK:
+            dev.aser.on_written.append(self.note)
+
+    def note(self, payloads):
+        for p in payloads:
+            checks = K.READBACK.get(p)
+            if not checks or random.random() >= VERIFY_SAMPLE:
+                continue
+            # the first readback is enough; a newer write supersedes the others
+            for q, _ in checks[1:]:
+                self._pending.pop(q, None)
+            q, expected = checks[0]
+            self._pending[q] = [p, expected, time.time(), 0]
+        if self._pending:
+            self._ensure_started()
+            self._last_write = self._loop.time()
+            self._wake.set()
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._wake = asyncio.Event()
+            self._task = loop.create_task(self._run())
+
+    # ---------------- background loop ----------------
+
+    async def _run(self):
+        with use(self.dev):
+            while True:
+                await self._wake.wait()
+                # let a run of clicks finish before reading anything back
+                while (wait := self._last_write + VERIFY_DELAY - self._loop.time()) > 0:
+                    await asyncio.sleep(wait)
+                self._wake.clear()
+                try:
+                    await self._round()
+                except Exception as e:
+                    print(f"[VERIFY] {self.dev.id}: {e}")
+                    await asyncio.sleep(1.0)
+                if self._pending:
+                    self._wake.set()
+
+    async def _round(self):
+        now = time.time()
+        for q in [q for q, e in self._pending.items() if now - e[2] > MAX_AGE]:
+            del self._pending[q]
+        # newest writes first, one pipelined chunk per round
+        batch = sorted(self._pending.items(), key=lambda kv: kv[1][2], reverse=True)[:max(1, BURST_MAX)]
+        if not batch:
+            return
+        for q, _ in batch:
+            del self._pending[q]
+        with priority("background"):
+            reps = await self.dev.aser.send_pipelined([q for q, _ in batch])
+        m = self.dev.aser.metrics
+        for (q, (payload, expected, _, tries)), rep in zip(batch, reps):
+            if q in self._pending:
+                continue  # written again meanwhile; the newer write gets checked
+            live = K.parse_reply(rep).source
+            if live is None:
+                m.inc("verify_unanswered")
+            elif live == expected:
+                m.inc("verify_matched")
+                self.dev.aser.pacing.on_ok(command_class(payload))
+            elif self._cache_wants(q, expected):
+                await self._repair(q, payload, expected, live, tries)
+            else:
+                m.inc("verify_diverged")
+                self._record(payload, expected, live, "diverged")
+
+    def _cache_wants(self, query: bytes, expected: int) -> bool:
+        """The cache still holds what we wrote (window 1 and 'in source' are one input)."""
+        for (o, w), rq in K.WINDOW_IN_Q.items():
+            if rq == query:
+                out = self.dev.cache.out(o)
+                return out.map.get(w) == expected or (w == 1 and out.src == expected)
+        for o, rq in K.IN_SOURCE_Q.items():
+            if rq == query:
+                out = self.dev.cache.out(o)
+                return out.src == expected or out.map.get(1) == expected
+        return False
+
+    async def _repair(self, query: bytes, payload: bytes, expected: int, live: int, tries: int):
+        self.dev.aser.pacing.on_drop(command_class(payload))
+        if tries >= REPAIR_TRIES:
+            print(f"[VERIFY] {self.dev.id}: giving up on {payload!r} (matrix keeps showing HDMI {live})")
+            self._record(payload, expected, live, "gave up")
+            return
+        self.dev.aser.metrics.inc("verify_repaired")
+        self._record(payload, expected, live, "repaired")
+        with priority("background"):
+            await self.dev.aser.send_set(payload)
+        entry = self._pending.get(query)
+        if entry is not None and entry[0] == payload:
+            entry[3] = tries + 1  # the re-send is checked again, but not forever
+
+    def _record(self, payload: bytes, expected: int, live: int, result: str):
+        self.recent.append({"t": round(time.time(), 3), "cmd": payload.decode("ascii", "replace"),
+                            "expected": expected, "live": live, "result": result})
+
+    def info(self) -> dict:
+        c = self.dev.aser.metrics.counters
+        return {
+            "enabled": VERIFY_WRITES and not MOCK,
+            "sample": VERIFY_SAMPLE,
+            "pending": len(self._pending),
+            **{k[len("verify_"):]: v for k, v in c.items() if k.startswith("verify_")},
+            "recent": list(self.recent),
+        }
+
+
+REGISTRY.attach("verifier", WriteVerifier)
+VERIFIER = DeviceAttr("verifier")  # the current device's verifier
@@ -1,26 +1,34 @@
 import vendor.commands as C
-from time import sleep
-from services.serial_io import SER
+from services.serial_io import ASER
 from services.state_cache import CACHE
+from services.reconcile import apply
 
-def set_single(out_n: int, src: int | None = None):
-    burst = [C.cmd_single(out_n)]
-    if src: burst.append(C.cmd_route_output_input(out_n, src))
-    SER.send_many_set(burst, delay_each=0.003)
-    CACHE.set(f"out{out_n}_mode","single")
-    if src: CACHE.set(f"out{out_n}_src", src)
+QUAD_14 = {1: 1, 2: 2, 3: 3, 4: 4}
 
-def set_quad_14(out_n: int):
-    SER.send_many_set(C.cmd_quad_mode(out_n, mode=1), delay_each=0.003)
-    SER.send_many_set([C.cmd_set_window_input(out_n,i,i) for i in range(1,5)], delay_each=0.003)
-    CACHE.set(f"out{out_n}_mode","quad")
-    CACHE.set(f"out{out_n}_map",{1:1,2:2,3:3,4:4})
+async def set_single(out_n: int, src: int | None = None, force: bool = False):
+    target = {"mode": "single"}
+    if src: target["src"] = src
+    await apply({out_n: target}, force=force)
 
-def ensure_map_cached(out_n: int):
-    key = f"out{out_n}_map"; m = CACHE.get(key)
-    if m: return m
-    m = {}
-    for w in range(1,5):
-        rep = SER.send(C.q_window_in_source(out_n,w))
-        m[w] = C.parse_hdmi_number(rep); sleep(0.02)
-    CACHE.set(key, m); return m
+async def set_quad_14(out_n: int, force: bool = False):
+    # only the window inputs that differ from 1..4 are rewritten (all of them if force)
+    await apply({out_n: {"mode": "quad", "quad_layout": 1, "map": QUAD_14}}, force=force)
+
+async def ensure_maps_cached(*outs: int) -> dict[int, dict]:
+    """Window maps for several outputs; all missing ones are read in one pipelined batch."""
+    maps = {n: CACHE.out(n).map.as_dict() for n in outs}
+    # read once per cache lifetime, even when no window answered (as the old dict of Nones was)
+    need = [n for n in outs if CACHE.age(n, "map") is None]
+    if need:
+        queries = [(n, w) for n in need for w in range(1, 5)]
+        reps = await ASER.send_pipelined([C.q_window_in_source(n, w) for n, w in queries])
+        for n in need:
+            maps[n] = {}
+        for (n, w), rep in zip(queries, reps):
+            maps[n][w] = C.parse_hdmi_number(rep)
+        for n in need:
+            CACHE.put(n, "map", maps[n])
+    return maps
+
+async def ensure_map_cached(out_n: int):
+    return (await ensure_maps_cached(out_n))[out_n]
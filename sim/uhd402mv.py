@@ -0,0 +1,410 @@
+# sim/uhd402mv.py
+"""
+Stateful simulator of the OREI UHD-402MV serial protocol (the subset used by
+vendor/commands.py), for benchmarking and pacing work without hardware.
+
+The real driver talks to it unchanged, either through a pseudo-terminal
+(SERIAL_PORT=/dev/pts/N) or a loopback socket (SERIAL_PORT=socket://127.0.0.1:PORT).
+
+Timing model:
+  * every byte costs 10/baud seconds on the wire, in both directions
+  * the firmware takes commands from a small RX buffer one at a time, spending
+    set_latency / query_latency on each; bytes that arrive while the buffer is
+    full are lost (this is what too-aggressive pacing looks like on hardware)
+Faults: drop_rate (command silently ignored), no_reply_rate (query gets no
+answer), garble_rate (one reply byte flipped).
+
+    python -m sim.uhd402mv --pty                 # prints the pty path to use
+    python -m sim.uhd402mv --tcp 7000 --echo     # socket://127.0.0.1:7000
+"""
+import argparse
+import collections
+import os
+import queue
+import random
+import re
+import socket
+import threading
+import time
+
+MODE_WORDS = {1: "single screen", 2: "PIP", 3: "PBP", 4: "triple", 5: "quad screen"}
+
+
+class SimConfig:
+    def __init__(self, baud: int = 115200, set_latency: float = 0.002, query_latency: float = 0.008,
+                 rx_buffer: int = 256, echo: bool = False, ack_sets: bool = True,
+                 numeric_multiview: bool = False, eol: bytes = b"\r\n",
+                 drop_rate: float = 0.0, no_reply_rate: float = 0.0, garble_rate: float = 0.0,
+                 seed: int | None = None, mode_latency: float | None = None):
+        self.baud = baud                        # 0 = no wire-time modelling
+        self.set_latency = set_latency          # firmware time per set command
+        self.query_latency = query_latency      # firmware time per query
+        self.mode_latency = mode_latency        # multiview / quad mode sets (None = set_latency)
+        self.rx_buffer = rx_buffer              # bytes the firmware can hold unprocessed
+        self.echo = echo                        # echo each command line before replying
+        self.ack_sets = ack_sets                # reply to set commands with the new value
+        self.numeric_multiview = numeric_multiview  # "multiview: 5" instead of "quad screen"
+        self.eol = eol
+        self.drop_rate = drop_rate
+        self.no_reply_rate = no_reply_rate
+        self.garble_rate = garble_rate
+        self.seed = seed
+
+
+class MatrixModel:
+    """Device state + command interpreter. Returns reply lines (without EOL)."""
+
+    def __init__(self, cfg: SimConfig):
+        self.cfg = cfg
+        self.power = True
+        self.out = {
+            n: {"multiview": 1, "quad_mode": 1, "src": n, "audio": 0,
+                "windows": {w: w for w in range(1, 5)},
+                "border": {w: 0 for w in range(1, 5)},
+                "border_color": {w: 2 for w in range(1, 5)}}
+            for n in (1, 2)
+        }
+        self._handlers = self._table()
+
+    def _mv(self, n: int) -> str:
+        m = self.out[n]["multiview"]
+        if self.cfg.numeric_multiview:
+            return f"output {n} multiview: {m}"
+        return f"output {n} multiview: {MODE_WORDS[m]}"
+
+    # (pattern, handler) tables; handlers return a list of reply lines
+    def handle(self, cmd: str) -> list[str]:
+        for rx, fn in self._handlers:
+            m = rx.fullmatch(cmd)
+            if m:
+                if not self.power and not cmd.endswith("power") and not cmd.startswith("s power"):
+                    return []  # standby: only power commands are served
+                return fn(*[int(g) for g in m.groups()])
+        return ["Command FAILED"]
+
+    def _table(self):
+        o = self.out
+        ack = self.cfg.ack_sets
+
+        def s_power(v):
+            self.power = bool(v)
+            return [f"power {'on' if self.power else 'off'}"] if ack else []
+
+        def s_multiview(n, v):
+            if v not in MODE_WORDS:
+                return ["Command FAILED"]
+            o[n]["multiview"] = v
+            return [self._mv(n)] if ack else []
+
+        def s_quad(n, v):
+            o[n]["quad_mode"] = v
+            return [f"output {n} quad mode {v}"] if ack else []
+
+        def s_src(n, s):
+            o[n]["src"] = s
+            o[n]["windows"][1] = s
+            return [f"output {n} in source: HDMI {s}"] if ack else []
+
+        def s_window(n, w, s):
+            o[n]["windows"][w] = s
+            if w == 1:
+                o[n]["src"] = s
+            return [f"output {n} window {w} in source: HDMI {s}"] if ack else []
+
+        def s_audio(n, a):
+            o[n]["audio"] = a
+            return [f"output {n} audio {a}"] if ack else []
+
+        def s_border(n, w, v):
+            o[n]["border"][w] = v
+            return [f"output {n} window {w} border {v}"] if ack else []
+
+        def s_border_color(n, w, c):
+            o[n]["border_color"][w] = c
+            return [f"output {n} window {w} border color {c}"] if ack else []
+
+        def r_power():
+            return [f"power {'on' if self.power else 'off'}"]
+
+        def r_quad(n):
+            if o[n]["multiview"] != 5:
+                return [self._mv(n)]
+            return [f"output {n} quad screen", f"output {n} quad mode {o[n]['quad_mode']}"]
+
+        return (
+            (RX_S_POWER, s_power),
+            (RX_S_MULTIVIEW, s_multiview),
+            (RX_S_QUAD, s_quad),
+            (RX_S_SRC, s_src),
+            (RX_S_WINDOW, s_window),
+            (RX_S_AUDIO, s_audio),
+            (RX_S_BORDER, s_border),
+            (RX_S_BORDER_COLOR, s_border_color),
+            (RX_R_POWER, r_power),
+            (RX_R_MULTIVIEW, lambda n: [self._mv(n)]),
+            (RX_R_SRC, lambda n: [f"output {n} in source: HDMI {o[n]['src']}"]),
+            (RX_R_WINDOW, lambda n, w: [f"output {n} window {w} in source: HDMI {o[n]['windows'][w]}"]),
+            (RX_R_QUAD, r_quad),
+        )
+
+    def snapshot(self) -> dict:
+        return {"power": self.power, "outputs": self.out}
+
+
+RX_S_POWER = re.compile(r"s power ([01])")
+RX_S_MULTIVIEW = re.compile(r"s output ([12]) multiview (\d)")
+RX_S_QUAD = re.compile(r"s output ([12]) quad mode ([12])")
+RX_S_SRC = re.compile(r"s output ([12]) in source ([1-4])")
+RX_S_WINDOW = re.compile(r"s output ([12]) window ([1-4]) in ([1-4])")
+RX_S_AUDIO = re.compile(r"s output ([12]) audio ([0-4])")
+RX_S_BORDER = re.compile(r"s output ([12]) window ([1-4]) border ([01])")
+RX_S_BORDER_COLOR = re.compile(r"s output ([12]) window ([1-4]) border color (\d)")
+RX_R_POWER = re.compile(r"r power")
+RX_R_MULTIVIEW = re.compile(r"r output ([12]) multiview")
+RX_R_SRC = re.compile(r"r output ([12]) in source")
+RX_R_WINDOW = re.compile(r"r output ([12]) window ([1-4]) in")
+RX_R_QUAD = re.compile(r"r output ([12]) quad mode")
+
+
+class SimulatedMatrix:
+    """
+    Runs a MatrixModel behind a pty or a TCP socket in background threads.
+
+        with SimulatedMatrix(SimConfig(echo=True)) as sim:
+            os.environ["SERIAL_PORT"] = sim.port
+    """
+
+    def __init__(self, cfg: SimConfig | None = None, transport: str = "pty", tcp_port: int = 0):
+        self.cfg = cfg or SimConfig()
+        self.model = MatrixModel(self.cfg)
+        self.transport = transport
+        self.tcp_port = tcp_port
+        self.port = None
+        self.stats = {"bytes_in": 0, "bytes_out": 0, "commands": 0, "replies": 0,
+                      "overflow_bytes": 0, "dropped": 0, "no_reply": 0, "garbled": 0, "failed": 0}
+        self.failed = collections.deque(maxlen=20)  # last unparseable commands
+        self._rand = random.Random(self.cfg.seed)
+        self._rx = bytearray()       # firmware RX buffer (bounded by cfg.rx_buffer)
+        self._tx = queue.Queue()     # replies waiting for the UART
+        self._cv = threading.Condition()
+        self._stop = threading.Event()
+        self._master = None
+        self._slave = None
+        self._srv = None
+        self._conn = None
+        self._threads = []
+
+    # ---------------- lifecycle ----------------
+
+    def start(self) -> str:
+        if self.transport == "pty":
+            import pty
+            import tty
+            self._master, self._slave = pty.openpty()
+            tty.setraw(self._master)
+            tty.setraw(self._slave)
+            self.port = os.ttyname(self._slave)
+        else:
+            self._srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self._srv.bind(("127.0.0.1", self.tcp_port))
+            self._srv.listen(1)
+            self._srv.settimeout(0.2)
+            self.port = f"socket://127.0.0.1:{self._srv.getsockname()[1]}"
+        for fn in (self._reader, self._firmware, self._transmitter):
+            t = threading.Thread(target=fn, daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self.port
+
+    def stop(self):
+        self._stop.set()
+        with self._cv:
+            self._cv.notify_all()
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        for s in (self._conn, self._srv):
+            if s is not None:
+                try:
+                    s.close()
+                except OSError:
+                    pass
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ---------------- byte I/O ----------------
+
+    def _byte_time(self, n: int) -> float:
+        return n * 10.0 / self.cfg.baud if self.cfg.baud else 0.0
+
+    def _recv(self) -> bytes:
+        if self._master is not None:
+            import select
+            r, _, _ = select.select([self._master], [], [], 0.2)
+            return os.read(self._master, 4096) if r else b""
+        if self._conn is None:
+            try:
+                self._conn, _ = self._srv.accept()
+                self._conn.settimeout(0.2)
+            except socket.timeout:
+                return b""
+        try:
+            data = self._conn.recv(4096)
+        except socket.timeout:
+            return b""
+        if not data:  # client hung up; wait for the next one
+            self._conn.close()
+            self._conn = None
+        return data
+
+    def _send(self, data: bytes):
+        """Queue a reply; the UART shifts it out in the background (DMA-style TX)."""
+        self._tx.put(data)
+
+    def _transmitter(self):
+        while not self._stop.is_set():
+            try:
+                data = self._tx.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            time.sleep(self._byte_time(len(data)))  # outbound wire time
+            try:
+                if self._master is not None:
+                    os.write(self._master, data)
+                elif self._conn is not None:
+                    self._conn.sendall(data)
+            except OSError:
+                continue
+            self.stats["bytes_out"] += len(data)
+
+    # ---------------- threads ----------------
+
+    def _reader(self):
+        tick = 16  # bytes per delivery slice when modelling inbound wire time
+        while not self._stop.is_set():
+            try:
+                data = self._recv()
+            except OSError:
+                return
+            if not data:
+                continue
+            self.stats["bytes_in"] += len(data)
+            # inbound wire time: the host's burst lands a slice at a time, so the
+            # firmware drains the RX buffer while the rest is still on the wire
+            due = time.monotonic()
+            for i in range(0, len(data), tick):
+                part = data[i:i + tick]
+                due += self._byte_time(len(part))
+                wait = due - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                with self._cv:
+                    room = max(0, self.cfg.rx_buffer - len(self._rx))
+                    if len(part) > room:
+                        self.stats["overflow_bytes"] += len(part) - room
+                        part = part[:room]
+                    self._rx += part
+                    self._cv.notify()
+
+    def _next_command(self):
+        with self._cv:
+            while not self._stop.is_set():
+                i = self._rx.find(b"!")
+                if i >= 0:
+                    raw = bytes(self._rx[:i])
+                    del self._rx[:i + 1]
+                    return raw
+                self._cv.wait(0.2)
+        return None
+
+    def _firmware(self):
+        cfg = self.cfg
+        while not self._stop.is_set():
+            raw = self._next_command()
+            if raw is None:
+                return
+
+            cmd = raw.decode("ascii", "replace").strip().lower()
+            if not cmd:
+                continue
+            self.stats["commands"] += 1
+            is_query = cmd.startswith("r ")
+            if is_query:
+                time.sleep(cfg.query_latency)
+            elif cfg.mode_latency is not None and ("multiview" in cmd or "quad mode" in cmd):
+                time.sleep(cfg.mode_latency)
+            else:
+                time.sleep(cfg.set_latency)
+
+            if self._rand.random() < cfg.drop_rate:
+                self.stats["dropped"] += 1
+                continue
+            lines = self.model.handle(cmd)
+            if lines == ["Command FAILED"]:
+                self.stats["failed"] += 1
+                self.failed.append(cmd)
+            if is_query and self._rand.random() < cfg.no_reply_rate:
+                self.stats["no_reply"] += 1
+                continue
+
+            out = b""
+            if cfg.echo:
+                out += raw.strip() + b"!" + cfg.eol
+            for line in lines:
+                out += line.encode("ascii") + cfg.eol
+            if out and self._rand.random() < cfg.garble_rate:
+                j = self._rand.randrange(len(out))
+                out = out[:j] + bytes([out[j] ^ 0x20]) + out[j + 1:]
+                self.stats["garbled"] += 1
+            if out:
+                self.stats["replies"] += 1
+                self._send(out)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="OREI UHD-402MV serial simulator")
+    ap.add_argument("--pty", action="store_true", help="serve on a pseudo-terminal (default)")
+    ap.add_argument("--tcp", type=int, metavar="PORT", help="serve on socket://127.0.0.1:PORT instead")
+    ap.add_argument("--baud", type=int, default=115200, help="wire timing; 0 disables")
+    ap.add_argument("--set-latency", type=float, default=0.002)
+    ap.add_argument("--query-latency", type=float, default=0.008)
+    ap.add_argument("--mode-latency", type=float, help="multiview / quad mode sets (default: --set-latency)")
+    ap.add_argument("--rx-buffer", type=int, default=256)
+    ap.add_argument("--echo", action="store_true")
+    ap.add_argument("--no-ack", action="store_true", help="silent set commands")
+    ap.add_argument("--numeric-multiview", action="store_true")
+    ap.add_argument("--drop-rate", type=float, default=0.0)
+    ap.add_argument("--no-reply-rate", type=float, default=0.0)
+    ap.add_argument("--garble-rate", type=float, default=0.0)
+    ap.add_argument("--seed", type=int)
+    a = ap.parse_args()
+
+    cfg = SimConfig(baud=a.baud, set_latency=a.set_latency, query_latency=a.query_latency,
+                    rx_buffer=a.rx_buffer, echo=a.echo, ack_sets=not a.no_ack,
+                    numeric_multiview=a.numeric_multiview, drop_rate=a.drop_rate,
+                    no_reply_rate=a.no_reply_rate, garble_rate=a.garble_rate, seed=a.seed,
+                    mode_latency=a.mode_latency)
+    sim = SimulatedMatrix(cfg, transport="tcp" if a.tcp is not None else "pty", tcp_port=a.tcp or 0)
+    port = sim.start()
+    print(f"[SIM] UHD-402MV simulator on {port}  (set SERIAL_PORT={port})")
+    try:
+        while True:
+            time.sleep(5)
+            print("[SIM]", sim.stats)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sim.stop()
+
+
+if __name__ == "__main__":
+    main()
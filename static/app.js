@@ -0,0 +1,276 @@
+// ---------- Minimal helpers ----------
+const $ = (s, r=document)=> r.querySelector(s);
+const $$ = (s, r=document)=> Array.from(r.querySelectorAll(s));
+
+async function safeFetch(url, opts){
+  try{
+    const res = await fetch(url, {method:'POST', ...opts});
+    if(!res.ok) throw new Error('request failed');
+    return await res.json().catch(()=> ({}));
+  }catch(e){
+    refreshStatus(); // keep pills fresh on failure
+    return null;
+  }
+}
+
+// Actions the server may finish in the background: it answers 202 once the
+// new state is in its cache; the outcome arrives as an 'op' event (/api/events).
+const ASYNC = {headers: {'Prefer': 'respond-async'}};
+
+function toast(msg, ms=1700){
+  const t = $('#toast'); t.textContent = msg; t.classList.add('show');
+  clearTimeout(toast._id); toast._id = setTimeout(()=>t.classList.remove('show'), ms);
+}
+
+// ---------- Device palette ID -> UI hex (for button outline only) ----------
+const COLOR_ID_TO_HEX = {
+  1:'#000000', 2:'#ff3b30', 3:'#00ff00', 4:'#007aff',
+  5:'#ffd400', 6:'#ff2d55', 7:'#00ffff', 8:'#ffffff', 9:'#bfbfbf'
+};
+
+// ---------- UI State ----------
+const UI = {
+  connected:false,
+  power:false,
+  out1Mode:'single',    // 'single' | 'quad'
+  featured:1,           // 1..4
+  borderColor:'#ff3b30' // hex derived from global border_color_id
+};
+
+// ---------- Status polling ----------
+async function refreshStatus(){
+  try{
+    const res = await fetch('/api/status');
+    const s = await res.json();
+    UI.connected = !!s.connected;
+    UI.power = !!s.power;
+
+    await fetchUiState();   // lightweight hydrate (no refresh-state inside)
+
+    paintStatus();
+    paintWindows();
+    paintControls();
+  }catch(e){
+    UI.connected = false;
+    paintStatus();
+  }
+}
+
+// Hydrate OUT1 mode, featured, and global border color id
+async function fetchUiState(){
+  try{
+    const r = await fetch('/api/ui');
+    if(r.ok){
+      const u = await r.json();
+      if(u && (u.out1_mode==='single' || u.out1_mode==='quad')) UI.out1Mode = u.out1_mode;
+      if(Number.isInteger(u.featured_source)) UI.featured = u.featured_source;
+      if(Number.isInteger(u.border_color_id)){
+        UI.borderColor = COLOR_ID_TO_HEX[u.border_color_id] || '#ff3b30';
+      }
+    }
+  }catch(e){ /* ignore if not implemented */ }
+}
+
+function paintStatus(){
+  const conn = $('#conn-pill');
+  conn.textContent = UI.connected ? 'Connected' : 'Disconnected';
+  conn.classList.toggle('ok', UI.connected);
+  conn.classList.toggle('off', !UI.connected);
+
+  const p = $('#power-pill');
+  p.textContent = UI.power ? 'Power On' : 'Power Off';
+  p.classList.toggle('ok', UI.power);
+  p.classList.toggle('off', !UI.power);
+}
+
+function paintControls(){
+  const ctx = $('#btn-mode-context');
+  ctx.textContent = (UI.out1Mode === 'quad') ? '1 Single' : '1 Quad Box';
+
+  const show = (UI.out1Mode === 'quad');
+  $$('.fsw').forEach(b => b.classList.toggle('show', show));
+}
+
+function paintWindows(){
+  $$('.win-wrap').forEach(w => {
+    const src = Number(w.dataset.src);
+    const win = $('.win', w);
+    const line = $('[data-dyn="line"]', win);
+
+    const isFeatured = (src === UI.featured);
+
+    let txt = '';
+    if(isFeatured){
+      txt = 'Now Playing';
+    }else{
+      txt = (UI.out1Mode === 'quad') ? 'Feature Audio' : 'Feature Video';
+    }
+    line.textContent = txt;
+
+    win.classList.toggle('now', isFeatured);
+    if(isFeatured){
+      win.style.setProperty('--accent', UI.borderColor);
+    }
+  });
+}
+
+// ---------- Actions ----------
+// Set to Default: full init flow (global color, prime, OUT1 single+follow, OUT2 quad, reconcile, snapshot)
+$('#btn-init').addEventListener('click', async ()=>{
+  const btn = $('#btn-init'); btn.disabled = true;
+
+  let state = await safeFetch('/api/init/full');
+
+  if(state){
+    try{
+      if(state.out1_mode === 'single' || state.out1_mode === 'quad') UI.out1Mode = state.out1_mode;
+      if(Number.isInteger(state.featured_source)) UI.featured = state.featured_source;
+      if(Number.isInteger(state.border_color_id)){
+        UI.borderColor = COLOR_ID_TO_HEX[state.border_color_id] || '#ff3b30';
+      }
+    }catch(e){}
+    paintControls(); paintWindows();
+    await refreshStatus();
+    toast('Defaults applied');
+  }else{
+    // Fallback for older backends
+    const ok = await safeFetch('/api/init');
+    if(ok){
+      await safeFetch('/api/reconcile-ui');
+      await fetchUiState();
+      paintStatus(); paintControls(); paintWindows();
+      toast('Defaults applied');
+    }
+  }
+
+  btn.disabled = false;
+});
+
+$('#btn-one-two').addEventListener('click', async ()=>{
+  const ok = await safeFetch('/api/one-single-two-quad14');
+  if(ok){
+    UI.out1Mode = 'single';
+    paintControls(); paintWindows();
+    toast('Output 1: Single • Output 2: Quad');
+  }
+});
+
+$('#btn-mode-context').addEventListener('click', async ()=>{
+  if(UI.out1Mode === 'quad'){
+    const ok = await safeFetch('/api/out1/single-from-current-audio');
+    if(ok){
+      UI.out1Mode = 'single';
+      paintControls(); paintWindows();
+    }
+  }else{
+    const ok = await safeFetch('/api/out1/quad14');
+    if(ok){
+      UI.out1Mode = 'quad';
+      paintControls(); paintWindows();
+    }
+  }
+});
+
+// Power toggle (placeholder)
+$('#btn-power-toggle').addEventListener('click', async ()=>{
+  const res = await safeFetch('/api/power-toggle'); // not yet implemented server-side
+  if(res){
+    if(typeof res.power !== 'undefined') UI.power = !!res.power;
+    toast('Power command sent');
+  }else{
+    toast('Power control not available');
+  }
+  paintStatus();
+});
+
+// Big window buttons -> select featured (skip redundant POST if already featured)
+$$('.win-wrap .win').forEach(btn=>{
+  btn.addEventListener('click', async (e)=>{
+    const wrap = e.currentTarget.closest('.win-wrap');
+    const src = wrap ? Number(wrap.dataset.src) : null;
+    if(!src) return;
+
+    if(src === UI.featured){
+      paintWindows();
+      return;
+    }
+
+    // Optimistic UI
+    UI.featured = src;
+    paintWindows();
+
+    const ok = await safeFetch(`/api/out1/select/${src}`, ASYNC);
+    if(!ok){
+      // optional rollback: await refreshStatus();
+    }
+  });
+});
+
+// Full Screen Window buttons (visible only in quad)
+$$('.win-wrap [data-action="fsw"]').forEach(b=>{
+  b.addEventListener('click', async (e)=>{
+    const src = Number(e.currentTarget.closest('.win-wrap')?.dataset.src);
+    if(!src) return;
+
+    // Optimistic UI
+    UI.out1Mode = 'single';
+    UI.featured = src;
+    paintControls(); paintWindows();
+
+    // Unified endpoint using your existing router variant
+    const ok = await safeFetch(`/api/out1/mode/single/${src}`);
+    if(!ok){
+      // optional fallback: await refreshStatus();
+    }
+  });
+});
+
+// ---------- Server push (/api/events) ----------
+// One shared producer on the server; we only receive changed keys.
+function applyState(u){
+  if('connected' in u) UI.connected = !!u.connected;
+  if('power' in u) UI.power = (u.power === 'on');
+  if(u.out1_mode==='single' || u.out1_mode==='quad') UI.out1Mode = u.out1_mode;
+  if(Number.isInteger(u.featured_source)) UI.featured = u.featured_source;
+  if(Number.isInteger(u.border_color_id)){
+    UI.borderColor = COLOR_ID_TO_HEX[u.border_color_id] || '#ff3b30';
+  }
+  paintStatus(); paintControls(); paintWindows();
+}
+
+let pollTimer = null;
+function startPolling(){
+  if(!pollTimer) pollTimer = setInterval(refreshStatus, 15000);
+}
+function stopPolling(){
+  clearInterval(pollTimer); pollTimer = null;
+}
+
+function connectEvents(){
+  if(!window.EventSource){ startPolling(); return; }
+  const es = new EventSource('/api/events');
+  const onMsg = (e)=>{ try{ applyState(JSON.parse(e.data)); }catch(_){} };
+  es.addEventListener('state', (e)=>{ stopPolling(); onMsg(e); });
+  es.addEventListener('delta', onMsg);
+  es.addEventListener('op', (e)=>{
+    try{
+      const op = JSON.parse(e.data);
+      if(op.state === 'failed'){ toast('Matrix did not take that: ' + (op.error || 'error')); refreshStatus(); }
+    }catch(_){}
+  });
+  // EventSource retries by itself; poll meanwhile so pills don't go stale
+  es.onerror = ()=> startPolling();
+}
+
+// Initial load + live updates
+(async function init(){
+  // One-time refresh to make sure backend cache is current
+  await safeFetch('/api/refresh-state');
+
+  // Hydrate UI from the (now-correct) backend state
+  await fetchUiState();
+  paintStatus(); paintControls(); paintWindows();
+
+  // Keep pills + UI state fresh
+  connectEvents();
+})();
@@ -0,0 +1,29 @@
+import os
+import sys
+import tempfile
+
+# Before anything imports the app: no real port, and every file the services
+# save lands in a throwaway directory instead of the working tree.
+_STATE_DIR = tempfile.mkdtemp(prefix="matrix-tests-")
+os.environ.update(
+    MOCK_SERIAL="true",
+    MATRIX_DEVICES="",
+    STATE_FILE=os.path.join(_STATE_DIR, "state_snapshot.jsonl"),
+    PACING_FILE=os.path.join(_STATE_DIR, "pacing.json"),
+    LINK_FILE=os.path.join(_STATE_DIR, "link_profile.json"),
+    SCENES_FILE=os.path.join(_STATE_DIR, "scenes.json"),
+)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+from services.device_context import use  # noqa: E402
+from services.devices import Device  # noqa: E402
+
+
+@pytest.fixture
+def device():
+    """A fresh, unregistered matrix bound as the current device (its own cache and pacing)."""
+    dev = Device("test", "/dev/null")
+    with use(dev):
+        yield dev
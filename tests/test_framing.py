@@ -0,0 +1,89 @@
+from vendor.framing import drain, reply_spec, take_frame, take_frames
+
+
+def test_echoed_query_is_skipped():
+    spec = reply_spec(b"r output 1 in source!")
+    buf = bytearray(b"r output 1 in source!\r\noutput 1 in source: HDMI 3\r\n")
+    assert take_frame(buf, spec) == b"output 1 in source: HDMI 3"
+    assert buf == bytearray()
+
+
+def test_incomplete_line_waits():
+    spec = reply_spec(b"r power!")
+    buf = bytearray(b"power o")
+    assert take_frame(buf, spec) is None
+    assert buf == bytearray(b"power o")
+    buf += b"n\r\n"
+    assert take_frame(buf, spec) == b"power on"
+
+
+def test_bytes_after_the_reply_stay_for_the_next_frame():
+    spec = reply_spec(b"r output 2 multiview!")
+    buf = bytearray(b"output 2 multiview: quad screen\r\noutput 1 audio 3\r\npow")
+    assert take_frame(buf, spec) == b"output 2 multiview: quad screen"
+    assert buf == bytearray(b"output 1 audio 3\r\npow")
+
+
+def test_acks_for_other_targets_are_not_the_reply():
+    spec = reply_spec(b"r output 1 in source!")
+    # a late set ack for output 2, then a window line, then ours
+    buf = bytearray(b"output 2 in source: HDMI 4\r\n"
+                    b"output 1 window 2 in source: HDMI 2\r\n"
+                    b"output 1 in source: HDMI 1\r\n")
+    assert take_frame(buf, spec) == b"output 1 in source: HDMI 1"
+
+
+def test_quad_mode_takes_the_second_line_of_a_quad_reply():
+    spec = reply_spec(b"r output 1 quad mode!")
+    buf = bytearray(b"output 1 quad screen\r\n")
+    assert take_frame(buf, spec) is None
+    buf += b"output 1 quad mode 2\r\n"
+    assert take_frame(buf, spec) == b"output 1 quad mode 2"
+
+
+def test_unknown_query_has_no_spec_and_drain_drops_the_echo():
+    assert reply_spec(b"r something new!") is None
+    spec = reply_spec(b"r output 2 quad mode!")
+    assert drain(bytearray(b"r output 2 quad mode!\r\noutput 2 multiview: single screen"), spec) \
+        == b"output 2 multiview: single screen"
+
+
+# ---------------- pipelined demux (take_frames) ----------------
+
+def _specs(*queries):
+    return [reply_spec(q) for q in queries]
+
+
+def test_window_lines_out_of_order_land_on_their_own_query():
+    specs = _specs(*(b"r output 1 window %d in!" % w for w in (1, 2, 3, 4)))
+    out = [None] * 4
+    buf = bytearray(b"output 1 window 3 in source: HDMI 1\r\n"
+                    b"output 1 window 1 in source: HDMI 4\r\n"
+                    b"output 1 window 4 in source: HDMI 2\r\n"
+                    b"output 1 window 2 in source: HDMI 3\r\n")
+    assert take_frames(buf, specs, out) == 0
+    assert [o[-1:] for o in out] == [b"4", b"3", b"1", b"2"]
+
+
+def test_echoes_skipped_and_partial_tail_kept():
+    specs = _specs(b"r output 1 multiview!", b"r output 1 in source!", b"r power!")
+    out = [None] * 3
+    buf = bytearray(b"r output 1 multiview\r\noutput 1 multiview: single screen\r\n"
+                    b"r output 1 in source\r\noutput 1 in source: HDMI 2\r\npow")
+    assert take_frames(buf, specs, out) == 1
+    assert out[:2] == [b"output 1 multiview: single screen", b"output 1 in source: HDMI 2"]
+    assert out[2] is None
+    assert buf == bytearray(b"pow")
+
+    buf += b"er on\r\n"
+    assert take_frames(buf, specs, out) == 0
+    assert out[2] == b"power on"
+    assert buf == bytearray()
+
+
+def test_lines_naming_an_output_go_to_that_query():
+    specs = _specs(b"r output 1 in source!", b"r output 2 in source!")
+    out = [None] * 2
+    buf = bytearray(b"output 2 in source: HDMI 3\r\noutput 1 in source: HDMI 1\r\n")
+    assert take_frames(buf, specs, out) == 0
+    assert out == [b"output 1 in source: HDMI 1", b"output 2 in source: HDMI 3"]
@@ -0,0 +1,70 @@
+import asyncio
+
+import vendor.commands as C
+from serial_metrics import SerialMetrics
+from services.intents import IntentQueue, target_key
+
+
+class _Aser:
+    """Port stand-in: take() at the grant, then the write waits for `gate` so intents queue behind it."""
+
+    def __init__(self):
+        self.metrics = SerialMetrics()
+        self.gate = asyncio.Event()
+        self.bursts = []
+
+    async def send_latest(self, take, gap=None):
+        payloads = take()
+        self.bursts.append(payloads)
+        await self.gate.wait()
+        return payloads
+
+
+class _Dev:
+    def __init__(self):
+        self.aser = _Aser()
+
+
+def test_target_key_drops_only_the_value():
+    assert target_key(b"s output 1 audio 3!") == b"s output 1 audio"
+    assert target_key(b"s output 2 window 4 border color 7!") == b"s output 2 window 4 border color"
+    assert target_key(C.cmd_audio(1, 2)) == target_key(C.cmd_audio(1, 4)) != target_key(C.cmd_audio(2, 4))
+
+
+def test_replaced_intent_keeps_its_place_and_only_the_last_value_is_sent():
+    async def scenario():
+        dev = _Dev()
+        q = IntentQueue(dev)
+        first = asyncio.create_task(q.submit([C.cmd_single(1)]))
+        await asyncio.sleep(0)  # flusher took it and is writing, waiting on the gate
+
+        # queued while the port is busy: audio, route, then audio again
+        waiters = [asyncio.create_task(q.submit([p])) for p in
+                   (C.cmd_audio(1, 1), C.cmd_route_output_input(1, 2), C.cmd_audio(1, 3))]
+        await asyncio.sleep(0)
+        dev.aser.gate.set()
+        await asyncio.gather(first, *waiters)  # the superseded audio 1 caller returns too
+        return dev
+
+    dev = asyncio.run(scenario())
+    # Audio 3 takes audio 1's slot (ahead of the route), which keeps an
+    # audio-first plan audio-first when a later click replaces its audio.
+    assert dev.aser.bursts == [
+        [C.cmd_single(1)],
+        [C.cmd_audio(1, 3), C.cmd_route_output_input(1, 2)],
+    ]
+    m = dev.aser.metrics.counters
+    assert (m["intents_submitted"], m["intents_superseded"], m["intents_sent"]) == (4, 1, 3)
+
+
+def test_resubmitting_the_same_value_is_not_counted_as_superseded():
+    async def scenario():
+        dev = _Dev()
+        dev.aser.gate.set()
+        q = IntentQueue(dev)
+        await q.submit([C.cmd_audio(2, 1), C.cmd_audio(2, 1)])
+        return dev
+
+    dev = asyncio.run(scenario())
+    assert dev.aser.bursts == [[C.cmd_audio(2, 1)]]
+    assert dev.aser.metrics.counters["intents_superseded"] == 0
@@ -0,0 +1,34 @@
+import json
+import threading
+
+from serial_link import LinkProfile
+
+
+def test_parallel_saves_keep_every_port(tmp_path):
+    path = str(tmp_path / "link_profile.json")
+    links = [LinkProfile(f"/dev/ttyUSB{i}", path) for i in range(8)]
+    gate = threading.Barrier(len(links))
+
+    def save(p):
+        gate.wait()
+        for _ in range(20):
+            p.update(115200, False, 0.03, 0.01)
+
+    threads = [threading.Thread(target=save, args=(p,)) for p in links]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    with open(path, encoding="utf-8") as fh:
+        assert sorted(json.load(fh)) == sorted(p.port for p in links)
+
+
+def test_forget_drops_only_that_port(tmp_path):
+    path = str(tmp_path / "link_profile.json")
+    a, b = LinkProfile("/dev/a", path), LinkProfile("/dev/b", path)
+    a.update(115200, True, 0.03, None)
+    b.update(9600, False, 0.03, None)
+    a.forget()
+    assert not LinkProfile("/dev/a", path).load()
+    assert LinkProfile("/dev/b", path).load()
@@ -0,0 +1,39 @@
+import pytest
+from pydantic import ValidationError
+
+from domain.models import DesiredState, Scene
+
+
+def _target(out: dict) -> dict:
+    return {"outputs": {"1": out}}
+
+
+@pytest.mark.parametrize("window_map", [
+    {"0": 3},      # window 0 would be written to the device as "window 0"
+    {"-1": 2},     # ... and -1 used to land in window 3 of the cache
+    {"5": 3},
+    {"1": 9},      # no HDMI 9
+    {"2": 0},
+])
+def test_window_map_out_of_range_is_rejected(window_map):
+    with pytest.raises(ValidationError):
+        DesiredState.model_validate(_target({"mode": "quad", "map": window_map}))
+    with pytest.raises(ValidationError):
+        Scene.model_validate(_target({"mode": "quad", "map": window_map}))
+
+
+def test_window_map_keys_are_ints():
+    body = DesiredState.model_validate(_target({"mode": "quad", "map": {"1": 4, "4": 1}}))
+    assert body.outputs[1].map == {1: 4, 4: 1}
+
+
+def test_rejected_before_anything_is_committed():
+    from fastapi.testclient import TestClient
+    from app import app
+    from services.state_cache import CACHE
+
+    before = CACHE.version
+    r = TestClient(app).post("/api/desired-state", json=_target({"mode": "quad", "map": {"5": 3}}))
+    assert r.status_code == 422
+    assert CACHE.version == before
+    assert CACHE.out(1).mode is None
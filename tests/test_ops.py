@@ -0,0 +1,78 @@
+import asyncio
+
+from services.ops import OperationLog
+from services.reconcile import apply
+
+
+class _Intents:
+    """Stand-in intent queue: every submit takes a while on the 'wire'."""
+
+    async def submit(self, payloads, gap=None):
+        await asyncio.sleep(0.05)
+
+
+class _Stream:
+    def __init__(self):
+        self.events = []
+
+    def notify(self, event, data):
+        self.events.append((event, data))
+
+
+def _bind(device):
+    device.intents = _Intents()
+    device.stream = _Stream()
+
+
+def test_202_waits_for_the_commit_not_one_loop_tick(device):
+    _bind(device)
+
+    async def action():
+        await asyncio.sleep(0.02)  # e.g. ensure_map_cached reading the window map first
+        await apply({1: {"mode": "quad", "quad_layout": 1}})
+        return {"status": "ok"}
+
+    async def scenario():
+        log = OperationLog()
+        op = await log.start("quad", action)
+        assert device.cache.out(1).mode == "quad"   # committed before the 202 ...
+        assert op.state == "running"                # ... while the commands are still going out
+        assert len(log._tasks) == 1
+        await log.wait(op, 1.0)
+        assert op.state == "done"
+        assert not log._tasks
+        assert device.stream.events[-1][0] == "op"
+
+    asyncio.run(scenario())
+
+
+def test_action_that_fails_before_committing_still_answers(device):
+    _bind(device)
+
+    async def action():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("no reply")
+
+    async def scenario():
+        op = await OperationLog().start("broken", action)
+        assert op.state == "failed"
+        assert op.status_code == 500
+
+    asyncio.run(scenario())
+
+
+def test_actions_without_a_commit_answer_right_away(device):
+    _bind(device)
+
+    async def action():
+        await asyncio.sleep(0.05)
+        return {"status": "ok"}
+
+    async def scenario():
+        log = OperationLog()
+        op = await log.start("clear_borders", action, commits=False)
+        assert op.state == "running"
+        await log.wait(op, 1.0)
+        assert op.state == "done"
+
+    asyncio.run(scenario())
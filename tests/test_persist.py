@@ -0,0 +1,66 @@
+from services.persist import StateSnapshot
+from services.state_cache import WindowMap
+
+
+def _lines(path) -> int:
+    with open(path, encoding="utf-8") as fh:
+        return sum(1 for _ in fh)
+
+
+def test_reconfirmed_values_are_not_appended(device, tmp_path):
+    snap = StateSnapshot(device, path=str(tmp_path / "state.jsonl"))
+    cache = device.cache
+
+    cache.put(1, "mode", "quad")
+    cache.put(1, "map", WindowMap({1: 1, 2: 2, 3: 3, 4: 4}))
+    written = _lines(snap.path)
+
+    for _ in range(10):  # refresh-state / verify passes reading back the same state
+        cache.put(1, "mode", "quad")
+        cache.put(1, "map", {1: 1, 2: 2, 3: 3, 4: 4})
+    assert _lines(snap.path) == written
+
+    cache.put(1, "mode", "single")
+    assert _lines(snap.path) == written + 1
+    snap.close()
+
+
+def test_reconfirmed_restored_value_becomes_live(device, tmp_path):
+    path = tmp_path / "state.jsonl"
+    path.write_text('{"k":"out1_mode","v":"quad","t":1.0}\n')
+    snap = StateSnapshot(device, path=str(path))
+    snap.load()
+    assert snap.info()["out1_mode"]["source"] == "restored"
+
+    device.cache.put(1, "mode", "quad")
+    assert snap.info()["out1_mode"]["source"] == "live"
+    snap.close()
+
+
+def test_verify_upgrades_only_the_mode_it_read_back(device, tmp_path, monkeypatch):
+    import asyncio
+    import services.persist as persist
+    from sim.uhd402mv import MatrixModel, SimConfig
+
+    model = MatrixModel(SimConfig())  # OUT1 comes up in single
+
+    class Wire:
+        async def wait_ready(self, timeout=None):
+            pass
+
+        async def send(self, payload):
+            return "\r\n".join(model.handle(payload.decode().rstrip("!"))).encode()
+
+    monkeypatch.setattr(persist, "MOCK", False)
+    device.aser = Wire()
+    path = tmp_path / "state.jsonl"
+    path.write_text('{"k":"out1_mode","v":"single","t":1.0}\n'
+                    '{"k":"out1_map","v":{"1":1,"2":2,"3":3,"4":4},"t":1.0}\n')
+    snap = StateSnapshot(device, path=str(path))
+    snap.load()
+
+    asyncio.run(snap.verify_restored())
+    info = snap.info()
+    assert info["out1_mode"]["source"] == "verified"
+    assert info["out1_map"]["source"] == "restored"
+    snap.close()
@@ -0,0 +1,71 @@
+import asyncio
+
+from routes.status import _refresh
+from serial_pacing import DEFAULT_GAPS
+
+
+def _replies(out1_mv: bytes, out1_qm: bytes, out1_src: bytes, out2_qm: bytes, windows=None):
+    """Fake ASER.send_pipelined: the refresh batch, then window maps (w -> HDMI n) if asked."""
+    async def send_pipelined(payloads):
+        if b"multiview" in payloads[0]:
+            return [out1_mv, out1_qm, out1_src, out2_qm]
+        return [b"HDMI %d" % (windows or {}).get(int(p.split()[4]), 1) for p in payloads]
+    return send_pipelined
+
+
+def test_out2_single_is_not_a_dropped_mode(device):
+    device.cache.put(2, "mode", "single")
+    device.aser.send_pipelined = _replies(
+        b"output 1 multiview: single screen", b"output 1 multiview: single screen",
+        b"output 1 in source: HDMI 1", b"output 2 multiview: single screen")
+
+    asyncio.run(_refresh())
+
+    assert device.aser.pacing.drops["mode"] == 0
+    assert device.aser.pacing.gaps["mode"] == DEFAULT_GAPS["mode"]
+    assert device.cache.out(2).mode == "single"
+
+
+def test_out2_not_quad_keeps_a_known_non_quad_mode(device):
+    # a reply that only says "not quad" can't contradict single (or PIP)
+    device.cache.put(2, "mode", "single")
+    device.aser.send_pipelined = _replies(
+        b"output 1 multiview: single screen", b"output 1 multiview: single screen",
+        b"output 1 in source: HDMI 1", b"")
+
+    asyncio.run(_refresh())
+
+    assert device.aser.pacing.drops["mode"] == 0
+    assert device.cache.out(2).mode == "single"
+
+
+def test_window1_written_after_route_is_not_a_dropped_route(device):
+    # select/3 (route) then quad14 (window 1 = HDMI 1): "in source" now reads 1
+    device.cache.put(1, "mode", "single")
+    device.cache.put(1, "src", 3)
+    device.cache.put(1, "mode", "quad")
+    device.cache.put(1, "quad_layout", 1)
+    device.cache.put_windows(1, {1: 1, 2: 2, 3: 3, 4: 4})
+    device.aser.send_pipelined = _replies(
+        b"output 1 quad screen", b"output 1 quad mode 1",
+        b"output 1 in source: HDMI 1", b"output 2 multiview: single screen",
+        windows={1: 1, 2: 2, 3: 3, 4: 4})
+
+    asyncio.run(_refresh())
+
+    assert device.aser.pacing.drops["route"] == 0
+    assert device.aser.pacing.gaps["route"] == DEFAULT_GAPS["route"]
+    assert device.cache.out(1).src == 1
+
+
+def test_route_missing_from_readback_is_still_a_drop(device):
+    device.cache.put(1, "mode", "single")
+    device.cache.put(1, "src", 3)
+    device.aser.send_pipelined = _replies(
+        b"output 1 multiview: single screen", b"output 1 multiview: single screen",
+        b"output 1 in source: HDMI 2", b"output 2 multiview: single screen")
+
+    asyncio.run(_refresh())
+
+    assert device.aser.pacing.drops["route"] == 1
+    assert device.aser.pacing.gaps["route"] > DEFAULT_GAPS["route"]
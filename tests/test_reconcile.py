@@ -0,0 +1,115 @@
+from services.reconcile import plan
+
+QUAD_14 = {1: 1, 2: 2, 3: 3, 4: 4}
+
+
+def _cmds(steps) -> list[str]:
+    return [cmd.decode() for _, _, cmd in steps]
+
+
+def test_unknown_state_always_gets_a_command(device):
+    steps = plan({1: {"mode": "single", "src": 3, "audio": 0}})
+    assert _cmds(steps) == [
+        "s output 1 audio 0!",
+        "s output 1 multiview 1!",
+        "s output 1 in source 3!",
+    ]
+
+
+def test_known_equal_state_gets_none(device):
+    cache = device.cache
+    cache.put(1, "mode", "quad")
+    cache.put(1, "quad_layout", 1)
+    cache.put(1, "map", QUAD_14)
+    cache.put(1, "audio", 2)
+    assert plan({1: {"mode": "quad", "quad_layout": 1, "map": QUAD_14, "audio": 2}}) == []
+
+
+def test_only_the_windows_that_differ_are_rewritten(device):
+    device.cache.put(2, "mode", "quad")
+    device.cache.put(2, "map", {1: 1, 2: 2, 3: 4, 4: 3})
+    assert _cmds(plan({2: {"mode": "quad", "map": QUAD_14}})) == [
+        "s output 2 window 3 in 3!",
+        "s output 2 window 4 in 4!",
+    ]
+
+
+def test_force_ignores_the_cache(device):
+    device.cache.put(1, "mode", "single")
+    device.cache.put(1, "src", 3)
+    assert _cmds(plan({1: {"mode": "single", "src": 3}}, force=True)) == [
+        "s output 1 multiview 1!",
+        "s output 1 in source 3!",
+    ]
+
+
+def test_audio_then_video_then_borders_across_outputs(device):
+    steps = plan({
+        2: {"mode": "quad", "border_window": 2, "border_color": 2},
+        1: {"mode": "single", "src": 2, "audio": 0, "border_window": 0},
+    })
+    assert [(phase, out_n) for phase, out_n, _ in steps] == [
+        ("audio", 1),
+        ("video", 1), ("video", 1), ("video", 2),
+        ("borders", 2), ("borders", 2),
+    ]
+    assert _cmds(steps)[-2:] == ["s output 2 window 2 border color 2!", "s output 2 window 2 border 1!"]
+
+
+def test_moving_the_border_turns_the_old_one_off_first(device):
+    border = device.cache.out(1).border
+    device.cache.put(1, "border_window", 1)
+    border.colors[1] = border.colors[3] = 2
+    assert _cmds(plan({1: {"border_window": 3, "border_color": 2}})) == [
+        "s output 1 window 1 border 0!",
+        "s output 1 window 3 border 1!",
+    ]
+
+
+class _Wire:
+    """Intent queue stand-in that plays every command into the simulator's model."""
+
+    def __init__(self):
+        from sim.uhd402mv import MatrixModel, SimConfig
+        self.model = MatrixModel(SimConfig())
+
+    async def submit(self, payloads, gap=None):
+        for p in payloads:
+            self.model.handle(p.decode().rstrip("!"))
+
+
+def test_route_and_window1_stay_one_input(device):
+    # select/2, quad14, select/3, quad14 starting from the primed layout:
+    # the route moves window 1 on the device, so quad14 must put HDMI 1 back
+    import asyncio
+    from services.video import set_quad_14, set_single
+
+    wire = device.intents = _Wire()
+    for n in (1, 2):
+        asyncio.run(set_quad_14(n, force=True))
+
+    for step in (lambda: set_single(1, 2), lambda: set_quad_14(1),
+                 lambda: set_single(1, 3), lambda: set_quad_14(1)):
+        asyncio.run(step())
+        out = wire.model.out[1]
+        assert device.cache.out(1).map.as_dict() == out["windows"]
+        assert device.cache.out(1).src == out["src"]
+
+    assert wire.model.out[1]["windows"] == QUAD_14
+
+
+def test_switching_to_single_from_quad_sends_the_mode(device):
+    import asyncio
+    from services.featured import ensure_featured_applied
+    from services.video import set_quad_14
+
+    wire = device.intents = _Wire()
+    for n in (1, 2):
+        asyncio.run(set_quad_14(n, force=True))
+    assert wire.model.out[1]["multiview"] == 5
+
+    device.cache.featured_source = 3
+    asyncio.run(ensure_featured_applied(mode="single"))
+    assert wire.model.out[1]["multiview"] == 1
+    assert wire.model.out[1]["src"] == 3
+    assert device.cache.get("out1_mode") == "single"
@@ -0,0 +1,18 @@
+import json
+
+from services.scenes import SceneLibrary
+
+
+def test_load_skips_scenes_that_fail_validation(tmp_path):
+    path = tmp_path / "scenes.json"
+    path.write_text(json.dumps({"scenes": {
+        "good": {"outputs": {"2": {"mode": "quad", "map": {"1": 1, "2": 2, "3": 3, "4": 4}}}},
+        "bad-window": {"outputs": {"1": {"mode": "quad", "map": {"0": 3}}}},
+        "bad-source": {"outputs": {"1": {"mode": "quad", "map": {"1": 9}}}},
+        "bad-output": {"outputs": {"3": {"mode": "single"}}},
+    }}))
+
+    lib = SceneLibrary(str(path))
+    assert lib.load() == 1
+    assert list(lib.scenes) == ["good"]
+    assert lib.scenes["good"]["outputs"][2]["map"] == {1: 1, 2: 2, 3: 3, 4: 4}
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+import services.borders as borders
+from services.state_cache import MatrixCache, WindowMap
+from services.video import ensure_maps_cached
+
+
+@pytest.mark.parametrize("w", [0, -1, 5])
+def test_window_map_rejects_out_of_range_windows(w):
+    m = WindowMap({1: 1, 2: 2, 3: 3, 4: 4})
+    with pytest.raises(ValueError):
+        m[w] = 9
+    with pytest.raises(ValueError):
+        m.update({w: 9})
+    with pytest.raises(ValueError):
+        WindowMap({w: 9})
+    assert m.as_dict() == {1: 1, 2: 2, 3: 3, 4: 4}
+    assert m.get(w) is None
+
+
+def test_unanswered_window_map_is_read_once(device):
+    sent = []
+
+    async def send_pipelined(payloads):
+        sent.append(list(payloads))
+        return [b""] * len(payloads)
+    device.aser.send_pipelined = send_pipelined
+
+    asyncio.run(ensure_maps_cached(1))
+    asyncio.run(ensure_maps_cached(1))
+    assert len(sent) == 1
+
+
+class _Intents:
+    def __init__(self):
+        self.sent = []
+
+    async def submit(self, payloads, gap=None):
+        self.sent += payloads
+
+
+def test_border_window_has_one_source_of_truth(device):
+    device.intents = _Intents()
+    cache = device.cache
+
+    asyncio.run(borders.set_highlight(2, 3))
+    assert cache.out(2).border.window == 3
+    assert cache.get("out2_border_window") == 3
+    version = cache.version
+
+    asyncio.run(borders.clear_all(2))
+    assert cache.out(2).border.window is None
+    assert cache.get("out2_border_window") is None
+    assert "out2_border_window" not in cache.data
+    assert cache.version > version
+
+
+def test_restored_border_window_moves_the_border_record():
+    cache = MatrixCache()
+    cache.restore("out1_border_window", 2)
+    assert cache.out(1).border.window == 2
+    cache.clear("out1_")
+    assert cache.out(1).border.window is None